@@ -0,0 +1,96 @@
+"""Thin client for the deep-code daemon.
+
+`deep-code` starts here. When a daemon is running (`deep-code daemon`), a
+chat is handed to it over a Unix socket and this process only relays
+terminal input and output, so it never imports typer, httpx or the rest
+of deep-code. Without a daemon, or when the daemon is busy with another
+session, the chat runs in-process as usual.
+
+Keep this module's imports to the standard library: every import here is
+paid on each start (see scripts/bench_import.py).
+"""
+import json
+import os
+import socket
+import sys
+from typing import Any, Dict, List, Optional
+
+SOCKET_ENV = "DEEP_CODE_SOCKET"
+NO_DAEMON_ENV = "DEEP_CODE_NO_DAEMON"
+
+
+def socket_path() -> str:
+    """Where the daemon listens: $DEEP_CODE_SOCKET, or next to the config file"""
+    # Same directory as core.config.CONFIG_PATH, which can't be imported here (it pulls in yaml)
+    return os.environ.get(SOCKET_ENV) or os.path.join(os.path.expanduser("~"), ".ai-code", "daemon.sock")
+
+
+def wants_daemon(argv: List[str]) -> bool:
+    """Whether these arguments start a chat the daemon could serve"""
+    return (not argv or argv[0] == "chat") and not os.environ.get(NO_DAEMON_ENV)
+
+
+def connect(path: Optional[str] = None) -> Optional[socket.socket]:
+    """A connection to the daemon, or None if none is listening"""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path or socket_path())
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def _send(sock: socket.socket, message: Dict[str, Any]):
+    sock.sendall((json.dumps(message) + "\n").encode("utf-8"))
+
+
+def request(message: Dict[str, Any], path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Send one control message ({"command": "status"} or "stop") and return the reply"""
+    sock = connect(path)
+    if sock is None:
+        return None
+    with sock, sock.makefile("rb") as replies:
+        _send(sock, message)
+        line = replies.readline()
+    return json.loads(line) if line else None
+
+
+def run(argv: List[str], path: Optional[str] = None) -> Optional[int]:
+    """Run a chat in the daemon and relay the terminal to it.
+
+    Returns the session's exit code, or None when no daemon took the
+    session (none running, or busy) and the caller should run it itself.
+    """
+    sock = connect(path)
+    if sock is None:
+        return None
+    with sock, sock.makefile("rb") as messages:
+        try:
+            _send(sock, {"argv": argv, "cwd": os.getcwd(), "tty": sys.stdin.isatty() and sys.stdout.isatty()})
+            for line in messages:
+                message = json.loads(line)
+                if "out" in message:
+                    stream = sys.stderr if message.get("stream") == "stderr" else sys.stdout
+                    stream.write(message["out"])
+                    stream.flush()
+                elif "prompt" in message:
+                    try:
+                        answer: Optional[str] = input(message["prompt"])
+                    except EOFError:
+                        answer = None
+                    _send(sock, {"line": answer})
+                elif "exit" in message:
+                    return message["exit"]
+                elif message.get("busy"):
+                    return None
+        except KeyboardInterrupt:
+            # Closing the connection stops the session in the daemon
+            sys.stderr.write("\nAborted!\n")
+            return 1
+        except (OSError, ValueError):
+            pass
+    sys.stderr.write("[Lost the connection to the deep-code daemon]\n")
+    return 1
@@ -0,0 +1,280 @@
+"""The deep-code daemon: a long-lived process that runs chat sessions for thin clients.
+
+It keeps what every start would otherwise rebuild (imported modules, the
+parsed config, API clients with their open connections, validators with
+their caches) in a SessionResources shared by all sessions. Clients talk
+JSON lines over a Unix socket (see client.py):
+
+    client -> daemon   {"argv": [...], "cwd": ..., "tty": ...}  start a chat
+                       {"line": "..."}                          answer a prompt (null: end of input)
+                       {"command": "status" | "stop"}           control
+    daemon -> client   {"out": "...", "stream": "stdout"}       output to show
+                       {"prompt": "You: "}                      read a line
+                       {"exit": 0}                              session over
+                       {"busy": true}                           run it yourself
+
+Sessions run one at a time, because a session works in the client's
+current directory and the process has only one. A client that finds the
+daemon busy runs its chat in-process instead. Sessions use the daemon's
+environment, not the client's.
+"""
+import asyncio
+import contextvars
+import importlib
+import io
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import time
+import traceback
+from typing import Any, Dict, Optional, Set
+
+from deep_code.cli.resources import SessionResources
+from deep_code.utils.async_input import set_line_reader
+
+# Imported up front so no session pays for them
+PRELOAD = (
+    "httpx", "yaml", "slugify", "chardet",
+    "deep_code.cli.main",
+    "deep_code.core.context",
+    "deep_code.models.groq_client",
+    "deep_code.operations.code_validator",
+    "deep_code.operations.fix_scheduler",
+    "deep_code.operations.stream_parser",
+    "deep_code.operations.workspace_writer",
+)
+
+
+class _Connection:
+    """One client's session: its output, and the lines it sends back"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, tty: bool):
+        self.reader = reader
+        self.writer = writer
+        self.tty = tty
+        self.lines: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+
+    def send(self, message: Dict[str, Any]):
+        if not self.writer.is_closing():
+            self.writer.write((json.dumps(message) + "\n").encode("utf-8"))
+
+    async def read_line(self, prompt: str) -> Optional[str]:
+        if self.closed:
+            return None
+        self.send({"prompt": prompt})
+        return await self.lines.get()
+
+    async def pump(self, session: asyncio.Task):
+        """Queue the client's answers; if the client goes away, stop its session"""
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            try:
+                self.lines.put_nowait(json.loads(line).get("line"))
+            except ValueError:
+                continue
+        self.closed = True
+        self.lines.put_nowait(None)
+        session.cancel()
+
+
+# The connection whose session is running in the current context
+_connection: contextvars.ContextVar[Optional[_Connection]] = contextvars.ContextVar("connection", default=None)
+
+
+class _SessionOutput(io.TextIOBase):
+    """Stands in for sys.stdout / sys.stderr: a session's output goes to its client"""
+
+    def __init__(self, fallback, name: str):
+        self.fallback = fallback
+        self.name = name
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+    @property
+    def errors(self):
+        return "replace"
+
+    def write(self, text: str) -> int:
+        connection = _connection.get()
+        if connection is None:
+            return self.fallback.write(text)
+        connection.send({"out": text, "stream": self.name})
+        return len(text)
+
+    def flush(self):
+        if _connection.get() is None:
+            self.fallback.flush()
+
+    def isatty(self) -> bool:
+        connection = _connection.get()
+        return connection.tty if connection is not None else self.fallback.isatty()
+
+
+def preload():
+    for name in PRELOAD:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass  # The session reports missing dependencies itself
+
+
+def peer_uid(writer: asyncio.StreamWriter) -> Optional[int]:
+    """User id of the process on the other end of the socket, where the platform tells"""
+    sock = writer.get_extra_info("socket")
+    if sock is None or not hasattr(socket, "SO_PEERCRED"):
+        return None
+    try:
+        credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    except OSError:
+        return None
+    return struct.unpack("3i", credentials)[1]
+
+
+class Daemon:
+    """Serves chat sessions on a Unix socket until stopped"""
+
+    def __init__(self, path: str, keepalive: Optional[float] = None):
+        self.path = path
+        self.resources = SessionResources(keepalive=keepalive)
+        self.started = time.time()
+        self.sessions = 0
+        self.busy = False
+        self._stopping: Optional[asyncio.Event] = None
+        self._session_task: Optional[asyncio.Task] = None
+        self._handlers: Set[asyncio.Task] = set()
+
+    def run(self):
+        """Serve until SIGINT/SIGTERM or a stop request"""
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self._stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self._stopping.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Not on this platform, or not the main thread
+        preload()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)  # Left over from a daemon that didn't shut down cleanly
+        # Only the owner may connect: whoever can, runs sessions as this user
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self._handle, path=self.path)
+        finally:
+            os.umask(umask)
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = _SessionOutput(stdout, "stdout"), _SessionOutput(stderr, "stderr")
+        try:
+            async with server:
+                await self._stopping.wait()
+        finally:
+            if self._session_task is not None:
+                self._session_task.cancel()
+            # Let connections wind down before the resources their sessions use are closed
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            sys.stdout, sys.stderr = stdout, stderr
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            await self.resources.aclose()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started, 1),
+            "sessions": self.sessions,
+            "busy": self.busy,
+            **self.resources.status(),
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        try:
+            uid = peer_uid(writer)
+            if uid is not None and uid != os.getuid():
+                return
+            try:
+                request = json.loads(await reader.readline())
+            except ValueError:
+                return
+            connection = _Connection(reader, writer, bool(request.get("tty")))
+            command = request.get("command")
+            if command == "status":
+                connection.send({"status": self.status()})
+            elif command == "stop":
+                connection.send({"exit": 0})
+                self._stopping.set()
+            elif self.busy:
+                connection.send({"busy": True})
+            else:
+                connection.send({"exit": await self._run_session(connection, request)})
+            await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+            self._handlers.discard(handler)
+
+    async def _run_session(self, connection: _Connection, request: Dict[str, Any]) -> int:
+        self.busy = True
+        self.sessions += 1
+        cwd = os.getcwd()
+        try:
+            os.chdir(request.get("cwd") or cwd)
+        except OSError as e:
+            self.busy = False
+            connection.send({"out": f"[ERROR] {e}\n", "stream": "stderr"})
+            return 1
+        session = self._session_task = asyncio.create_task(self._session(connection, request))
+        pump = asyncio.create_task(connection.pump(session))
+        try:
+            return await session
+        except asyncio.CancelledError:
+            if not session.cancelled():
+                raise
+            if not connection.closed:
+                connection.send({"out": "\n[The deep-code daemon stopped]\n", "stream": "stderr"})
+            return 1
+        finally:
+            pump.cancel()
+            os.chdir(cwd)
+            self._session_task = None
+            self.busy = False
+
+    async def _session(self, connection: _Connection, request: Dict[str, Any]) -> int:
+        """Run a chat for `connection`; returns its exit code"""
+        import typer
+        import typer.main
+        from deep_code.cli.main import app, chat_session
+        _connection.set(connection)
+        set_line_reader(connection.read_line)
+        argv = list(request.get("argv") or [])
+        try:
+            command = typer.main.get_command(app).commands["chat"]
+            params = command.make_context("deep-code chat", argv[1:]).params
+            await chat_session(resources=self.resources, **params)
+            return 0
+        except typer.Exit as exit:
+            return exit.exit_code
+        except typer.Abort:
+            typer.echo("Aborted!", err=True)
+            return 1
+        except Exception as error:
+            if hasattr(error, "show") and hasattr(error, "exit_code"):
+                error.show()  # Bad options, as the option parser reports them
+                return error.exit_code
+            traceback.print_exc()
+            return 1
@@ -1,9 +1,15 @@
 #!/usr/bin/env python3
 import sys
-import os
-from pathlib import Path
+
 
 def main():
+    # Hand chats to a running daemon before importing anything heavy
+    from deep_code.cli import client
+    argv = sys.argv[1:]
+    if client.wants_daemon(argv):
+        code = client.run(argv)
+        if code is not None:
+            sys.exit(code)
     try:
         from deep_code.cli.main import app
         app()
@@ -13,4 +19,4 @@ def main():
         app()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
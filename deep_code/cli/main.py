@@ -8,7 +8,7 @@ def main(ctx: typer.Context):
     """Deep Code: Open Source CLI Coding Agent"""
     if ctx.invoked_subcommand is None:
         # Auto-start chat mode if no command specified
-        chat()
+        chat(cache=False, no_cache=False, replay=False, script=None)
 
 @app.command()
 def version():
@@ -17,29 +17,57 @@ def version():
 
 
 @app.command()
-def chat():
+def chat(
+    cache: bool = typer.Option(False, "--cache", help="Reuse replies to identical requests from the on-disk response cache"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Bypass the on-disk response cache, even if the config enables it"),
+    replay: bool = typer.Option(False, "--replay", help="Serve responses only from the cache (for deterministic runs)"),
+    script: str = typer.Option(None, "--script", help="Read user turns from this file, one per line, instead of prompting")
+):
     """Start interactive coding agent mode."""
+    import asyncio
+    asyncio.run(chat_session(cache=cache, no_cache=no_cache, replay=replay, script=script))
+
+
+async def chat_session(cache=False, no_cache=False, replay=False, script=None, resources=None):
+    """Run one chat session.
+
+    `resources` (config, API client, validators) are shared with other
+    sessions when given, as the daemon does; otherwise the session makes its
+    own and closes them when it ends.
+    """
     import sys
     import os
     import re
-    from deep_code.core import config as core_config
-    from deep_code.models.groq_client import GroqClient, APIError
+    from deep_code.cli.resources import SessionResources
+    from deep_code.core.context import ConversationContext, history_budget
+    from deep_code.models.groq_client import APIError, context_window
     from deep_code.operations import file_ops
-    from deep_code.operations.code_validator import CodeValidator
+    from deep_code.operations.fix_scheduler import FixScheduler
+    from deep_code.operations.snapshot_store import SnapshotStore
+    from deep_code.operations.scanner import language_of
+    from deep_code.operations.stream_parser import CodeBlockStreamParser
+    from deep_code.operations.syntax_checker import DelimiterTokenizer
+    from deep_code.operations.workspace_writer import WorkspaceWriter
+    from deep_code.utils.async_input import ainput
+    from deep_code.utils.timing import TIMINGS
     import asyncio
     try:
         from slugify import slugify
     except ImportError:
         typer.echo("[ERROR] python-slugify is not installed. Please run 'pip install python-slugify' in your venv.")
         raise typer.Exit(1)
-    cfg = core_config.load_config()
+    owns_resources = resources is None
+    if owns_resources:
+        resources = SessionResources()
+    cfg = resources.config()
     api_key = cfg["api"]["key"]
     default_model = cfg["api"].get("default_model", "deepseek-r1-distill-llama-70b")
     fallback_models = cfg["api"].get("fallback_models", [])
+    stream_mode = cfg["api"].get("stream", True)
     if not api_key:
         typer.echo("[ERROR] No API key set. Run 'ai-code config --set' to set your Groq API key.")
         raise typer.Exit(1)
-    client = GroqClient(api_key)
+    client = resources.client(cfg, no_cache=no_cache, replay=replay, cache=cache)
     system_prompt = (
         "You are Deep Code, an open-source CLI coding agent.\n"
         "When the user asks for an app or code, ALWAYS output each file as a separate markdown code block, e.g., ```html ... ```, ```js ... ```, etc.\n"
@@ -97,11 +125,264 @@ def chat():
         "- Call multiple independent tools in the same function_calls block.\n"
         "- Never commit changes unless explicitly asked.\n"
     )
-    messages = [
-        {"role": "system", "content": system_prompt}
-    ]
+    context_cfg = cfg.get("context", {})
+    snapshot_budget = context_cfg.get("snapshot_token_budget", 16000)
+    token_budget = context_cfg.get("token_budget")
+    if token_budget is None:
+        # Fill the smallest context window among the models a request may be sent to
+        window = min(context_window(model) for model in [default_model] + list(fallback_models))
+        token_budget = history_budget(window, snapshot_budget)
+    context = ConversationContext(
+        system_prompt,
+        token_budget=token_budget,
+        keep_recent=context_cfg.get("keep_recent_messages", 6),
+        workspace_snapshot=context_cfg.get("workspace_snapshot", True),
+        snapshot_budget=snapshot_budget
+    )
+    if os.path.exists("DEEP_CODE.md"):
+        context.pin("Project memory (DEEP_CODE.md):\n" + file_ops.read_file_safe("DEEP_CODE.md"))
+
+    # One writer per project folder; it remembers what it wrote to skip unchanged files,
+    # and records every batch in the project's snapshot store for /undo and /rollback
+    writers = {}
+    editor_cfg = cfg.get("editor", {})
+
+    def writer_for(folder_name):
+        writer = writers.get(folder_name)
+        if writer is None:
+            snapshots = SnapshotStore(
+                folder_name,
+                keep_turns=editor_cfg.get("backup_count", 5),
+                compress=editor_cfg.get("compress_snapshots", True)
+            )
+            writer = writers[folder_name] = WorkspaceWriter(
+                folder_name, fsync=editor_cfg.get("fsync_writes", False), snapshots=snapshots
+            )
+        return writer
+
+    def save_files(folder_name, files, remove=(), record=True):
+        """Write {file name: code} (and delete `remove`) as one batch, updating the workspace snapshot.
+
+        Code given as bytes (restored snapshots) is written back byte for byte.
+        """
+        with TIMINGS.stage("write"):
+            writer = writer_for(folder_name)
+            for file_name, code in files.items():
+                if isinstance(code, bytes):
+                    writer.stage_bytes(file_name, code)
+                else:
+                    writer.stage(file_name, code)
+            for file_name in remove:
+                writer.remove(file_name)
+            result = writer.commit(record=record)
+        context.open_project(folder_name)
+        for file_name, code in files.items():
+            if isinstance(code, bytes):
+                try:
+                    code = file_ops.decode_bytes(code)[0]
+                except file_ops.FileOperationError:
+                    code = code.decode("utf-8", "replace")
+            context.set_file(file_name, code)
+        for file_name in remove:
+            context.remove_file(file_name)
+        return result
+
+    def save_file(folder_name, file_name, code):
+        save_files(folder_name, {file_name: code})
+
+    def restore(folder_name, snapshot):
+        """Put the project's files back the way they were in `snapshot`"""
+        store = writer_for(folder_name).snapshots
+        files, remove = store.restore_plan(snapshot)
+        result = save_files(folder_name, files, remove=remove, record=False)
+        store.move_head(snapshot)
+        return result
+
+    def history_command(command):
+        """Handle /undo, /rollback N, /history and /diff [A [B]]; False if `command` isn't one"""
+        name, *args = command.split()
+        name = name.lower()
+        if name not in ("/undo", "/rollback", "/history", "/diff"):
+            return False
+        if context.project is None:
+            typer.echo("[No project yet]")
+            return True
+        store = writer_for(context.project).snapshots
+        head = store.head
+        if head is None:
+            typer.echo("[No snapshots yet]")
+            return True
+        if name == "/history":
+            for snapshot in store.history():
+                marker = "*" if snapshot.id == head.id else " "
+                label = f" {snapshot.label}" if snapshot.label else ""
+                typer.echo(f" {marker} turn {snapshot.turn}:{label} ({len(snapshot.files)} files)")
+            return True
+        try:
+            turns = [int(arg) for arg in args]
+        except ValueError:
+            typer.echo(f"[Usage: {name} {'N' if name == '/rollback' else '[A [B]]'} (turn numbers, see /history)]")
+            return True
+        if name == "/diff":
+            old = store.at_turn(turns[0]) if turns else store.before_head_turn()
+            new = store.at_turn(turns[1]) if len(turns) > 1 else head
+            if old is None or new is None:
+                typer.echo("[No such turn, see /history]")
+            else:
+                typer.echo(store.diff(old, new) or "[No differences]")
+            return True
+        if name == "/undo":
+            target = store.before_head_turn()
+        elif len(turns) == 1:
+            target = store.at_turn(turns[0])
+        else:
+            typer.echo("[Usage: /rollback N (a turn number, see /history)]")
+            return True
+        if target is None:
+            typer.echo("[Nothing to go back to]" if name == "/undo" else "[No such turn, see /history]")
+            return True
+        result = restore(context.project, target)
+        typer.echo(
+            f"[Restored turn {target.turn}: {len(result.written)} files written, "
+            f"{len(result.removed)} removed]"
+        )
+        return True
+
+    async def complete_messages(messages):
+        """Send `messages` to the model and return the reply text"""
+        response = await client.chat_completion_with_fallback(messages, default_model, fallback_models)
+        return response.get('choices', [{}])[0].get('message', {}).get('content', '').strip()
+
+    async def complete():
+        """Send the current context to the model and return the reply text"""
+        with TIMINGS.stage("request"):
+            return await complete_messages(context.messages)
+
+    def validate(folder_name):
+        """Validate the project folder, returning the validator and its errors"""
+        with TIMINGS.stage("validate"):
+            # One validator per project folder, so re-validation only rechecks what changed
+            validator = resources.validator(folder_name, cfg)
+            return validator, validator.validate_all()
+
+    async def stream_reply(folder_name):
+        """Stream the reply, writing each code block to disk as soon as its fence closes.
+
+        JS and CSS blocks are tokenized as they arrive, so a block that closes
+        with delimiters still open is reported as truncated straight away.
+        """
+        parser = CodeBlockStreamParser()
+        streamed_files = set()
+        tracker = None  # [tokenizer, chars fed] for the JS/CSS block being received
+        async for delta in client.chat_completion_stream_with_fallback(context.messages, default_model, fallback_models):
+            first_idx = len(parser.blocks)
+            with TIMINGS.stage("parse"):
+                new_blocks = parser.feed(delta)
+                file_names = listed_file_names(parser.text) if new_blocks else {}
+                finished = []
+                for offset, (lang, code) in enumerate(new_blocks):
+                    if offset == 0 and tracker is not None:
+                        tokenizer, fed = tracker
+                        finished.append(tokenizer.feed(code[fed:]).complete)
+                    elif language_of("", lang) in ("js", "css"):
+                        finished.append(DelimiterTokenizer(language_of("", lang)).feed(code).complete)
+                    else:
+                        finished.append(True)
+                    tracker = None
+                pending = parser.pending
+                if pending is not None and language_of("", pending[0]) in ("js", "css"):
+                    if tracker is None:
+                        tracker = [DelimiterTokenizer(language_of("", pending[0])), 0]
+                    # Hold back what could be the start of the closing fence
+                    ready = max(tracker[1], len(pending[1]) - 2)
+                    tracker[0].feed(pending[1][tracker[1]:ready])
+                    tracker[1] = ready
+            if not new_blocks:
+                continue
+            os.makedirs(folder_name, exist_ok=True)
+            for offset, (lang, code) in enumerate(new_blocks):
+                idx = first_idx + offset
+                file_name = file_names.get(idx) or default_file_name(lang, idx, folder_name)
+                save_file(folder_name, file_name, code)
+                streamed_files.add(file_name)
+                typer.echo(f"[Wrote {file_name}]")
+                if not finished[offset]:
+                    typer.echo(f"[Warning: {file_name} looks truncated (unclosed delimiters)]")
+        if parser.pending is not None:
+            typer.echo("[Warning: the reply ended inside an unfinished code block]")
+        return parser.text.strip(), parser.close(), streamed_files
+
+    fix_cfg = cfg.get("auto_fix", {})
+    max_fix_rounds = fix_cfg.get("max_rounds", 2)
+
+    fix_scheduler = FixScheduler(
+        complete_messages,
+        system_prompt,
+        max_parallel=fix_cfg.get("max_parallel", 4),
+        max_errors_per_file=fix_cfg.get("max_errors_per_file", 10)
+    )
+
+    async def auto_fix(folder_name):
+        """Validate the generated project and let the model fix what fails.
+
+        Each round fixes every affected file at once, one request per file.
+        """
+        try:
+            validator, errors = validate(folder_name)
+
+            fix_rounds = 0
+            while errors and fix_rounds < max_fix_rounds:
+                fix_rounds += 1
+                file_count = len(FixScheduler.group(errors))
+                typer.echo(f"[Validation found {validator.total_errors} errors in {file_count} files. Auto-fixing... (Round {fix_rounds})]")
+
+                with TIMINGS.stage("request"):
+                    results = await fix_scheduler.fix(validator, errors)
+                fixed = {}
+                for file_name, result in results.items():
+                    if isinstance(result, BaseException):
+                        typer.echo(f"[Auto-fix error for {file_name}: {result}]")
+                    elif result is None:
+                        typer.echo(f"[Auto-fix reply for {file_name} had no code block in its language; skipped]")
+                    else:
+                        fixed[file_name] = result
+                if not fixed:
+                    typer.echo("[Auto-fix produced no usable changes; stopping]")
+                    break
+
+                written = save_files(folder_name, fixed).written
+                if not written:
+                    typer.echo("[Auto-fix changed nothing; stopping]")
+                    break
+                # Only files whose content actually changed count as fixed.
+                # Record the merged fix as one turn so the history stays small
+                changed = {file_name: fixed[file_name] for file_name in written if file_name in fixed}
+                context.add("user", "Fix the validation errors in " + ", ".join(changed) + ".")
+                reply = "\n".join(
+                    f"{file_name}:\n```{os.path.splitext(file_name)[1].lstrip('.')}\n{code}```"
+                    for file_name, code in changed.items()
+                )
+                context.add("assistant", reply, files=list(changed))
+
+                validator, errors = validate(folder_name)
+                if not errors:
+                    typer.echo("[All errors fixed successfully!]")
+                    break
+
+            if errors and fix_rounds >= max_fix_rounds:
+                typer.echo(f"[Warning: {validator.total_errors} errors remain after {max_fix_rounds} fix attempts]")
+                for error in errors[:5]:  # Show first 5 errors
+                    typer.echo(f"  • {error}")
+        except APIError as e:
+            typer.echo(f"[API ERROR] {e}")
+        except Exception as e:
+            typer.echo(f"[UNEXPECTED ERROR] {e}")
+
+    # The previous turn's validation and auto-fix work, running while the user types
+    background = None
 
     async def run_agent():
+        nonlocal background
         # ASCII Banner
         banner = """
 ╭─────────────────────────────────────────────────────────────────╮
@@ -124,21 +405,40 @@ def chat():
         typer.echo("💡 Just describe what you want to build and I'll create it for you!")
         typer.echo("📁 Files will be automatically saved and validated")
         typer.echo("🔧 Any errors will be detected and fixed automatically")
+        typer.echo("⏪ Type '/undo' to revert the last turn ('/history', '/rollback N', '/diff' for more)")
         typer.echo("🚪 Type '/exit' to quit\n")
         typer.echo("═" * 70)
         typer.echo()
         import re
+        turns = None
+        if script:
+            turns = iter(file_ops.read_file_safe(script).splitlines())
         while True:
-            user_input = input("You: ").strip()
+            if turns is not None:
+                # Scripted sessions end with /exit once the file runs out
+                user_input = next(turns, "/exit").strip()
+                typer.echo(f"You: {user_input}")
+            else:
+                user_input = await ainput("You: ")
+                # End of input (e.g. Ctrl-D) ends the session
+                user_input = "/exit" if user_input is None else user_input.strip()
+            if not user_input:
+                continue
+            if background:
+                # Let the previous turn settle before touching the context or files again
+                await background
+                background = None
             if user_input.lower() in {"/exit", "exit", "quit", ":q"}:
                 typer.echo("[Session ended]")
                 break
-            if not user_input:
+            if user_input.lower() == "/compact":
+                before, after = context.compact(force=True)
+                typer.echo(f"[Context compacted: ~{before} -> ~{after} tokens]")
+                continue
+            if user_input.startswith("/") and history_command(user_input):
                 continue
-            messages.append({"role": "user", "content": user_input})
+            context.add("user", user_input)
             try:
-                response = await client.chat_completion_with_fallback(messages, default_model, fallback_models)
-                content = response.get('choices', [{}])[0].get('message', {}).get('content', '').strip()
                 app_name_match = re.search(r'build (?:me )?a[n]? ([\w\- ]+?)(?: app| web app| project| application|$)', user_input, re.IGNORECASE)
                 if app_name_match:
                     app_name = app_name_match.group(1).strip()
@@ -147,7 +447,15 @@ def chat():
                 folder_name = slugify(app_name)
                 if not folder_name:
                     folder_name = 'deep-code-output'
-                code_blocks = re.findall(r"```([a-zA-Z0-9]*)\n([\s\S]*?)```", content)
+                writer_for(folder_name).snapshots.begin_turn(user_input)
+                streamed_files = set()
+                if stream_mode:
+                    with TIMINGS.stage("request"):
+                        content, code_blocks, streamed_files = await stream_reply(folder_name)
+                else:
+                    content = await complete()
+                    with TIMINGS.stage("parse"):
+                        code_blocks = re.findall(r"```([a-zA-Z0-9]*)\n([\s\S]*?)```", content)
                 if not code_blocks:
                     file_list = []
                     for line in content.splitlines():
@@ -159,49 +467,35 @@ def chat():
                             f"Please generate the full code for these files, each as a separate markdown code block: {', '.join(file_list)}. "
                             "Do not output any lists or explanations, just the code blocks."
                         )
-                        messages.append({"role": "user", "content": followup})
-                        response = await client.chat_completion_with_fallback(messages, default_model, fallback_models)
-                        content = response.get('choices', [{}])[0].get('message', {}).get('content', '').strip()
+                        context.add("assistant", content)
+                        context.add("user", followup)
+                        content = await complete()
                         code_blocks = re.findall(r"```([a-zA-Z0-9]*)\n([\s\S]*?)```", content)
-                file_names = {}
-                for line in content.splitlines():
-                    match = re.match(r"[\*-]\s+`([^`]+)`", line.strip())
-                    if match:
-                        idx = len(file_names)
-                        file_names[idx] = match.group(1)
+                with TIMINGS.stage("parse"):
+                    file_names = listed_file_names(content)
                 if code_blocks:
-                    import os
                     os.makedirs(folder_name, exist_ok=True)
                     file_map = {}
+                    block_files = []
                     for idx, (lang, code) in enumerate(code_blocks):
-                        if idx in file_names:
-                            file_name = file_names[idx]
-                        else:
-                            ext = lang if lang else "txt"
-                            base = folder_name.replace('-', '_')
-                            if ext in ["html", "htm"]:
-                                file_name = f"index.{ext}"
-                            elif ext in ["js", "jsx", "ts", "tsx"]:
-                                file_name = f"app.{ext}"
-                            elif ext in ["py", "sh", "bash"]:
-                                file_name = f"{base}.{ext}"
-                            else:
-                                file_name = f"{base}_file{idx+1}.{ext}"
+                        file_name = file_names.get(idx) or default_file_name(lang, idx, folder_name)
                         file_map[file_name] = (lang, code)
-                    file_map = harmonize_file_names(file_map)
-                    corrected_map = cross_file_dependency_fix(file_map)
-                    corrected_map = harmonize_selectors(corrected_map)
-                    for fname, code in corrected_map.items():
-                        file_path = os.path.join(folder_name, fname)
-                        file_ops.write_file_atomic(file_path, code)
+                        block_files.append(file_name)
+                    renames = {}
+                    with TIMINGS.stage("harmonize"):
+                        file_map = harmonize_file_names(file_map, renames)
+                        corrected_map = cross_file_dependency_fix(file_map)
+                        corrected_map = harmonize_selectors(corrected_map)
+                    context.add("assistant", content, files=[renames.get(name, name) for name in block_files])
+                    # One batch: the harmonized files, minus streamed files that harmonization renamed
+                    save_files(folder_name, corrected_map, remove=sorted(streamed_files - set(corrected_map)))
 
                     def is_incomplete_js(js_code):
-                        open_braces = js_code.count('{')
-                        close_braces = js_code.count('}')
-                        if open_braces > close_braces:
+                        # Unclosed braces, strings, comments or template literals
+                        if not DelimiterTokenizer("js").feed(js_code).complete:
                             return True
                         if js_code.strip().endswith((
-                            'function', '{', '(', '+', '-', '*', '/', '='
+                            'function', '+', '-', '*', '/', '='
                         )):
                             return True
                         if len(js_code.strip()) < 20:
@@ -211,113 +505,65 @@ def chat():
                     for fname in corrected_map:
                         if fname.endswith('.js'):
                             file_path = os.path.join(folder_name, fname)
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                js_code = f.read()
+                            js_code = file_ops.read_file_safe(file_path)
                             if is_incomplete_js(js_code):
                                 followup = (
                                     f"The file `{fname}` is incomplete. Please generate the full, working code for this file as a single markdown code block. "
                                     "Do not output any lists or explanations, just the code block."
                                 )
-                                messages.append({"role": "user", "content": followup})
-                                response = await client.chat_completion_with_fallback(messages, default_model, fallback_models)
-                                content = response.get('choices', [{}])[0].get('message', {}).get('content', '').strip()
-                                code_blocks = re.findall(r"```([a-zA-Z0-9]*)\n([\s\S]*?)```", content)
-                                for lang, code in code_blocks:
+                                context.add("user", followup)
+                                js_content = await complete()
+                                js_blocks = re.findall(r"```([a-zA-Z0-9]*)\n([\s\S]*?)```", js_content)
+                                js_files = [None] * len(js_blocks)
+                                for idx, (lang, code) in enumerate(js_blocks):
                                     if lang.lower() in ['js', 'javascript']:
-                                        file_ops.write_file_atomic(file_path, code)
+                                        save_file(folder_name, fname, code)
+                                        js_files[idx] = fname
                                         break
-                    
-                    # Validate generated code and auto-fix errors
-                    validator = CodeValidator(folder_name)
-                    errors = validator.validate_all()
-                    
-                    # Auto-fix up to 2 rounds if errors are found (reduced to save tokens)
-                    fix_rounds = 0
-                    max_fix_rounds = 2
-                    
-                    while errors and fix_rounds < max_fix_rounds:
-                        fix_rounds += 1
-                        typer.echo(f"[Validation found {len(errors)} errors. Auto-fixing... (Round {fix_rounds})]")
-                        
-                        fix_prompt = validator.generate_fix_prompt()
-                        messages.append({"role": "user", "content": fix_prompt})
-                        
-                        try:
-                            fix_response = await client.chat_completion_with_fallback(messages, default_model, fallback_models)
-                            fix_content = fix_response.get('choices', [{}])[0].get('message', {}).get('content', '').strip()
-                            fix_code_blocks = re.findall(r"```([a-zA-Z0-9]*)\n([\s\S]*?)```", fix_content)
-                            
-                            if fix_code_blocks:
-                                # Apply fixes
-                                for lang, code in fix_code_blocks:
-                                    # Determine file name from language or content
-                                    if lang.lower() in ['html', 'htm'] or 'html' in lang.lower():
-                                        file_name = 'index.html'
-                                    elif lang.lower() in ['js', 'javascript']:
-                                        # Check if HTML references a specific JS file name
-                                        js_ref = None
-                                        index_path = os.path.join(folder_name, 'index.html')
-                                        if os.path.exists(index_path):
-                                            with open(index_path, 'r') as f:
-                                                html_content = f.read()
-                                                script_match = re.search(r'<script[^>]+src=["\'](.*?\.js)["\']', html_content, re.IGNORECASE)
-                                                if script_match:
-                                                    js_ref = script_match.group(1)
-                                        
-                                        file_name = js_ref if js_ref else 'app.js'
-                                    elif lang.lower() == 'css':
-                                        # Check if HTML references a specific CSS file name
-                                        css_ref = None
-                                        index_path = os.path.join(folder_name, 'index.html')
-                                        if os.path.exists(index_path):
-                                            with open(index_path, 'r') as f:
-                                                html_content = f.read()
-                                                css_match = re.search(r'<link[^>]+href=["\'](.*?\.css)["\']', html_content, re.IGNORECASE)
-                                                if css_match:
-                                                    css_ref = css_match.group(1)
-                                        
-                                        file_name = css_ref if css_ref else 'style.css'
-                                    else:
-                                        # Try to find matching file by extension
-                                        ext = lang if lang else "txt"
-                                        matching_files = [f for f in os.listdir(folder_name) if f.endswith(f'.{ext}')]
-                                        if matching_files:
-                                            file_name = matching_files[0]
-                                        else:
-                                            continue
-                                    
-                                    file_path = os.path.join(folder_name, file_name)
-                                    # Create the file even if it doesn't exist
-                                    file_ops.write_file_atomic(file_path, code)
-                                
-                                # Re-validate after fixes
-                                validator = CodeValidator(folder_name)
-                                errors = validator.validate_all()
-                                
-                                if not errors:
-                                    typer.echo("[All errors fixed successfully!]")
-                                    break
-                            else:
-                                break
-                                
-                        except Exception as e:
-                            typer.echo(f"[Auto-fix error: {e}]")
-                            break
-                    
-                    if errors and fix_rounds >= max_fix_rounds:
-                        typer.echo(f"[Warning: {len(errors)} errors remain after {max_fix_rounds} fix attempts]")
-                        for error in errors[:5]:  # Show first 5 errors
-                            typer.echo(f"  • {error}")
-                    
+                                context.add("assistant", js_content, files=js_files)
+
                     typer.echo(f"[Files created in ./{folder_name}/]")
+                    background = asyncio.create_task(auto_fix(folder_name))
                 else:
                     typer.echo(content)
-                messages.append({"role": "assistant", "content": content})
+                    context.add("assistant", content)
             except APIError as e:
                 typer.echo(f"[API ERROR] {e}")
             except Exception as e:
                 typer.echo(f"[UNEXPECTED ERROR] {e}")
-    asyncio.run(run_agent())
+    try:
+        await run_agent()
+    finally:
+        if background is not None:
+            background.cancel()  # The session was interrupted mid-turn
+        if owns_resources:
+            await resources.aclose()
+
+
+@app.command()
+def daemon(
+    stop: bool = typer.Option(False, "--stop", help="Stop the running daemon"),
+    status: bool = typer.Option(False, "--status", help="Show whether a daemon is running")
+):
+    """Run in the background so `deep-code` starts instantly and keeps connections warm."""
+    import json
+    from deep_code.cli import client
+    from deep_code.cli.daemon import Daemon
+    from deep_code.core import config as core_config
+    path = client.socket_path()
+    if stop or status:
+        reply = client.request({"command": "stop" if stop else "status"}, path)
+        if reply is None:
+            typer.echo(f"[No daemon listening on {path}]")
+            raise typer.Exit(1)
+        typer.echo("[Daemon stopped]" if stop else json.dumps(reply["status"], indent=2))
+        return
+    if client.request({"command": "status"}, path) is not None:
+        typer.echo(f"[A daemon is already listening on {path}]")
+        raise typer.Exit(1)
+    daemon_cfg = core_config.load_config().get("daemon", {})
+    typer.echo(f"[deep-code daemon listening on {path}; stop it with Ctrl-C or 'deep-code daemon --stop']")
+    Daemon(path, keepalive=daemon_cfg.get("keepalive_seconds", 300.0)).run()
 
 
 @app.command()
@@ -352,12 +598,41 @@ def config(set: bool = typer.Option(False, help="Set configuration interactively
         typer.echo(cfg)
 
 
-def harmonize_file_names(file_map):
+def listed_file_names(content):
+    """Map code block index to a file name announced in a markdown list (e.g. "- `app.js`")"""
+    import re
+    file_names = {}
+    for line in content.splitlines():
+        match = re.match(r"[\*-]\s+`([^`]+)`", line.strip())
+        if match:
+            idx = len(file_names)
+            file_names[idx] = match.group(1)
+    return file_names
+
+
+def default_file_name(lang, idx, folder_name):
+    """Pick a file name for the idx-th code block when the reply did not name it"""
+    ext = lang if lang else "txt"
+    base = folder_name.replace('-', '_')
+    if ext in ["html", "htm"]:
+        return f"index.{ext}"
+    elif ext in ["js", "jsx", "ts", "tsx"]:
+        return f"app.{ext}"
+    elif ext in ["py", "sh", "bash"]:
+        return f"{base}.{ext}"
+    return f"{base}_file{idx+1}.{ext}"
+
+
+def harmonize_file_names(file_map, renames=None):
         """
         Rename files to match standard references if possible, and update all references in all files.
         E.g., if HTML references style.css but only to_do_list_file3.css exists, rename the file and update all references.
+        If a `renames` dict is given, it is filled with the applied {old_name: new_name} mapping.
         """
-        import re
+        from deep_code.operations import scanner
+        from deep_code.operations.file_index import FileIndex
+        from deep_code.operations.references import is_external, rename_references
+        from deep_code.operations.syntax_checker import strip_unmatched_closers
         # Standard names for common file types
         standard_names = {
             '.js': 'app.js',
@@ -368,25 +643,22 @@ def harmonize_file_names(file_map):
         references = {'js': set(), 'css': set(), 'img': set()}
         for fname, (lang, code) in file_map.items():
             if lang.lower() in ["html", "htm"]:
-                # <script src="..."></script>
-                for m in re.findall(r'<script src=["\']([^"\']+)["\']></script>', code):
-                    references['js'].add(m)
-                # <link href="..." rel="stylesheet">
-                for m in re.findall(r'<link href=["\']([^"\']+)["\'] rel="stylesheet">', code):
-                    references['css'].add(m)
-                # <img src="...">
-                for m in re.findall(r'<img src=["\']([^"\']+)["\']>', code):
-                    references['img'].add(m)
-        # Map extensions to actual files, and allow for extension normalization (e.g., .javascript -> .js)
-        ext_aliases = {'.javascript': '.js', '.js': '.js', '.css': '.css', '.html': '.html'}
+                table = scanner.scan(code, "html")
+                references['js'].update(table.values(scanner.SCRIPT_REF))
+                references['css'].update(table.values(scanner.STYLESHEET_REF))
+                references['img'].update(table.values(scanner.IMAGE_REF))
+        # Map extensions to actual files (.javascript files count as JS)
         ext_to_files = {}
         for ext in ['.js', '.css', '.html', '.javascript']:
             ext_to_files[ext] = [f for f in file_map if f.endswith(ext)]
         # For each type, if a standard or referenced name exists but the file is named differently or has a nonstandard extension, rename and update references
         rename_map = {}
-        # Also collect all referenced JS/CSS filenames from HTML (not just standard names)
-        referenced_js = list(references['js'])
-        referenced_css = list(references['css'])
+        # Also collect all referenced JS/CSS filenames from HTML (not just standard names),
+        # as project paths; CDN and other external references can't name a project file
+        referenced_js = [path for path in dict.fromkeys(FileIndex.resolve("", ref) for ref in references['js'] if not is_external(ref)) if path]
+        referenced_css = [path for path in dict.fromkeys(FileIndex.resolve("", ref) for ref in references['css'] if not is_external(ref)) if path]
+        # Renames that only apply to HTML script or stylesheet references
+        kind_renames = {}
         # JS: If only one JS file exists and a reference is found, rename to match the reference and update HTML reference to match the file name
         js_candidates = ext_to_files.get('.js', []) + ext_to_files.get('.javascript', [])
         if len(js_candidates) == 1 and referenced_js:
@@ -395,11 +667,8 @@ def harmonize_file_names(file_map):
                 if ref.endswith('.js'):
                     # Always rename the file to match the HTML reference
                     rename_map[old_name] = ref
-                    # Also update all HTML code to reference the new file name
-                    for fname, (lang, code) in file_map.items():
-                        if lang.lower() in ["html", "htm"]:
-                            code = code.replace(old_name, ref).replace('app.js', ref)
-                            file_map[fname] = (lang, code)
+                    # Script references to the default name point at it too
+                    kind_renames[scanner.SCRIPT_REF] = {'app.js': ref}
                     break
         # CSS: If only one CSS file exists and a reference is found, rename to match the reference and update HTML reference to match the file name
         css_candidates = ext_to_files.get('.css', [])
@@ -408,43 +677,36 @@ def harmonize_file_names(file_map):
             for ref in referenced_css:
                 if ref.endswith('.css'):
                     rename_map[old_name] = ref
-                    for fname, (lang, code) in file_map.items():
-                        if lang.lower() in ["html", "htm"]:
-                            code = code.replace(old_name, ref).replace('style.css', ref)
-                            file_map[fname] = (lang, code)
+                    kind_renames[scanner.STYLESHEET_REF] = {'style.css': ref}
                     break
-        # Standard names fallback (as before)
+        # Standard names fallback, only for a lone file nothing references: a rename
+        # to match a reference above always wins
+        referenced_paths = set(referenced_js) | set(referenced_css)
         for ext, std_name in standard_names.items():
             candidates = ext_to_files.get(ext, [])
             if ext == '.js':
-                candidates += ext_to_files.get('.javascript', [])
-            if std_name not in file_map and len(candidates) == 1:
-                referenced = False
-                if ext == '.js' and std_name in references['js']:
-                    referenced = True
-                if ext == '.css' and std_name in references['css']:
-                    referenced = True
-                if ext == '.html':
-                    referenced = True  # Always prefer index.html for html
-                if referenced or ext != '.html':
-                    old_name = candidates[0]
-                    # Normalize extension if needed
-                    if ext == '.js' and old_name.endswith('.javascript'):
-                        rename_map[old_name] = std_name
-                    else:
-                        rename_map[old_name] = std_name
-        # Apply renames and update all references in all files
+                candidates = candidates + ext_to_files.get('.javascript', [])
+            if std_name in file_map or len(candidates) != 1:
+                continue
+            old_name = candidates[0]
+            if old_name not in rename_map and old_name not in referenced_paths:
+                rename_map[old_name] = std_name
+        # Apply renames and update the references to renamed files, one pass per file
+        rename_map = {old: new for old, new in rename_map.items() if old != new}
         new_file_map = {}
         for fname, (lang, code) in file_map.items():
-            # Update references in code
-            for old, new in rename_map.items():
-                code = code.replace(old, new)
+            language = scanner.language_of(fname, lang)
+            code = rename_references(
+                code, language, fname, rename_map, kind_renames if language == "html" else None
+            )
             new_name = rename_map.get(fname, fname)
             # JS syntax fix: remove unmatched closing braces at end
             if new_name.endswith('.js'):
                 # Remove extra closing braces at end
-                code = re.sub(r'(\}\s*)+$', '', code)
+                code = strip_unmatched_closers(code)
             new_file_map[new_name] = (lang, code)
+        if renames is not None:
+            renames.update(rename_map)
         return new_file_map
 
 
@@ -453,120 +715,92 @@ def cross_file_dependency_fix(file_map):
     file_map: dict of {filename: (lang, code)}
     Returns: dict of {filename: corrected_code}
     """
-    import re
+    import sys
+    from deep_code.operations import scanner
+    from deep_code.operations.file_index import FileIndex
+    from deep_code.operations.references import ReferenceResolver, is_external, relative_ref, split_suffix
     corrected = {}
-    all_files = set(file_map.keys())
+    # Built once and shared by every fixer below
+    resolver = ReferenceResolver(file_map)
+    kind_exts = {
+        scanner.SCRIPT_REF: ('.js',),
+        scanner.STYLESHEET_REF: ('.css',),
+        scanner.IMAGE_REF: ('.png', '.jpg', '.jpeg', '.gif', '.svg'),
+        scanner.IMPORT: ('.js', '.mjs', '.cjs', '.jsx', '.ts', '.tsx', '.json', '.css'),
+    }
+
+    def target_of(ref, fname):
+        """Project path `ref` points at; None for external references"""
+        if not ref or is_external(ref) or ref.startswith('#'):
+            return None
+        return FileIndex.resolve(fname, split_suffix(ref)[0])
+
+    def respell(ref, fname, match):
+        """`ref` pointed at `match`, spelled relative to `fname` like the original"""
+        path, suffix = split_suffix(ref)
+        return relative_ref(path, fname, match) + suffix
 
-    # --- Registry of fixer functions ---
-    def html_fixer(fname, lang, code, all_files):
-        # Helper: get all files by extension
-        def files_by_ext(ext):
-            return [f for f in all_files if f.lower().endswith(ext)]
+    def path_fix(symbol, fname, exts=None):
+        target = target_of(symbol.value, fname)
+        if target is None or target in resolver:
+            return None
+        match = resolver.near_match(target, exts)
+        return respell(symbol.value, fname, match) if match else None
+
+    # --- Registry of fixer functions: each maps a symbol to its corrected value (None keeps it) ---
+    def html_fixer(symbol, fname):
         # Fix <script src>, <link href>, <img src>
-        def fix_script_src(match):
-            src = match.group(1)
-            if src not in all_files:
-                # Try to find a close match (e.g., missing extension)
-                for f in all_files:
-                    if f.startswith(src.split(".")[0]):
-                        return f'<script src="{f}"></script>'
-                # Always use the only JS file if there is just one
-                js_files = files_by_ext('.js')
-                if len(js_files) == 1:
-                    return f'<script src="{js_files[0]}"></script>'
-            return f'<script src="{src}"></script>'
-        code = re.sub(r'<script src=["\']([^"\']+)["\']></script>', fix_script_src, code)
-        def fix_link_href(match):
-            href = match.group(1)
-            if href not in all_files:
-                for f in all_files:
-                    if f.startswith(href.split(".")[0]):
-                        return f'<link href="{f}" rel="stylesheet">'
-                # Always use the only CSS file if there is just one
-                css_files = files_by_ext('.css')
-                if len(css_files) == 1:
-                    return f'<link href="{css_files[0]}" rel="stylesheet">'
-            return f'<link href="{href}" rel="stylesheet">'
-        code = re.sub(r'<link href=["\']([^"\']+)["\'] rel="stylesheet">', fix_link_href, code)
-        def fix_img_src(match):
-            src = match.group(1)
-            if src not in all_files:
-                for f in all_files:
-                    if f.startswith(src.split(".")[0]):
-                        return f'<img src="{f}">' 
-                # Always use the only image file if there is just one
-                img_files = [f for f in all_files if f.lower().endswith(('.png','.jpg','.jpeg','.gif','.svg'))]
-                if len(img_files) == 1:
-                    return f'<img src="{img_files[0]}">' 
-            return f'<img src="{src}">' 
-        code = re.sub(r'<img src=["\']([^"\']+)["\']>', fix_img_src, code)
-        return code
-
-    def js_fixer(fname, lang, code, all_files):
+        target = target_of(symbol.value, fname)
+        if target is None or target in resolver:
+            return None
+        exts = kind_exts[symbol.kind]
+        match = resolver.near_match(target, exts)
+        if match is None:
+            # Use the only file of the right type if there is just one
+            only = resolver.with_ext(*exts)
+            match = only[0] if len(only) == 1 else None
+        return respell(symbol.value, fname, match) if match else None
+
+    def js_fixer(symbol, fname):
         # Fix import ... from '...'
-        def fix_import(match):
-            imp = match.group(1)
-            if imp not in all_files:
-                for f in all_files:
-                    if f.startswith(imp.split(".")[0]):
-                        return f"import ... from './{f}'"
-            return match.group(0)
-        code = re.sub(r"import [^;]+ from ['\"](.+?)['\"]", fix_import, code)
-        return code
-
-    def py_fixer(fname, lang, code, all_files):
+        target = target_of(symbol.value, fname)
+        if target is not None and target + '.js' in resolver:
+            return None  # Extensionless import of an existing module
+        fixed = path_fix(symbol, fname, kind_exts[scanner.IMPORT])
+        if fixed is None or fixed.startswith(('.', '/')):
+            return fixed
+        return f"./{fixed}"  # Bare names are packages, not files
+
+    def py_fixer(symbol, fname):
         # Fix import ...
-        def fix_py_import(match):
-            mod = match.group(1)
-            for f in all_files:
-                if f.startswith(mod) and f.endswith('.py'):
-                    return f"import {f[:-3]}"
-            return match.group(0)
-        code = re.sub(r"import ([a-zA-Z0-9_]+)", fix_py_import, code)
-        return code
-
-    def css_fixer(fname, lang, code, all_files):
-        # Fix url('...')
-        def fix_css_url(match):
-            url = match.group(1)
-            if url not in all_files:
-                for f in all_files:
-                    if f.startswith(url.split(".")[0]):
-                        return f"url('{f}')"
-            return match.group(0)
-        code = re.sub(r"url\(['\"]?([^'\")]+)['\"]?\)", fix_css_url, code)
-        return code
-
-    def bash_fixer(fname, lang, code, all_files):
-        # Fix source ... or ./...
-        def fix_source(match):
-            src = match.group(1)
-            if src not in all_files:
-                for f in all_files:
-                    if f.startswith(src.split(".")[0]):
-                        return f"source {f}"
-            return match.group(0)
-        code = re.sub(r"source ([^\s]+)", fix_source, code)
-        return code
-
-    # Registry: lang -> fixer
+        module = symbol.value.replace('.', '/')
+        if symbol.value.startswith('.') or f"{module}.py" in resolver or f"{module}/__init__.py" in resolver:
+            return None
+        if symbol.value.split('.')[0] in getattr(sys, 'stdlib_module_names', ()):
+            return None
+        match = resolver.near_match(module, ('.py',))
+        return match[:-3].replace('/', '.') if match else None
+
+    def path_fixer(symbol, fname):
+        # Fix url('...') in CSS and source ... in shell scripts
+        return path_fix(symbol, fname)
+
+    # Registry: language -> (symbol kinds to fix, fixer)
     fixers = {
-        "html": html_fixer,
-        "htm": html_fixer,
-        "js": js_fixer,
-        "jsx": js_fixer,
-        "ts": js_fixer,
-        "tsx": js_fixer,
-        "py": py_fixer,
-        "css": css_fixer,
-        "bash": bash_fixer,
-        "sh": bash_fixer,
+        "html": ((scanner.SCRIPT_REF, scanner.STYLESHEET_REF, scanner.IMAGE_REF), html_fixer),
+        "js": ((scanner.IMPORT,), js_fixer),
+        "py": ((scanner.PY_IMPORT,), py_fixer),
+        "css": ((scanner.CSS_URL,), path_fixer),
+        "sh": ((scanner.SOURCE,), path_fixer),
     }
 
     for fname, (lang, code) in file_map.items():
-        fixer = fixers.get(lang.lower())
-        if fixer:
-            corrected[fname] = fixer(fname, lang, code, all_files)
+        language = scanner.language_of(fname, lang)
+        if language in fixers:
+            kinds, fixer = fixers[language]
+            corrected[fname] = scanner.rewrite(
+                code, scanner.scan(code, language).of(*kinds), lambda symbol: fixer(symbol, fname)
+            )
         else:
             corrected[fname] = code
     return corrected
@@ -574,66 +808,56 @@ def cross_file_dependency_fix(file_map):
 
 def harmonize_selectors(file_map):
     """
-    Cross-checks selectors (IDs/classes) used in JS against HTML, and auto-fixes mismatches.
-    - If JS references an ID/class not present in HTML, inject it into the HTML (on <body>).
+    Cross-checks element ids looked up in JS against HTML, and auto-fixes mismatches.
+    - If JS looks up an id (getElementById('x') or querySelector('#x')) that no HTML
+      element has and the JS doesn't create itself, inject it into the HTML (before </body>).
+    - Classes are never injected: JS usually adds them at runtime (classList, createElement),
+      and a class token of a compound selector doesn't name one element.
     - If HTML has IDs/classes not used in JS, leave them (harmless).
+    file_map values may be plain code or (lang, code) pairs; the result has the same shape.
     """
     import re
-    from collections import defaultdict
-    # 1. Collect all HTML IDs/classes
+    from deep_code.operations import scanner
+
+    def code_of(value):
+        return value[1] if isinstance(value, tuple) else value
+
+    # Ids JS gives elements itself: el.id = 'x', setAttribute('id', 'x'), id="x" in markup strings
+    assigned_id = re.compile(r"""\bid\s*=\s*\\?["'`]([\w-]+)|setAttribute\(\s*["']id["']\s*,\s*["'`]([\w-]+)""")
+
+    def looked_up_ids(code):
+        """Ids the code looks up as a whole selector, minus those it assigns"""
+        ids = set()
+        for symbol in scanner.scan(code, "js").of(scanner.JS_ID):
+            before, after = code[symbol.start - 2:symbol.start], code[symbol.end:symbol.end + 1]
+            by_id = before[-1:] in ("'", '"', "`")  # getElementById('x')
+            by_selector = before[-1:] == "#" and before[:1] in ("'", '"', "`")  # querySelector('#x')
+            if (by_id or by_selector) and after in ("'", '"', "`") and re.fullmatch(r"[\w-]+", symbol.value):
+                ids.add(symbol.value)
+        assigned = {match.group(1) or match.group(2) for match in assigned_id.finditer(code)}
+        return ids - assigned
+
+    # 1. Collect all HTML IDs
     html_ids = set()
-    html_classes = set()
-    html_files = [f for f in file_map if f.lower().endswith('.html')]
+    html_files = [f for f in file_map if f.lower().endswith(('.html', '.htm'))]
     for fname in html_files:
-        code = file_map[fname][1]
-        html_ids.update(re.findall(r'id=["\']([\w\-]+)["\']', code))
-        html_classes.update(re.findall(r'class=["\']([\w\- ]+)["\']', code))
-    # 2. Collect all JS selector usages
-    js_files = [f for f in file_map if f.lower().endswith('.js')]
+        html_ids.update(scanner.scan(code_of(file_map[fname]), "html").values(scanner.ID))
+    # 2. Collect the ids JS looks up
     js_ids = set()
-    js_classes = set()
-    id_patterns = [
-        r'getElementById\(["\']([\w\-]+)["\']\)',
-        r'querySelector\(["\']#([\w\-]+)["\']\)',
-        r'getElementById\s*\(["\']([\w\-]+)["\']\)',
-        r'getElementsByName\(["\']([\w\-]+)["\']\)',
-    ]
-    class_patterns = [
-        r'getElementsByClassName\(["\']([\w\-]+)["\']\)',
-        r'querySelector\(["\']\\.([\w\-]+)["\']\)',
-        r'querySelectorAll\(["\']\\.([\w\-]+)["\']\)',
-    ]
-    for fname in js_files:
-        code = file_map[fname][1]
-        for pat in id_patterns:
-            js_ids.update(re.findall(pat, code))
-        for pat in class_patterns:
-            js_classes.update(re.findall(pat, code))
-    # 3. Find missing IDs/classes in HTML
+    for fname in file_map:
+        if scanner.language_of(fname) == "js":
+            js_ids.update(looked_up_ids(code_of(file_map[fname])))
+    # 3. Find missing IDs in HTML
     missing_ids = js_ids - html_ids
-    missing_classes = js_classes - html_classes
-    if not missing_ids and not missing_classes:
+    if not missing_ids:
         return file_map  # Nothing to fix
-    # 4. Inject missing IDs/classes into HTML (on <body> tag)
+    # 4. Inject missing IDs into HTML as empty divs before </body>
+    inject = ''.join(f'\n    <div id="{mid}"></div>' for mid in sorted(missing_ids)) + '\n'
     new_file_map = dict(file_map)
     for fname in html_files:
-        lang, code = file_map[fname]
-        # Add missing IDs
-        if missing_ids:
-            def inject_ids(match):
-                tag = match.group(0)
-                # Add all missing IDs as <div id="..."></div> before </body>
-                inject = ''.join([f'\n    <div id="{mid}"></div>' for mid in missing_ids])
-                return tag + inject
-            code = re.sub(r'(</body>)', inject_ids, code, count=1)
-        # Add missing classes
-        if missing_classes:
-            def inject_classes(match):
-                tag = match.group(0)
-                inject = ''.join([f'\n    <div class="{mc}"></div>' for mc in missing_classes])
-                return tag + inject
-            code = re.sub(r'(</body>)', inject_classes, code, count=1)
-        new_file_map[fname] = (lang, code)
+        value = file_map[fname]
+        code = re.sub(r'</body>', lambda match: inject + match.group(0), code_of(value), count=1, flags=re.IGNORECASE)
+        new_file_map[fname] = (value[0], code) if isinstance(value, tuple) else code
     return new_file_map
 
 
@@ -0,0 +1,83 @@
+import copy
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+
+class SessionResources:
+    """What a chat session needs that is worth keeping between sessions.
+
+    A session run in-process makes its own and closes it when it ends. The
+    daemon keeps one for its lifetime, so each session after the first
+    starts with the config already parsed, API connections already open
+    and validator caches already filled.
+    """
+
+    def __init__(self, keepalive: Optional[float] = None):
+        self.keepalive = keepalive  # Idle API connection lifetime; None keeps the client default
+        self._config: Optional[Tuple[Any, Dict[str, Any]]] = None  # (config file stat, config)
+        self._clients: Dict[str, Any] = {}
+        self._validators: Dict[Tuple, Any] = {}
+
+    def config(self) -> Dict[str, Any]:
+        """The parsed config, re-read only when the config file changed"""
+        from deep_code.core import config as core_config
+        try:
+            stat = core_config.CONFIG_PATH.stat()
+            key = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            key = None
+        if self._config is None or self._config[0] != key:
+            self._config = (key, core_config.load_config())
+        return copy.deepcopy(self._config[1])
+
+    def client(self, cfg: Dict[str, Any], no_cache: bool = False, replay: bool = False, cache: bool = False):
+        """The API client for these settings, with its connection pool and rate-limit state.
+
+        `cache` turns the response cache on and `no_cache` off, whatever the config says.
+        """
+        from deep_code.models.groq_client import GroqClient
+        from deep_code.models.response_cache import ResponseCache
+        api_cfg = cfg["api"]
+        cache_enabled = False if no_cache else (True if cache else None)
+        key = json.dumps([api_cfg, cfg.get("cache"), cache_enabled, replay, self.keepalive], sort_keys=True, default=str)
+        client = self._clients.get(key)
+        if client is None:
+            options = {} if self.keepalive is None else {"keepalive": self.keepalive}
+            client = self._clients[key] = GroqClient(
+                api_cfg["key"],
+                base_url=api_cfg.get("base_url"),
+                timeout=api_cfg.get("timeout", 120.0),
+                rate_limits=api_cfg.get("rate_limits"),
+                max_cooldown_wait=api_cfg.get("max_cooldown_wait", 60.0),
+                hedge=api_cfg.get("hedge"),
+                cache=ResponseCache.from_config(cfg.get("cache"), enabled=cache_enabled, replay=replay),
+                **options
+            )
+        return client
+
+    def validator(self, folder_name: str, cfg: Dict[str, Any]):
+        """The validator for a project folder; it only rechecks what changed since its last run"""
+        from deep_code.operations.code_validator import CodeValidator
+        validation_cfg = cfg.get("validation", {})
+        max_errors = validation_cfg.get("max_errors_per_type", 20)
+        workers = validation_cfg.get("workers", 0)
+        folder = os.path.abspath(folder_name)
+        key = (folder, max_errors, workers)
+        validator = self._validators.get(key)
+        if validator is None:
+            validator = self._validators[key] = CodeValidator(
+                folder, max_errors_per_type=max_errors, workers=workers
+            )
+        return validator
+
+    def status(self) -> Dict[str, int]:
+        return {"clients": len(self._clients), "validators": len(self._validators)}
+
+    async def aclose(self):
+        for validator in self._validators.values():
+            validator.close()
+        self._validators.clear()
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
@@ -14,13 +14,46 @@ DEFAULT_CONFIG = {
             "llama-3.3-70b-versatile",
             "meta-llama/llama-4-maverick-17b-128e-instruct",
             "meta-llama/llama-4-scout-17b-16e-instruct"
-        ]
+        ],
+        "stream": True,
+        "hedge": {
+            "enabled": False,
+            "percentile": 0.95,
+            "default_delay": 15.0,
+            "min_delay": 1.0,
+            "min_samples": 10
+        }
+    },
+    "context": {
+        "token_budget": None,  # None: as much as the smallest context window of the models allows
+        "keep_recent_messages": 6,
+        "workspace_snapshot": True,
+        "snapshot_token_budget": 16000  # Separate from token_budget, which covers the history
+    },
+    "validation": {
+        "max_errors_per_type": 20,
+        "workers": 0  # 0: one per CPU, 1: no worker pools
+    },
+    "auto_fix": {
+        "max_rounds": 2,
+        "max_parallel": 4,
+        "max_errors_per_file": 10
+    },
+    "cache": {
+        "enabled": False,  # Opt in (or pass --cache) to reuse replies to identical requests
+        "ttl_seconds": 86400,
+        "max_bytes": 104857600
     },
     "editor": {
         "auto_save": True,
         "backup_count": 5,
+        "fsync_writes": False,
+        "compress_snapshots": True,
         "syntax_highlighting": True
     },
+    "daemon": {
+        "keepalive_seconds": 300.0  # How long idle API connections stay open between sessions
+    },
     "git": {
         "auto_commit": False,
         "commit_prefix": "ai-code:",
@@ -35,8 +68,8 @@ DEFAULT_CONFIG = {
 
 def load_config() -> Dict[str, Any]:
     if CONFIG_PATH.exists():
-        with open(CONFIG_PATH, "r") as f:
-            return yaml.safe_load(f)
+        from deep_code.operations.file_ops import read_file_safe
+        return yaml.safe_load(read_file_safe(str(CONFIG_PATH)))
     return DEFAULT_CONFIG
 
 def save_config(config: Dict[str, Any]):
@@ -0,0 +1,261 @@
+import itertools
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from deep_code.models.rate_limiter import estimate_tokens
+
+CODE_BLOCK = re.compile(r"```([a-zA-Z0-9]*)\n([\s\S]*?)```")
+SUMMARY_HEADER = "Summary of earlier conversation:"
+SUPERSEDED_MARKER = "[superseded by a later version of"
+WORKSPACE_MARKER = "[current version in workspace snapshot:"
+WORKSPACE_HEADER = "Workspace snapshot: the current version of every project file. Earlier versions are omitted from the conversation."
+SNAPSHOT_OMITTED = "[too large for the workspace snapshot: the current version is in the conversation above]"
+# Longest excerpt of a message kept in a summary line
+SUMMARY_EXCERPT_CHARS = 160
+# Summary lines kept when summaries are folded into each other
+MAX_SUMMARY_LINES = 40
+# Most tokens of a request's context window kept free for the reply
+REPLY_RESERVE_TOKENS = 8192
+
+
+def history_budget(context_window: int, snapshot_budget: int) -> int:
+    """A history token budget that leaves room in `context_window` for the snapshot and the reply"""
+    reserve = min(REPLY_RESERVE_TOKENS, context_window // 4)
+    return max(context_window // 4, context_window - snapshot_budget - reserve)
+
+
+class ContextEntry:
+    """A chat message plus the bookkeeping needed to compact it"""
+
+    def __init__(self, message: Dict[str, Any], files: Optional[List[str]] = None, pinned: bool = False):
+        self.message = message
+        # File written from each code block of the message, in block order (None if not saved)
+        self.files = list(files or [])
+        self.pinned = pinned
+        self.tokens = estimate_tokens([message])
+
+    def set_content(self, content: str):
+        self.message = dict(self.message, content=content)
+        self.tokens = estimate_tokens([self.message])
+
+
+class ConversationContext:
+    """Chat history kept under a token budget.
+
+    Tracks an estimated token count per message and compacts automatically
+    when the budget is exceeded: code blocks for files that were later
+    rewritten are replaced by a stub, and old turns are folded into a
+    summary that still carries the latest version of every file.
+
+    With `workspace_snapshot` on, requests are assembled cache-friendly:
+    the system prompt and pinned context come first in a fixed order, the
+    append-only history follows with saved file bodies left out, and one
+    snapshot of the current project files is placed before the latest
+    user message.
+
+    The budget covers the history only, since compaction can't shrink the
+    snapshot; the snapshot has its own `snapshot_budget`. When the files
+    outgrow it, the largest ones move out of the snapshot: their current
+    version fills the newest history block that was stubbed for them, so
+    no file's content is ever left out of the request.
+    """
+
+    def __init__(self, system_prompt: str, token_budget: int = 4000, keep_recent: int = 6,
+                 workspace_snapshot: bool = True, snapshot_budget: int = 16000):
+        self.token_budget = token_budget
+        self.snapshot_budget = snapshot_budget
+        self.keep_recent = keep_recent
+        self.workspace_snapshot = workspace_snapshot
+        self.entries = [ContextEntry({"role": "system", "content": system_prompt}, pinned=True)]
+        self.project: Optional[str] = None
+        self.workspace: Dict[str, str] = {}
+
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        """Messages in the shape the chat completion API expects"""
+        history = [entry.message for entry in self.entries]
+        if not (self.workspace_snapshot and self.workspace):
+            return history
+        stubs = self._workspace_stubs()
+        omitted = self._omitted_files(stubs)
+        filled: Dict[int, Dict[int, str]] = {}
+        for name in omitted:
+            entry_index, block_index = stubs[name]
+            filled.setdefault(entry_index, {})[block_index] = self.workspace[name]
+        for entry_index, bodies in filled.items():
+            history[entry_index] = dict(history[entry_index], content=self._fill_blocks(history[entry_index]["content"], bodies))
+        snapshot = self._snapshot_message(omitted)
+        insert_at = len(history) - 1 if history[-1]["role"] == "user" else len(history)
+        insert_at = max(insert_at, self._pinned_count())
+        return history[:insert_at] + [snapshot] + history[insert_at:]
+
+    @property
+    def history_tokens(self) -> int:
+        """Tokens of the messages compaction can shrink: everything but the snapshot"""
+        return sum(entry.tokens for entry in self.entries)
+
+    @property
+    def total_tokens(self) -> int:
+        return estimate_tokens(self.messages)
+
+    def pin(self, content: str):
+        """Add context that always stays in the request prefix, after earlier pinned context"""
+        self.entries.insert(self._pinned_count(), ContextEntry({"role": "system", "content": content}, pinned=True))
+
+    def open_project(self, folder: str):
+        """Make `folder` the project the workspace snapshot describes"""
+        if folder != self.project:
+            self.project = folder
+            self.workspace = {}
+
+    def set_file(self, name: str, content: str):
+        """Record the version of `name` now on disk"""
+        self.workspace[name] = content
+
+    def remove_file(self, name: str):
+        self.workspace.pop(name, None)
+
+    def add(self, role: str, content: str, files: Optional[List[str]] = None):
+        """Append a message; `files` names the file each of its code blocks was saved as"""
+        entry = ContextEntry({"role": role, "content": content}, files)
+        if self.workspace_snapshot and any(entry.files):
+            # The snapshot carries the saved files, so the history doesn't need their bodies
+            named = {idx for idx, name in enumerate(entry.files) if name}
+            entry.set_content(self._stub_blocks(entry, named, WORKSPACE_MARKER))
+        self.entries.append(entry)
+        if self.history_tokens > self.token_budget:
+            self.compact()
+
+    def _pinned_count(self) -> int:
+        count = 0
+        while count < len(self.entries) and self.entries[count].pinned:
+            count += 1
+        return count
+
+    def _workspace_stubs(self) -> Dict[str, Tuple[int, int]]:
+        """(entry index, block index) of the newest history block stubbed for each file"""
+        stubs = {}
+        for entry_index, entry in enumerate(self.entries):
+            if not entry.files:
+                continue
+            for block_index, match in enumerate(CODE_BLOCK.finditer(entry.message["content"])):
+                if block_index >= len(entry.files):
+                    break
+                name = entry.files[block_index]
+                if name and WORKSPACE_MARKER in match.group(2):
+                    stubs[name] = (entry_index, block_index)
+        return stubs
+
+    def _omitted_files(self, stubs: Dict[str, Tuple[int, int]]) -> set:
+        """Files left out of the snapshot to keep it within budget, largest first.
+
+        Only files with a stubbed history block qualify, since that is where
+        their content goes instead; ties go by name, so the choice is stable.
+        """
+        sizes = {name: estimate_tokens([{"content": content}]) for name, content in self.workspace.items()}
+        omitted = set()
+        total = sum(sizes.values())
+        for name in sorted(sizes, key=lambda name: (-sizes[name], name)):
+            if total <= self.snapshot_budget:
+                break
+            if name in stubs:
+                omitted.add(name)
+                total -= sizes[name]
+        return omitted
+
+    @staticmethod
+    def _fill_blocks(content: str, bodies: Dict[int, str]) -> str:
+        """Put {block index: body} back into the stubbed code blocks of `content`"""
+        counter = itertools.count()
+
+        def fill(match):
+            idx = next(counter)
+            if idx not in bodies:
+                return match.group(0)
+            return f"```{match.group(1)}\n{bodies[idx]}\n```"
+        return CODE_BLOCK.sub(fill, content)
+
+    def _snapshot_message(self, omitted: set) -> Dict[str, Any]:
+        parts = [WORKSPACE_HEADER]
+        # Sorted so an unchanged workspace always renders identically
+        for name in sorted(self.workspace):
+            lang = name.rsplit(".", 1)[-1] if "." in name else ""
+            body = SNAPSHOT_OMITTED if name in omitted else self.workspace[name]
+            parts.append(f"{name}:\n```{lang}\n{body}\n```")
+        return {"role": "system", "content": "\n\n".join(parts)}
+
+    def compact(self, force: bool = False) -> Tuple[int, int]:
+        """Shrink the history, returning the (before, after) token estimates.
+
+        Superseded file bodies are always dropped; old turns are summarised
+        only when still over budget, or when `force` is set (/compact).
+        """
+        before = self.total_tokens
+        self._drop_superseded_files()
+        if force or self.history_tokens > self.token_budget:
+            self._summarise_old_turns()
+        return before, self.total_tokens
+
+    def _drop_superseded_files(self):
+        """Replace every code block but the newest one per file with a short stub"""
+        seen = set()
+        for entry in reversed(self.entries):
+            if not entry.files:
+                continue
+            blocks = list(CODE_BLOCK.finditer(entry.message["content"]))
+            stale = set()
+            for idx in reversed(range(min(len(blocks), len(entry.files)))):
+                name = entry.files[idx]
+                if name is None:
+                    continue
+                if name in seen:
+                    stale.add(idx)
+                seen.add(name)
+            if stale:
+                entry.set_content(self._stub_blocks(entry, stale, SUPERSEDED_MARKER))
+
+    def _stub_blocks(self, entry: ContextEntry, indexes: set, marker: str) -> str:
+        """Replace the bodies of the code blocks at `indexes` with a marker naming their file"""
+        counter = itertools.count()
+
+        def stub(match):
+            idx = next(counter)
+            if idx not in indexes:
+                return match.group(0)
+            return f"```{match.group(1)}\n{marker} {entry.files[idx]}]\n```"
+        return CODE_BLOCK.sub(stub, entry.message["content"])
+
+    def _summarise_old_turns(self):
+        """Fold everything but the pinned prefix and the most recent messages into one summary"""
+        movable = [i for i, entry in enumerate(self.entries) if not entry.pinned]
+        old = movable[:-self.keep_recent] if self.keep_recent else movable
+        if not old:
+            return
+        lines = []
+        latest_files = {}
+        for i in old:
+            entry = self.entries[i]
+            content = entry.message["content"]
+            if content.startswith(SUMMARY_HEADER):
+                summary_body = CODE_BLOCK.split(content)[0]
+                lines.extend(line for line in summary_body.splitlines()[1:] if line.startswith("- "))
+            elif any(entry.files):
+                written = [name for name in dict.fromkeys(entry.files) if name]
+                lines.append(f"- Assistant wrote: {', '.join(written)}")
+            else:
+                excerpt = " ".join(content.split())[:SUMMARY_EXCERPT_CHARS]
+                lines.append(f"- {entry.message['role'].capitalize()}: {excerpt}")
+            # Carry over the latest version of each file the folded turns produced
+            for idx, match in enumerate(CODE_BLOCK.finditer(content)):
+                body = match.group(2)
+                if idx < len(entry.files) and entry.files[idx] and SUPERSEDED_MARKER not in body and WORKSPACE_MARKER not in body:
+                    latest_files[entry.files[idx]] = match
+        summary = SUMMARY_HEADER + "\n" + "\n".join(lines[-MAX_SUMMARY_LINES:])
+        files = []
+        for name, match in latest_files.items():
+            summary += f"\n\nLatest version of {name}:\n{match.group(0)}"
+            files.append(name)
+        summary_entry = ContextEntry({"role": "system", "content": summary}, files)
+        folded = set(old)
+        self.entries = [e for i, e in enumerate(self.entries) if i not in folded]
+        self.entries.insert(old[0], summary_entry)
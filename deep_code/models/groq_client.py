@@ -1,5 +1,14 @@
+import asyncio
 import httpx
-from typing import Any, Dict, List, Optional
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from deep_code.models.latency import LatencyTracker
+from deep_code.models.rate_limiter import (
+    CHARS_PER_TOKEN, CooldownTable, RateLimiter, estimate_tokens, retry_after_from_headers
+)
+from deep_code.models.response_cache import CacheMissError, ResponseCache, request_key
 
 GROQ_CONFIG = {
     "base_url": "https://api.groq.com/openai/v1",
@@ -9,55 +18,277 @@ GROQ_CONFIG = {
     }
 }
 
+# Context window (tokens, prompt and reply together) of the models deep-code is set up for
+CONTEXT_WINDOWS = {
+    "deepseek-r1-distill-llama-70b": 131072,
+    "llama-3.3-70b-versatile": 131072,
+    "meta-llama/llama-4-maverick-17b-128e-instruct": 131072,
+    "meta-llama/llama-4-scout-17b-16e-instruct": 131072,
+}
+# Assumed for models not listed above
+DEFAULT_CONTEXT_WINDOW = 8192
+
+
+def context_window(model: str) -> int:
+    """Tokens one request to `model` may use, prompt and reply together"""
+    return CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
 class APIError(Exception):
     """API-related errors"""
     pass
 
+class RateLimitError(APIError):
+    """429 from the API, with the server's hint of when to retry (seconds, if given)"""
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
 class GroqClient:
-    def __init__(self, api_key: str, base_url: Optional[str] = None):
+    def __init__(self, api_key: str, base_url: Optional[str] = None, rate_limits: Optional[Dict[str, int]] = None,
+                 max_cooldown_wait: float = 60.0, hedge: Optional[Dict[str, Any]] = None,
+                 cache: Optional[ResponseCache] = None, timeout: float = 120.0, keepalive: float = 5.0):
         self.api_key = api_key
         self.base_url = base_url or GROQ_CONFIG["base_url"]
         self.session = httpx.AsyncClient(
             base_url=self.base_url,
             headers={"Authorization": f"Bearer {self.api_key}"},
-            timeout=120.0  # 2 minute timeout
+            timeout=timeout,  # 2 minute timeout by default
+            # How long idle connections stay open for reuse (longer in the daemon)
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=keepalive)
         )
-        self.rate_limited_models = set()  # Track models that are rate limited
+        self.cooldowns = CooldownTable()  # Track models that are rate limited, and until when
+        # Longest we will sleep for a model to recover when every model is cooling down
+        self.max_cooldown_wait = max_cooldown_wait
+        # Client-side budget so calls wait briefly instead of hitting 429s
+        self.rate_limiter = RateLimiter.from_config(
+            GROQ_CONFIG["rate_limits"] if rate_limits is None else rate_limits
+        )
+        # Opt-in hedging: race a fallback model when the primary misses its deadline
+        self.hedge = hedge if hedge and hedge.get("enabled") else None
+        self.latency = LatencyTracker()  # Full completion latency per model
+        self.first_token_latency = LatencyTracker()  # Time to first streamed delta per model
+        self.cache = cache  # Optional on-disk response cache
+
+    async def aclose(self):
+        await self.session.aclose()
+
+    @property
+    def rate_limited_models(self) -> set:
+        """Models currently cooling down after a 429"""
+        return self.cooldowns.cooling_models()
+
+    async def _wait_for_model(self, models_to_try: List[str]):
+        """Sleep until the soonest-recovering model is usable, or give up"""
+        model = self.cooldowns.soonest(models_to_try)
+        wait = self.cooldowns.remaining(model)
+        if wait > self.max_cooldown_wait:
+            raise APIError("All available models are rate limited. Please wait a few minutes and try again.")
+        print(f"[Rate limited] Waiting {wait:.1f}s for {model} to recover...")
+        await asyncio.sleep(wait)
+
+    def latency_histograms(self) -> Dict[str, Dict[str, int]]:
+        """Per-model histograms of completion latency"""
+        return self.latency.histograms()
+
+    def hedge_delay(self, model: str, tracker: Optional[LatencyTracker] = None) -> float:
+        """Seconds to wait on `model` before hedging: its recent p95 (configurable), once known"""
+        tracker = tracker or self.latency
+        delay = self.hedge.get("default_delay", 15.0)
+        if tracker.count(model) >= self.hedge.get("min_samples", 10):
+            delay = tracker.percentile(model, self.hedge.get("percentile", 0.95))
+        return max(self.hedge.get("min_delay", 1.0), delay)
+
+    def _hedge_candidate(self, models: List[str], messages: List[Dict[str, Any]]) -> Optional[str]:
+        """First model in `models` that can take a hedge request right now without waiting"""
+        tokens = estimate_tokens(messages)
+        for model in models:
+            if self.cooldowns.is_cooling(model):
+                continue
+            if self.rate_limiter and self.rate_limiter.delay_for(model, tokens) > 0:
+                continue
+            return model
+        return None
+
+    async def _cancel(self, started: Dict[asyncio.Future, Tuple[str, float]], tracker: LatencyTracker):
+        """Cancel unfinished tasks and wait for them so their connections are released.
+
+        `started` maps each task to its (model, start time). A cancelled task's
+        time so far goes into `tracker` as well: only a lower bound, but leaving
+        it out would keep only the winners' latencies and pull the percentile
+        the hedge delay comes from lower with every hedge.
+        """
+        losers = [task for task in started if not task.done()]
+        now = time.monotonic()
+        for task in losers:
+            model, start = started[task]
+            tracker.record(model, now - start)
+        for task in losers:
+            task.cancel()
+        await asyncio.gather(*losers, return_exceptions=True)
+
+    async def _hedged_completion(self, messages: List[Dict[str, Any]], primary: str, backups: List[str]) -> Dict[str, Any]:
+        """Run `primary`, racing the next healthy backup if it misses its hedge deadline"""
+        started = {}
+
+        def start(model):
+            started[asyncio.create_task(self.chat_completion(messages, model))] = (model, time.monotonic())
+
+        start(primary)
+        try:
+            done, _ = await asyncio.wait(set(started), timeout=self.hedge_delay(primary))
+            if not done:
+                backup = self._hedge_candidate(backups, messages)
+                if backup:
+                    start(backup)
+            error = None
+            pending = set(started)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    # Prefer reporting a real failure over a rate limit
+                    if error is None or isinstance(error, RateLimitError):
+                        error = task.exception()
+            raise error
+        finally:
+            await self._cancel(started, self.latency)
 
     async def chat_completion_with_fallback(self, messages: List[Dict[str, Any]], default_model: str, fallback_models: List[str] = None) -> Dict[str, Any]:
         """Try default model first, then fallback models if rate limited"""
         models_to_try = [default_model] + (fallback_models or [])
-        
-        for model in models_to_try:
-            if model in self.rate_limited_models:
-# Skip silently
-                continue
-                
-            try:
-                return await self.chat_completion(messages, model)
-            except APIError as e:
-                if "rate limit" in str(e).lower():
-# Rate limit hit, try next model silently
-                    self.rate_limited_models.add(model)
+
+        while True:
+            for index, model in enumerate(models_to_try):
+                if self.cooldowns.is_cooling(model):
+                    # Skip silently
                     continue
-                else:
-                    # For non-rate-limit errors, don't try other models
-                    raise e
-        
-        # If all models are rate limited
-        raise APIError("All available models are rate limited. Please wait a few minutes and try again.")
+
+                try:
+                    if self.hedge:
+                        return await self._hedged_completion(messages, model, models_to_try[index + 1:])
+                    return await self.chat_completion(messages, model)
+                except RateLimitError:
+                    # Rate limit hit (the model is now cooling down), try the next one silently.
+                    # Other APIErrors propagate: don't try other models for those.
+                    continue
+
+            # All models are cooling down: wait for the first to recover
+            await self._wait_for_model(models_to_try)
+
+    async def chat_completion_stream_with_fallback(self, messages: List[Dict[str, Any]], default_model: str, fallback_models: List[str] = None) -> AsyncIterator[str]:
+        """Streaming counterpart of chat_completion_with_fallback.
+
+        A model is only abandoned for the next one when it is rate limited, which
+        happens before it produces any output; other errors propagate.
+        """
+        models_to_try = [default_model] + (fallback_models or [])
+
+        while True:
+            for index, model in enumerate(models_to_try):
+                if self.cooldowns.is_cooling(model):
+                    continue
+
+                try:
+                    if self.hedge:
+                        stream = await self._hedged_stream(messages, model, models_to_try[index + 1:])
+                    else:
+                        stream = self.chat_completion_stream(messages, model)
+                    async for delta in stream:
+                        yield delta
+                    return
+                except RateLimitError:
+                    # 429s arrive before the first delta, so nothing has been yielded yet
+                    continue
+
+            await self._wait_for_model(models_to_try)
+
+    async def _hedged_stream(self, messages: List[Dict[str, Any]], primary: str, backups: List[str]) -> AsyncIterator[str]:
+        """Start streaming `primary`; if its first delta misses the hedge deadline, race a backup.
+
+        Whichever stream produces a delta first wins and the other is cancelled.
+        """
+        streams = {}
+        started = {}
+
+        def start(model):
+            stream = self.chat_completion_stream(messages, model)
+            first = asyncio.ensure_future(stream.__anext__())
+            streams[first] = stream
+            started[first] = (model, time.monotonic())
+
+        start(primary)
+        try:
+            done, _ = await asyncio.wait(set(streams), timeout=self.hedge_delay(primary, self.first_token_latency))
+            if not done:
+                backup = self._hedge_candidate(backups, messages)
+                if backup:
+                    start(backup)
+            error = None
+            pending = set(streams)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = streams.pop(task)
+                        return self._resume_stream(task.result(), winner)
+                    if error is None or isinstance(error, RateLimitError):
+                        error = task.exception()
+            if isinstance(error, StopAsyncIteration):
+                # An empty reply still counts as an answer
+                return self._resume_stream(None, None)
+            raise error
+        finally:
+            await self._cancel(started, self.first_token_latency)
+            for stream in streams.values():
+                await stream.aclose()
+
+    async def _resume_stream(self, first_delta: Optional[str], stream) -> AsyncIterator[str]:
+        """Yield an already received first delta, then the rest of its stream"""
+        if stream is None:
+            return
+        yield first_delta
+        async for delta in stream:
+            yield delta
+
+    def _cached(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look `key` up in the response cache, if there is one"""
+        if not self.cache:
+            return None
+        try:
+            cached = self.cache.get(key)
+        except CacheMissError as e:
+            raise APIError(str(e))
+        if cached is not None and self.cache.mode != "replay":
+            print("[Response cache] Reusing the reply to an identical earlier request (--no-cache for a new one)")
+        return cached
 
     async def chat_completion(self, messages: List[Dict[str, Any]], model: str = "llama-3.3-70b-versatile") -> Dict[str, Any]:
         import asyncio
         
+        cache_key = request_key(model, messages)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            return cached
+        estimated_tokens = estimate_tokens(messages)
         for attempt in range(3):  # Try up to 3 times
             try:
+                if self.rate_limiter:
+                    await self.rate_limiter.acquire(model, estimated_tokens)
+                started = time.monotonic()
                 response = await self.session.post(
                     "/chat/completions",
                     json={"model": model, "messages": messages}
                 )
                 response.raise_for_status()
-                return response.json()
+                data = response.json()
+                self.latency.record(model, time.monotonic() - started)
+                if self.rate_limiter:
+                    usage = data.get("usage") or {}
+                    self.rate_limiter.record_usage(model, estimated_tokens, usage.get("total_tokens"))
+                if self.cache:
+                    self.cache.put(cache_key, data)
+                return data
             except httpx.ReadTimeout:
                 if attempt < 2:  # Don't wait after the last attempt
                     print(f"[Timeout] Retrying in {2 ** attempt} seconds... (attempt {attempt + 1}/3)")
@@ -75,8 +306,93 @@ class GroqClient:
                     tb = traceback.format_exc()
                     raise APIError(f"API request failed: {e.__class__.__name__}: {e}\nTraceback:\n{tb}")
             except httpx.HTTPStatusError as e:
-                if e.response.status_code == 429:  # Rate limit
-                    raise APIError(f"Rate limit exceeded: {e.response.text}")
-                else:
-                    # Don't retry other HTTP status errors (like 401, 413, etc.)
-                    raise APIError(f"API returned error: {e.response.status_code} {e.response.text}")
+                # Don't retry HTTP status errors (like 401, 413, 429, etc.)
+                raise self._status_error(e.response, model)
+
+    async def chat_completion_stream(self, messages: List[Dict[str, Any]], model: str = "llama-3.3-70b-versatile") -> AsyncIterator[str]:
+        """Stream a chat completion over SSE, yielding content deltas as they arrive.
+
+        The client timeout applies per read, so long generations are no longer
+        capped by it as long as tokens keep flowing. Timeouts before the first
+        delta are retried with the same backoff as chat_completion; once output
+        has been yielded, a failure propagates.
+        """
+        cache_key = request_key(model, messages)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            content = cached.get('choices', [{}])[0].get('message', {}).get('content', '')
+            if content:
+                yield content
+            return
+        estimated_tokens = estimate_tokens(messages)
+        streamed = []
+        streamed_chars = 0
+        for attempt in range(3):  # Connection problems before the first delta are retried like chat_completion's
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(model, estimated_tokens)
+            usage = None
+            started = time.monotonic()
+            try:
+                async with self.session.stream(
+                    "POST",
+                    "/chat/completions",
+                    json={"model": model, "messages": messages, "stream": True}
+                ) as response:
+                    if response.status_code >= 400:
+                        await response.aread()
+                        raise self._status_error(response, model)
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        chunk = json.loads(data)
+                        # Groq reports usage on the final chunk under x_groq, OpenAI at top level
+                        usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage") or usage
+                        choices = chunk.get("choices") or [{}]
+                        delta = choices[0].get("delta", {}).get("content")
+                        if delta:
+                            if not streamed_chars:
+                                self.first_token_latency.record(model, time.monotonic() - started)
+                            streamed_chars += len(delta)
+                            streamed.append(delta)
+                            yield delta
+                break
+            except httpx.ReadTimeout:
+                if streamed_chars:
+                    raise APIError("API stream stalled: no data received before the read timeout.")
+                if attempt < 2:  # Don't wait after the last attempt
+                    print(f"[Timeout] Retrying in {2 ** attempt} seconds... (attempt {attempt + 1}/3)")
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                raise APIError("API request timed out after 3 attempts. Try a simpler request or check your internet connection.")
+            except httpx.RequestError as e:
+                if not streamed_chars and attempt < 2 and "timeout" in str(e).lower():
+                    print(f"[Network Error] Retrying in {2 ** attempt} seconds... (attempt {attempt + 1}/3)")
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                raise APIError(f"API request failed: {e.__class__.__name__}: {e}")
+            finally:
+                if self.rate_limiter:
+                    if usage and usage.get("total_tokens") is not None:
+                        actual_tokens = usage["total_tokens"]
+                    else:
+                        actual_tokens = estimated_tokens + streamed_chars // CHARS_PER_TOKEN
+                    self.rate_limiter.record_usage(model, estimated_tokens, actual_tokens)
+        if streamed_chars:
+            self.latency.record(model, time.monotonic() - started)
+        if self.cache:
+            # Stored in the non-streaming response shape so both paths share entries
+            self.cache.put(cache_key, {"choices": [{"message": {"role": "assistant", "content": "".join(streamed)}}]})
+
+    def _status_error(self, response: httpx.Response, model: str) -> APIError:
+        """Map an HTTP error response to an APIError, putting `model` on cooldown for a 429"""
+        if response.status_code == 429:  # Rate limit
+            error = RateLimitError(
+                f"Rate limit exceeded: {response.text}",
+                retry_after_from_headers(response.headers)
+            )
+            self.cooldowns.mark(model, error.retry_after)
+            return error
+        return APIError(f"API returned error: {response.status_code} {response.text}")
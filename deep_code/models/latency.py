@@ -0,0 +1,57 @@
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+# Upper bounds (seconds) of the histogram buckets; the last bucket is open-ended
+HISTOGRAM_BUCKETS = [0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0]
+
+
+class LatencyTracker:
+    """Rolling per-model record of request latencies.
+
+    Most samples are requests that completed. A hedged request cancelled
+    because another model answered first is recorded too, with the time it
+    had run so far: a lower bound on what it would have taken. Leaving those
+    out would keep only the fast requests and drag the hedge delay down.
+    """
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, model: str, seconds: float):
+        if model not in self._samples:
+            self._samples[model] = deque(maxlen=self.window)
+        self._samples[model].append(seconds)
+
+    def count(self, model: str) -> int:
+        return len(self._samples.get(model, ()))
+
+    def percentile(self, model: str, q: float) -> Optional[float]:
+        """The q-quantile (0..1) of recent latencies for `model`, or None without samples.
+
+        Lower-bound samples count as if the request had finished when it was
+        cancelled, so where they reach the tail the result underestimates it.
+        """
+        samples = sorted(self._samples.get(model, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(q * (len(samples) - 1)))))
+        return samples[index]
+
+    def histogram(self, model: str, buckets: List[float] = HISTOGRAM_BUCKETS) -> Dict[str, int]:
+        """Counts of recent latencies per bucket, keyed like "<=2.0s" and ">120.0s" """
+        counts = {f"<={bound}s": 0 for bound in buckets}
+        overflow = f">{buckets[-1]}s"
+        counts[overflow] = 0
+        for seconds in self._samples.get(model, ()):
+            for bound in buckets:
+                if seconds <= bound:
+                    counts[f"<={bound}s"] += 1
+                    break
+            else:
+                counts[overflow] += 1
+        return counts
+
+    def histograms(self) -> Dict[str, Dict[str, int]]:
+        """Histograms for every model seen so far"""
+        return {model: self.histogram(model) for model in self._samples}
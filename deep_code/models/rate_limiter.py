@@ -0,0 +1,211 @@
+import asyncio
+import re
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+
+# Rough token estimate: ~4 characters per token plus per-message framing
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Cooldown applied after a 429 that carries no usable reset header
+DEFAULT_COOLDOWN_SECONDS = 60.0
+
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Estimate the prompt tokens of a chat request from its message sizes"""
+    total = 0
+    for message in messages:
+        content = message.get("content") or ""
+        total += len(content) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+    return total
+
+
+class TokenBucket:
+    """A bucket holding up to `capacity` units that refills continuously.
+
+    The level may go negative when actual usage turns out higher than the
+    reservation; later callers then wait until the debt is repaid.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float, now: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.level = capacity
+        self.updated = now
+
+    def refill(self, now: float):
+        elapsed = max(0.0, now - self.updated)
+        self.level = min(self.capacity, self.level + elapsed * self.refill_per_second)
+        self.updated = now
+
+    def delay_for(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if they already are)"""
+        # A request larger than the whole bucket only waits for a full bucket
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_per_second
+
+    def consume(self, amount: float):
+        # A negative amount refunds an over-estimated reservation
+        self.level = min(self.capacity, self.level - amount)
+
+
+class RateLimiter:
+    """Per-model client-side scheduler enforcing request and token budgets.
+
+    Calls are delayed just long enough to stay under requests_per_minute and
+    tokens_per_minute, instead of discovering the limit through a 429.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int,
+                 clock: Callable[[], float] = time.monotonic):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.clock = clock
+        self._buckets: Dict[str, Dict[str, TokenBucket]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @classmethod
+    def from_config(cls, rate_limits: Optional[Dict[str, int]]) -> Optional["RateLimiter"]:
+        """Build a limiter from a GROQ_CONFIG-style "rate_limits" dict; None disables limiting"""
+        if not rate_limits:
+            return None
+        return cls(
+            rate_limits.get("requests_per_minute", 0),
+            rate_limits.get("tokens_per_minute", 0)
+        )
+
+    def _buckets_for(self, model: str) -> Dict[str, TokenBucket]:
+        if model not in self._buckets:
+            now = self.clock()
+            buckets = {}
+            if self.requests_per_minute:
+                buckets["requests"] = TokenBucket(self.requests_per_minute, self.requests_per_minute / 60.0, now)
+            if self.tokens_per_minute:
+                buckets["tokens"] = TokenBucket(self.tokens_per_minute, self.tokens_per_minute / 60.0, now)
+            self._buckets[model] = buckets
+            self._locks[model] = asyncio.Lock()
+        return self._buckets[model]
+
+    def delay_for(self, model: str, tokens: int) -> float:
+        """Seconds a request of `tokens` tokens would currently have to wait"""
+        buckets = self._buckets_for(model)
+        now = self.clock()
+        delay = 0.0
+        for name, bucket in buckets.items():
+            bucket.refill(now)
+            delay = max(delay, bucket.delay_for(1 if name == "requests" else tokens))
+        return delay
+
+    async def acquire(self, model: str, tokens: int):
+        """Wait until `model` has budget for one request of `tokens` tokens, then reserve it"""
+        buckets = self._buckets_for(model)
+        # Serialise waiters per model so reservations are granted in arrival order
+        async with self._locks[model]:
+            delay = self.delay_for(model, tokens)
+            while delay > 0:
+                await asyncio.sleep(delay)
+                delay = self.delay_for(model, tokens)
+            if "requests" in buckets:
+                buckets["requests"].consume(1)
+            if "tokens" in buckets:
+                buckets["tokens"].consume(tokens)
+
+    def record_usage(self, model: str, reserved_tokens: int, actual_tokens: Optional[int]):
+        """Correct a reservation with the real token count reported by the API"""
+        if actual_tokens is None:
+            return
+        bucket = self._buckets_for(model).get("tokens")
+        if bucket:
+            bucket.refill(self.clock())
+            bucket.consume(actual_tokens - reserved_tokens)
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse a reset duration such as "7.66s", "2m59.56s", "120ms" or a bare number of seconds"""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PART.findall(value)
+    if not parts or "".join(n + u for n, u in parts) != value:
+        return None
+    return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+
+
+def retry_after_from_headers(headers: Mapping[str, str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait before retrying, from Retry-After or x-ratelimit-reset-* headers"""
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        seconds = parse_duration(retry_after)
+        if seconds is None:
+            # Retry-After may also be an HTTP date
+            try:
+                seconds = parsedate_to_datetime(retry_after).timestamp() - (time.time() if now is None else now)
+            except (TypeError, ValueError):
+                seconds = None
+        if seconds is not None:
+            return max(0.0, seconds)
+    # Without Retry-After, wait for the window that ran out (x-ratelimit-remaining-* of 0).
+    # When both did, the tokens window is what the request is short of; when the
+    # headers don't say, the sooner reset is the better guess.
+    resets = {}
+    for window in ("tokens", "requests"):
+        value = headers.get(f"x-ratelimit-reset-{window}")
+        seconds = parse_duration(value) if value else None
+        if seconds is not None:
+            resets[window] = seconds
+    for window in ("tokens", "requests"):
+        remaining = headers.get(f"x-ratelimit-remaining-{window}")
+        if window in resets and remaining is not None and remaining.strip() == "0":
+            return resets[window]
+    return min(resets.values()) if resets else None
+
+
+class CooldownTable:
+    """Expiring record of rate-limited models.
+
+    A model put on cooldown becomes available again once its deadline passes,
+    so a temporary 429 no longer demotes it for the rest of the session.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._until: Dict[str, float] = {}
+
+    def mark(self, model: str, seconds: Optional[float] = None):
+        """Put `model` on cooldown for `seconds` (DEFAULT_COOLDOWN_SECONDS if unknown)"""
+        if seconds is None:
+            seconds = DEFAULT_COOLDOWN_SECONDS
+        until = self.clock() + seconds
+        self._until[model] = max(until, self._until.get(model, 0.0))
+
+    def remaining(self, model: str) -> float:
+        """Seconds until `model` is usable again (0 if it is available now)"""
+        until = self._until.get(model)
+        if until is None:
+            return 0.0
+        left = until - self.clock()
+        if left <= 0:
+            del self._until[model]
+            return 0.0
+        return left
+
+    def is_cooling(self, model: str) -> bool:
+        return self.remaining(model) > 0
+
+    def cooling_models(self) -> set:
+        return {model for model in list(self._until) if self.is_cooling(model)}
+
+    def soonest(self, models: Iterable[str]) -> Optional[str]:
+        """The model among `models` that recovers first"""
+        models = list(models)
+        if not models:
+            return None
+        return min(models, key=self.remaining)
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+CACHE_DIR = Path.home() / ".ai-code" / "cache"
+
+# Cache modes: "on" reads and writes, "replay" only serves recorded responses
+CACHE_MODES = ("on", "replay")
+
+
+class CacheMissError(Exception):
+    """Raised in replay mode when a request has no recorded response"""
+    pass
+
+
+def normalise_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Reduce messages to what affects the completion: role and whitespace-normalised content"""
+    normalised = []
+    for message in messages:
+        content = (message.get("content") or "").replace("\r\n", "\n")
+        content = "\n".join(line.rstrip() for line in content.strip().split("\n"))
+        normalised.append({"role": message.get("role", ""), "content": content})
+    return normalised
+
+
+def request_key(model: str, messages: List[Dict[str, Any]], params: Optional[Dict[str, Any]] = None) -> str:
+    """Stable hash of model + normalised messages + request parameters"""
+    payload = json.dumps(
+        {"model": model, "messages": normalise_messages(messages), "params": params or {}},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """On-disk cache of chat completion responses.
+
+    One JSON file per request key. Entries expire `ttl_seconds` after they were
+    stored (checked on read), and the least recently used ones are evicted once
+    the cache exceeds `max_bytes` (file mtimes are refreshed on every hit).
+    """
+
+    def __init__(self, directory: Path = CACHE_DIR, ttl_seconds: float = 86400.0,
+                 max_bytes: int = 100 * 1024 * 1024, mode: str = "on"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.mode = mode
+
+    @classmethod
+    def from_config(cls, cache_cfg: Optional[Dict[str, Any]], enabled: Optional[bool] = None,
+                    replay: bool = False) -> Optional["ResponseCache"]:
+        """Build the cache described by the config "cache" section; None when disabled.
+
+        The cache is off unless the config enables it; `enabled` overrides the
+        config either way. Replay always uses it.
+        """
+        cache_cfg = cache_cfg or {}
+        if replay:
+            # Replay ignores expiry so recorded sessions stay reproducible
+            return cls(Path(cache_cfg.get("directory", CACHE_DIR)), ttl_seconds=float("inf"), mode="replay")
+        if enabled is None:
+            enabled = cache_cfg.get("enabled", False)
+        if not enabled:
+            return None
+        return cls(
+            Path(cache_cfg.get("directory", CACHE_DIR)),
+            ttl_seconds=cache_cfg.get("ttl_seconds", 86400.0),
+            max_bytes=cache_cfg.get("max_bytes", 100 * 1024 * 1024)
+        )
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for `key`, or None (CacheMissError in replay mode)"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+        if entry is not None and time.time() - entry.get("created", 0) > self.ttl_seconds:
+            self._remove(path)
+            entry = None
+        if entry is None:
+            if self.mode == "replay":
+                raise CacheMissError(f"No recorded response for request {key[:12]} in {self.directory}")
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        return entry["response"]
+
+    def put(self, key: str, response: Dict[str, Any]):
+        """Store `response` under `key`, then evict down to the size limit"""
+        if self.mode == "replay":
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = str(path) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "response": response}, f)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for dir_entry in it:
+                if not dir_entry.name.endswith(".json"):
+                    continue
+                stat = dir_entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, dir_entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(Path(path))
+            total -= size
+
+    def _remove(self, path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
@@ -1,44 +1,254 @@
 import re
 import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, List, Tuple, Set
-from bs4 import BeautifulSoup
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple, Set
 import json
 
+from deep_code.operations import scanner
+from deep_code.operations.file_index import FileIndex
+from deep_code.operations.html_document import HtmlDocument, collect_elements, parse_html
+from deep_code.operations.selectors import DomIndex, css_rule_selectors
+from deep_code.operations.syntax_checker import check_syntax
+
+# Error type per unbalanced delimiter (None: strings, comments and the like)
+SYNTAX_ERROR_TYPES = {
+    'js': {
+        '{': "MISMATCHED_BRACES",
+        '(': "MISMATCHED_PARENTHESES",
+        '[': "MISMATCHED_BRACKETS",
+        None: "UNTERMINATED_TOKEN",
+    },
+    'css': {
+        '{': "MISMATCHED_CSS_BRACES",
+        '(': "MISMATCHED_CSS_PARENTHESES",
+        '[': "MISMATCHED_CSS_BRACKETS",
+        None: "UNTERMINATED_CSS_TOKEN",
+    },
+}
+
+# Severity per error type; lower sorts first. Errors that break the page at
+# runtime come before broken styling, and cosmetic ones come last.
+CRITICAL, ERROR, WARNING = 0, 1, 2
+SEVERITY = {
+    "READ_ERROR": CRITICAL,
+    "HTML_PARSE_ERROR": CRITICAL,
+    "MISSING_SCRIPT": CRITICAL,
+    "MISMATCHED_SCRIPT_REF": CRITICAL,
+    "MISMATCHED_BRACES": CRITICAL,
+    "MISMATCHED_PARENTHESES": CRITICAL,
+    "MISMATCHED_BRACKETS": CRITICAL,
+    "UNTERMINATED_TOKEN": CRITICAL,
+    "MISSING_HTML_ELEMENT": CRITICAL,
+    "MISSING_STYLESHEET": ERROR,
+    "MISMATCHED_CSS_BRACES": ERROR,
+    "MISMATCHED_CSS_PARENTHESES": ERROR,
+    "MISMATCHED_CSS_BRACKETS": ERROR,
+    "UNTERMINATED_CSS_TOKEN": ERROR,
+    "DUPLICATE_ID": ERROR,
+    "MISSING_HTML_TAG": ERROR,
+    "MISSING_HEAD_TAG": ERROR,
+    "MISSING_BODY_TAG": ERROR,
+    "MISSING_IMAGE": WARNING,
+    "MISSING_HTML_CLASS": WARNING,  # Scripts often add their classes at runtime
+    "UNUSED_CSS_SELECTOR": WARNING,
+}
+
+# Below this much changed source, per-file work isn't worth shipping to worker processes
+PARALLEL_MIN_CHARS = 256 * 1024
+
+def _is_html(file_name: str) -> bool:
+    return file_name.endswith(('.html', '.htm'))
+
+
 class ValidationError:
     def __init__(self, file_name: str, error_type: str, description: str, suggested_fix: str = ""):
         self.file_name = file_name
         self.error_type = error_type
         self.description = description
         self.suggested_fix = suggested_fix
+        self.severity = SEVERITY.get(error_type, ERROR)
     
     def __str__(self):
         return f"{self.file_name}: {self.error_type} - {self.description}"
 
+
+class ErrorCollector:
+    """Keeps up to `max_per_type` errors of each type and counts the rest"""
+
+    def __init__(self, max_per_type: Optional[int] = None):
+        self.max_per_type = max_per_type
+        self.errors: List[ValidationError] = []
+        self.counts: Counter = Counter()
+
+    def append(self, error: ValidationError):
+        self.counts[error.error_type] += 1
+        if self.max_per_type is None or self.counts[error.error_type] <= self.max_per_type:
+            self.errors.append(error)
+
+    def merge(self, other: "ErrorCollector"):
+        """Add another collector's errors, keeping its uncollected ones in the counts"""
+        for error in other.errors:
+            self.append(error)
+        kept = Counter(error.error_type for error in other.errors)
+        for error_type, count in other.counts.items():
+            self.counts[error_type] += count - kept[error_type]
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def sorted_errors(self) -> List[ValidationError]:
+        """Collected errors, most severe first (stable within a severity)"""
+        return sorted(self.errors, key=lambda error: error.severity)
+
+
+def structure_errors(file_name: str, document: HtmlDocument, max_per_type: Optional[int] = None) -> ErrorCollector:
+    """Missing <html>/<head>/<body> tags and duplicate ids in one HTML file"""
+    errors = ErrorCollector(max_per_type)
+    if not document.has_html:
+        errors.append(ValidationError(
+            file_name, "MISSING_HTML_TAG", "Missing <html> tag"
+        ))
+
+    if not document.has_head:
+        errors.append(ValidationError(
+            file_name, "MISSING_HEAD_TAG", "Missing <head> tag"
+        ))
+
+    if not document.has_body:
+        errors.append(ValidationError(
+            file_name, "MISSING_BODY_TAG", "Missing <body> tag"
+        ))
+
+    # Check for duplicate IDs, in order of first use
+    for dup_id, count in Counter(document.ids).items():
+        if count > 1:
+            errors.append(ValidationError(
+                file_name, "DUPLICATE_ID", f"Duplicate ID: {dup_id} (used {count} times)"
+            ))
+    return errors
+
+
+def syntax_errors(file_name: str, content: str, max_per_type: Optional[int] = None) -> ErrorCollector:
+    """Unbalanced delimiters and unterminated tokens in one JS or CSS file"""
+    errors = ErrorCollector(max_per_type)
+    language = 'js' if file_name.endswith('.js') else 'css'
+    error_types = SYNTAX_ERROR_TYPES[language]
+    for issue in check_syntax(content, language):
+        errors.append(ValidationError(
+            file_name,
+            error_types.get(issue.delimiter, error_types[None]),
+            f"{issue.message} at line {issue.line}, column {issue.column}"
+        ))
+    return errors
+
+
+def js_selectors(js_content: str) -> List[Tuple[str, str]]:
+    """('id' | 'class', name) for each DOM lookup in JavaScript source.
+
+    Ids come from getElementById() and from querySelector(All)() selectors
+    that end in a lone #id; classes only from getElementsByClassName().
+    """
+    kinds = {scanner.JS_ID: 'id', scanner.JS_CLASS: 'class'}
+    table = scanner.scan(js_content, "js")
+    return [(kinds[symbol.kind], symbol.value) for symbol in table.of(scanner.JS_ID, scanner.JS_CLASS)]
+
+
+class FileAnalysis(NamedTuple):
+    """Everything validation derives from one file on its own"""
+    table: Optional[scanner.SymbolTable]  # HTML files that parsed
+    errors: Optional[ErrorCollector]  # Structure (HTML) or syntax (JS/CSS) errors
+    selectors: Optional[List]  # CSS rule selectors or JS selector usages
+
+
+def analyze_file(file_name: str, content: str, max_per_type: Optional[int] = None) -> FileAnalysis:
+    """Per-file part of validation; module-level so worker processes can run it"""
+    if _is_html(file_name):
+        try:
+            document = parse_html(content)
+        except Exception as e:
+            errors = ErrorCollector(max_per_type)
+            errors.append(ValidationError(
+                file_name, "HTML_PARSE_ERROR", f"Could not parse HTML: {e}"
+            ))
+            return FileAnalysis(None, errors, None)
+        return FileAnalysis(document.table, structure_errors(file_name, document, max_per_type), None)
+    if file_name.endswith('.css'):
+        return FileAnalysis(None, syntax_errors(file_name, content, max_per_type), css_rule_selectors(content))
+    if file_name.endswith('.js'):
+        return FileAnalysis(None, syntax_errors(file_name, content, max_per_type), js_selectors(content))
+    return FileAnalysis(None, None, None)
+
+
 class CodeValidator:
-    def __init__(self, folder_path: str):
+    """Checks a generated project for broken references and mismatched selectors.
+
+    With `max_errors_per_type` set, at most that many errors of each type are
+    kept (the rest are only counted, see `error_counts`), so huge generated
+    pages can't make validation slow or its output unbounded. Errors come
+    back most severe first.
+
+    A validator can be kept for the life of a project: validate_all() hashes
+    every file and reruns a check only when its inputs changed since the last
+    run. Structure and syntax checks depend on their own file, reference checks
+    on the HTML file and the set of file names, and selector checks on the
+    CSS/JS file and the HTML files together.
+
+    With `workers` above 1 (0 or None: one per CPU), the per-file work on a
+    large batch of changed files (parsing, structure and syntax checks,
+    selector extraction) is spread over worker processes, and changed files
+    are read on a thread pool. Cross-file checks then run here on the merged
+    results, in file path order, so the errors match a serial run exactly.
+    Call close() to shut the pools down.
+    """
+
+    def __init__(self, folder_path: str, max_errors_per_type: Optional[int] = None, workers: Optional[int] = 1):
         self.folder_path = Path(folder_path)
+        self.max_errors_per_type = max_errors_per_type
+        self.workers = workers or os.cpu_count() or 1
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self.index = FileIndex(folder_path)
         self.files = {}
         self.errors = []
+        self.error_counts: Dict[str, int] = {}  # Every error found per type, collected or not
+        self.documents: Dict[str, HtmlDocument] = {}
+        self.hashes: Dict[str, str] = {}
+        self._html_elements = None
+        self._dom_index_list = None
+        self._html_key = None
+        # (check, file name) -> (input key, errors found for those inputs)
+        self._results: Dict[Tuple[str, str], Tuple[Tuple, ErrorCollector]] = {}
+        self._collector = ErrorCollector(max_errors_per_type)
+        # (extractor, file hash) -> selectors extracted from that content
+        self._selectors: Dict[Tuple[str, str], List] = {}
         
     def load_files(self):
-        """Load all files in the folder for validation"""
-        for file_path in self.folder_path.glob("*"):
-            if file_path.is_file():
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        self.files[file_path.name] = f.read()
-                except Exception as e:
-                    self.errors.append(ValidationError(
-                        file_path.name, 
-                        "READ_ERROR", 
-                        f"Could not read file: {e}"
-                    ))
+        """Load the project's text files (recursively, keyed by relative path) for validation"""
+        self.files = {}
+        errors = self._new_collector()
+        entries = self.index.scan(self._threads())
+        for rel_path in sorted(entries):
+            entry = entries[rel_path]
+            if entry.is_text:
+                self.files[rel_path] = entry.content
+            elif entry.error:
+                errors.append(ValidationError(
+                    rel_path, 
+                    "READ_ERROR", 
+                    f"Could not read file: {entry.error}"
+                ))
+        self._collector.merge(errors)
     
     def validate_all(self) -> List[ValidationError]:
-        """Run all validation checks and return errors"""
+        """Run all validation checks and return errors, most severe first"""
+        self._collector = self._new_collector()
         self.load_files()
-        self.errors = []
+        self._update_hashes()
+        self._analyze_in_parallel()
         
         # Run validation checks
         self._validate_file_references()
@@ -47,243 +257,310 @@ class CodeValidator:
         self._validate_js_selectors()
         self._validate_syntax()
         
+        self.errors = self._collector.sorted_errors()
+        self.error_counts = dict(self._collector.counts)
         return self.errors
+
+    @property
+    def total_errors(self) -> int:
+        """Number of errors found, including those past the per-type cap"""
+        return sum(self.error_counts.values())
+
+    def close(self):
+        """Shut down the worker pools, if any were started"""
+        for pool in (self._process_pool, self._thread_pool):
+            if pool is not None:
+                pool.shutdown()
+        self._process_pool = self._thread_pool = None
+
+    def _new_collector(self) -> ErrorCollector:
+        return ErrorCollector(self.max_errors_per_type)
+
+    def _threads(self) -> Optional[Executor]:
+        if self.workers <= 1:
+            return None
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(self.workers)
+        return self._thread_pool
+
+    def _analyze_in_parallel(self):
+        """Precompute per-file results for changed files on worker processes.
+
+        Results land in the same caches the checks read from (documents,
+        selectors and per-check results), so the checks that follow find them
+        there; small batches are left to the checks to compute in-process.
+        """
+        if self.workers <= 1:
+            return
+        pending = [name for name in self.files if self._needs_analysis(name)]
+        if len(pending) < 2 or sum(len(self.files[name]) for name in pending) < PARALLEL_MIN_CHARS:
+            return
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(self.workers)
+        contents = [self.files[name] for name in pending]
+        analyses = self._process_pool.map(analyze_file, pending, contents, repeat(self.max_errors_per_type))
+        for file_name, content, analysis in zip(pending, contents, analyses):
+            file_hash = self.hashes[file_name]
+            if _is_html(file_name):
+                if analysis.table is not None:
+                    scanner.store(content, analysis.table)
+                    self.documents[file_name] = HtmlDocument(analysis.table)
+                self._results[("structure", file_name)] = ((file_hash,), analysis.errors)
+            else:
+                self._results[("syntax", file_name)] = ((file_hash,), analysis.errors)
+                self._selectors[(self._extractor(file_name).__name__, file_hash)] = analysis.selectors
+
+    def _needs_analysis(self, file_name: str) -> bool:
+        key = (self.hashes[file_name],)
+        if _is_html(file_name):
+            cached = self._results.get(("structure", file_name))
+            return file_name not in self.documents or cached is None or cached[0] != key
+        if file_name.endswith(('.js', '.css')):
+            cached = self._results.get(("syntax", file_name))
+            selectors_key = (self._extractor(file_name).__name__, key[0])
+            return cached is None or cached[0] != key or selectors_key not in self._selectors
+        return False
+
+    def _extractor(self, file_name: str):
+        return self._extract_js_selectors if file_name.endswith('.js') else self._extract_css_selectors
+
+    def _update_hashes(self):
+        """Hash the loaded files and forget what was derived from changed ones"""
+        hashes = {name: self.index.entries[name].hash for name in self.files}
+        for name in set(self.documents):
+            if hashes.get(name) != self.hashes.get(name):
+                del self.documents[name]
+        live = set(hashes.values())
+        self._selectors = {key: value for key, value in self._selectors.items() if key[1] in live}
+        self._results = {key: value for key, value in self._results.items() if key[1] in hashes}
+        self.hashes = hashes
+        html_key = tuple(sorted((name, h) for name, h in hashes.items() if _is_html(name)))
+        if html_key != self._html_key:
+            self._html_key = html_key
+            self._html_elements = None
+            self._dom_index_list = None
+
+    def _run_check(self, check: str, file_name: str, key: Tuple, run) -> ErrorCollector:
+        """Errors of `check` for `file_name`, reusing the last result while `key` is unchanged"""
+        cached = self._results.get((check, file_name))
+        if cached is not None and cached[0] == key:
+            errors = cached[1]
+        else:
+            errors = run()
+            self._results[(check, file_name)] = (key, errors)
+        self._collector.merge(errors)
+        return errors
     
     def _validate_file_references(self):
         """Check if all file references (src, href) exist"""
-        all_files = set(self.files.keys())
-        
-        for file_name, content in self.files.items():
-            if file_name.endswith(('.html', '.htm')):
-                # Check script src
-                script_refs = re.findall(r'<script[^>]+src=["\'](.*?)["\']', content, re.IGNORECASE)
-                for ref in script_refs:
-                    if ref not in all_files and not ref.startswith(('http', '//')):
-                        # Try to find a JS file that should be renamed
-                        js_files = [f for f in all_files if f.endswith('.js')]
-                        if len(js_files) == 1:
-                            self.errors.append(ValidationError(
-                                file_name,
-                                "MISMATCHED_SCRIPT_REF",
-                                f"Script reference '{ref}' not found. Found JS file: {js_files[0]}",
-                                f"Rename {js_files[0]} to {ref}"
-                            ))
-                        else:
-                            self.errors.append(ValidationError(
-                                file_name,
-                                "MISSING_SCRIPT",
-                                f"Script reference '{ref}' not found in project files",
-                                f"Create {ref} or update reference to existing JS file"
-                            ))
-                
-                # Check link href (CSS)
-                link_refs = re.findall(r'<link[^>]+href=["\'](.*?)["\']', content, re.IGNORECASE)
-                for ref in link_refs:
-                    if ref not in all_files and not ref.startswith(('http', '//')):
-                        self.errors.append(ValidationError(
-                            file_name,
-                            "MISSING_STYLESHEET",
-                            f"Stylesheet reference '{ref}' not found in project files",
-                            f"Create {ref} or update reference to existing CSS file"
-                        ))
-                
-                # Check img src
-                img_refs = re.findall(r'<img[^>]+src=["\'](.*?)["\']', content, re.IGNORECASE)
-                for ref in img_refs:
-                    if ref not in all_files and not ref.startswith(('http', '//', 'data:')):
-                        self.errors.append(ValidationError(
-                            file_name,
-                            "MISSING_IMAGE",
-                            f"Image reference '{ref}' not found in project files",
-                            f"Add {ref} to project or update reference"
-                        ))
+        # Binary files count too: images and fonts are valid reference targets
+        all_files = self.index.paths
+        for file_name in self.files:
+            if _is_html(file_name):
+                self._run_check(
+                    "references", file_name, (self.hashes[file_name], all_files),
+                    lambda: self._check_references(file_name, all_files)
+                )
+
+    def _check_references(self, file_name: str, all_files) -> ErrorCollector:
+        errors = self._new_collector()
+        try:
+            document = self._document(file_name)
+        except Exception:
+            return errors  # Reported by _validate_html_structure
+
+        def missing(ref):
+            return FileIndex.resolve(file_name, ref) not in all_files
+
+        # Check script src
+        for ref in document.scripts:
+            if missing(ref) and not ref.startswith(('http', '//')):
+                # Try to find a JS file that should be renamed
+                js_files = [f for f in all_files if f.endswith('.js')]
+                if len(js_files) == 1:
+                    errors.append(ValidationError(
+                        file_name,
+                        "MISMATCHED_SCRIPT_REF",
+                        f"Script reference '{ref}' not found. Found JS file: {js_files[0]}",
+                        f"Rename {js_files[0]} to {ref}"
+                    ))
+                else:
+                    errors.append(ValidationError(
+                        file_name,
+                        "MISSING_SCRIPT",
+                        f"Script reference '{ref}' not found in project files",
+                        f"Create {ref} or update reference to existing JS file"
+                    ))
+
+        # Check link href (CSS)
+        for ref in document.stylesheets:
+            if missing(ref) and not ref.startswith(('http', '//')):
+                errors.append(ValidationError(
+                    file_name,
+                    "MISSING_STYLESHEET",
+                    f"Stylesheet reference '{ref}' not found in project files",
+                    f"Create {ref} or update reference to existing CSS file"
+                ))
+
+        # Check img src
+        for ref in document.images:
+            if missing(ref) and not ref.startswith(('http', '//', 'data:')):
+                errors.append(ValidationError(
+                    file_name,
+                    "MISSING_IMAGE",
+                    f"Image reference '{ref}' not found in project files",
+                    f"Add {ref} to project or update reference"
+                ))
+        return errors
     
     def _validate_html_structure(self):
         """Validate HTML structure and common issues"""
-        for file_name, content in self.files.items():
-            if file_name.endswith(('.html', '.htm')):
-                try:
-                    soup = BeautifulSoup(content, 'html.parser')
-                    
-                    # Check for basic HTML structure
-                    if not soup.find('html'):
-                        self.errors.append(ValidationError(
-                            file_name, "MISSING_HTML_TAG", "Missing <html> tag"
-                        ))
-                    
-                    if not soup.find('head'):
-                        self.errors.append(ValidationError(
-                            file_name, "MISSING_HEAD_TAG", "Missing <head> tag"
-                        ))
-                        
-                    if not soup.find('body'):
-                        self.errors.append(ValidationError(
-                            file_name, "MISSING_BODY_TAG", "Missing <body> tag"
-                        ))
-                    
-                    # Check for duplicate IDs
-                    ids = [elem.get('id') for elem in soup.find_all(id=True)]
-                    duplicate_ids = [id for id in set(ids) if ids.count(id) > 1]
-                    for dup_id in duplicate_ids:
-                        self.errors.append(ValidationError(
-                            file_name, "DUPLICATE_ID", f"Duplicate ID: {dup_id}"
-                        ))
-                        
-                except Exception as e:
-                    self.errors.append(ValidationError(
-                        file_name, "HTML_PARSE_ERROR", f"Could not parse HTML: {e}"
-                    ))
+        for file_name in self.files:
+            if _is_html(file_name):
+                self._run_check(
+                    "structure", file_name, (self.hashes[file_name],),
+                    lambda: self._check_structure(file_name)
+                )
+
+    def _check_structure(self, file_name: str) -> ErrorCollector:
+        try:
+            return structure_errors(file_name, self._document(file_name), self.max_errors_per_type)
+        except Exception as e:
+            errors = self._new_collector()
+            errors.append(ValidationError(
+                file_name, "HTML_PARSE_ERROR", f"Could not parse HTML: {e}"
+            ))
+            return errors
     
     def _validate_css_selectors(self):
         """Validate CSS selectors against HTML elements"""
-        html_elements = self._extract_html_elements()
-        
-        for file_name, content in self.files.items():
+        for file_name in self.files:
             if file_name.endswith('.css'):
-                css_selectors = self._extract_css_selectors(content)
-                
-                for selector in css_selectors:
-                    if not self._selector_matches_html(selector, html_elements):
-                        self.errors.append(ValidationError(
-                            file_name,
-                            "UNUSED_CSS_SELECTOR",
-                            f"CSS selector '{selector}' doesn't match any HTML elements",
-                            f"Remove selector or add matching HTML element"
-                        ))
+                self._run_check(
+                    "css_selectors", file_name, (self.hashes[file_name], self._html_key),
+                    lambda: self._check_css_selectors(file_name)
+                )
+
+    def _check_css_selectors(self, file_name: str) -> ErrorCollector:
+        errors = self._new_collector()
+        dom_indexes = self._dom_indexes()
+        css_selectors = self._selectors_of(file_name, self._extract_css_selectors)
+
+        for selector in css_selectors:
+            if not self._selector_matches_html(selector, dom_indexes):
+                errors.append(ValidationError(
+                    file_name,
+                    "UNUSED_CSS_SELECTOR",
+                    f"CSS selector '{selector}' doesn't match any HTML elements",
+                    f"Remove selector or add matching HTML element"
+                ))
+        return errors
     
     def _validate_js_selectors(self):
         """Validate JavaScript selectors against HTML elements"""
-        html_elements = self._extract_html_elements()
-        
-        for file_name, content in self.files.items():
+        for file_name in self.files:
             if file_name.endswith('.js'):
-                js_selectors = self._extract_js_selectors(content)
-                
-                for selector_type, selector in js_selectors:
-                    if not self._js_selector_matches_html(selector_type, selector, html_elements):
-                        self.errors.append(ValidationError(
-                            file_name,
-                            "MISSING_HTML_ELEMENT",
-                            f"JavaScript selector '{selector}' (type: {selector_type}) doesn't match any HTML elements",
-                            f"Add HTML element with {selector_type}='{selector}'"
-                        ))
+                self._run_check(
+                    "js_selectors", file_name, (self.hashes[file_name], self._html_key),
+                    lambda: self._check_js_selectors(file_name)
+                )
+
+    def _check_js_selectors(self, file_name: str) -> ErrorCollector:
+        errors = self._new_collector()
+        html_elements = self._extract_html_elements()
+        js_selectors = self._selectors_of(file_name, self._extract_js_selectors)
+
+        for selector_type, selector in js_selectors:
+            if not self._js_selector_matches_html(selector_type, selector, html_elements):
+                errors.append(ValidationError(
+                    file_name,
+                    "MISSING_HTML_ELEMENT" if selector_type == 'id' else "MISSING_HTML_CLASS",
+                    f"JavaScript selector '{selector}' (type: {selector_type}) doesn't match any HTML elements",
+                    f"Add HTML element with {selector_type}='{selector}'"
+                ))
+        return errors
     
     def _validate_syntax(self):
         """Basic syntax validation"""
+        for file_name in self.files:
+            if file_name.endswith(('.js', '.css')):
+                self._run_check(
+                    "syntax", file_name, (self.hashes[file_name],),
+                    lambda: self._check_syntax(file_name)
+                )
+
+    def _check_syntax(self, file_name: str) -> ErrorCollector:
+        return syntax_errors(file_name, self.files[file_name], self.max_errors_per_type)
+
+    def _document(self, file_name: str) -> HtmlDocument:
+        """The parsed form of an HTML file, shared by every check"""
+        document = self.documents.get(file_name)
+        if document is None:
+            document = parse_html(self.files[file_name])
+            self.documents[file_name] = document
+        return document
+
+    def _selectors_of(self, file_name: str, extract) -> List:
+        """Selectors extracted from a CSS/JS file, reused while its content is unchanged"""
+        key = (extract.__name__, self.hashes[file_name])
+        selectors = self._selectors.get(key)
+        if selectors is None:
+            selectors = extract(self.files[file_name])
+            self._selectors[key] = selectors
+        return selectors
+
+    def _dom_indexes(self) -> List[DomIndex]:
+        """Element indexes of the HTML files, for CSS selector matching"""
+        if self._dom_index_list is None:
+            indexes = []
+            for file_name in self.files:
+                if _is_html(file_name):
+                    try:
+                        indexes.append(self._document(file_name).dom)
+                    except Exception:
+                        pass
+            self._dom_index_list = indexes
+        return self._dom_index_list
+
+    def html_elements(self) -> Dict[str, Set[str]]:
+        """IDs, classes and tags of the elements in the loaded HTML files"""
+        return self._extract_html_elements()
+
+    def script_selectors(self) -> Set[Tuple[str, str]]:
+        """(type, selector) pairs the loaded JavaScript files look up in the DOM"""
+        selectors = set()
         for file_name, content in self.files.items():
             if file_name.endswith('.js'):
-                # Check for common JS syntax errors
-                if content.count('{') != content.count('}'):
-                    self.errors.append(ValidationError(
-                        file_name, "MISMATCHED_BRACES", "Mismatched curly braces"
-                    ))
-                
-                if content.count('(') != content.count(')'):
-                    self.errors.append(ValidationError(
-                        file_name, "MISMATCHED_PARENTHESES", "Mismatched parentheses"
-                    ))
-            
-            elif file_name.endswith('.css'):
-                # Check CSS syntax
-                if content.count('{') != content.count('}'):
-                    self.errors.append(ValidationError(
-                        file_name, "MISMATCHED_CSS_BRACES", "Mismatched CSS braces"
-                    ))
-    
+                if file_name in self.hashes:
+                    selectors.update(self._selectors_of(file_name, self._extract_js_selectors))
+                else:
+                    selectors.update(js_selectors(content))
+        return selectors
+
     def _extract_html_elements(self) -> Dict[str, Set[str]]:
         """Extract IDs, classes, and tags from HTML files"""
-        elements = {'ids': set(), 'classes': set(), 'tags': set()}
-        
-        for file_name, content in self.files.items():
-            if file_name.endswith(('.html', '.htm')):
-                try:
-                    soup = BeautifulSoup(content, 'html.parser')
-                    
-                    # Extract IDs
-                    for elem in soup.find_all(id=True):
-                        elements['ids'].add(elem.get('id'))
-                    
-                    # Extract classes
-                    for elem in soup.find_all(class_=True):
-                        classes = elem.get('class')
-                        if isinstance(classes, list):
-                            elements['classes'].update(classes)
-                        else:
-                            elements['classes'].add(classes)
-                    
-                    # Extract tags
-                    for elem in soup.find_all():
-                        elements['tags'].add(elem.name.lower())
-                        
-                except Exception:
-                    pass
-        
-        return elements
+        if self._html_elements is None:
+            documents = []
+            for file_name in self.files:
+                if _is_html(file_name):
+                    try:
+                        documents.append(self._document(file_name))
+                    except Exception:
+                        pass
+            self._html_elements = collect_elements(documents)
+        return self._html_elements
     
     def _extract_css_selectors(self, css_content: str) -> List[str]:
-        """Extract selectors from CSS content"""
-        selectors = []
-        
-        # Simple regex to find CSS selectors
-        css_rules = re.findall(r'([^{}]+)\s*{[^}]*}', css_content)
-        
-        for rule in css_rules:
-            # Clean up the selector
-            selector = rule.strip()
-            if selector and not selector.startswith('@'):
-                selectors.append(selector)
-        
-        return selectors
+        """Extract selectors from CSS content, one per entry of each rule's selector list"""
+        return css_rule_selectors(css_content)
     
     def _extract_js_selectors(self, js_content: str) -> List[Tuple[str, str]]:
-        """Extract DOM selectors from JavaScript content"""
-        selectors = []
-        
-        # getElementById
-        id_matches = re.findall(r'getElementById\(["\']([^"\']+)["\']\)', js_content)
-        for match in id_matches:
-            selectors.append(('id', match))
-        
-        # getElementsByClassName
-        class_matches = re.findall(r'getElementsByClassName\(["\']([^"\']+)["\']\)', js_content)
-        for match in class_matches:
-            selectors.append(('class', match))
-        
-        # querySelector with ID
-        query_id_matches = re.findall(r'querySelector\(["\']#([^"\']+)["\']\)', js_content)
-        for match in query_id_matches:
-            selectors.append(('id', match))
-        
-        # querySelector with class
-        query_class_matches = re.findall(r'querySelector\(["\']\.([^"\']+)["\']\)', js_content)
-        for match in query_class_matches:
-            selectors.append(('class', match))
-        
-        return selectors
+        """Extract DOM selectors (getElementById, getElementsByClassName, querySelector) from JavaScript content"""
+        return js_selectors(js_content)
     
-    def _selector_matches_html(self, selector: str, html_elements: Dict[str, Set[str]]) -> bool:
-        """Check if CSS selector matches HTML elements"""
-        selector = selector.strip()
-        
-        # Simple tag selector
-        if selector in html_elements['tags']:
-            return True
-        
-        # ID selector
-        if selector.startswith('#'):
-            id_name = selector[1:]
-            return id_name in html_elements['ids']
-        
-        # Class selector
-        if selector.startswith('.'):
-            class_name = selector[1:]
-            return class_name in html_elements['classes']
-        
-        # For complex selectors, just return True for now
-        if ' ' in selector or '>' in selector or '+' in selector or '~' in selector:
-            return True
-        
-        return False
+    def _selector_matches_html(self, selector: str, dom_indexes: List[DomIndex]) -> bool:
+        """Check if CSS selector matches an element of any HTML file"""
+        return any(index.matches(selector) for index in dom_indexes)
     
     def _js_selector_matches_html(self, selector_type: str, selector: str, html_elements: Dict[str, Set[str]]) -> bool:
         """Check if JavaScript selector matches HTML elements"""
@@ -307,8 +584,9 @@ class CodeValidator:
         for error in limited_errors:
             prompt += f"• {error.file_name}: {error.description}\n"
         
-        if len(self.errors) > 3:
-            prompt += f"\n(+ {len(self.errors) - 3} more errors)\n"
+        total = max(self.total_errors, len(self.errors))
+        if total > 3:
+            prompt += f"\n(+ {total - 3} more errors)\n"
         
         prompt += "\nOutput corrected files as markdown code blocks. No explanations."
         
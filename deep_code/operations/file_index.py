@@ -0,0 +1,134 @@
+import hashlib
+import os
+import posixpath
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from urllib.parse import unquote
+
+from deep_code.operations.file_ops import FileOperationError, decode_bytes
+from deep_code.operations.paths import STATE_DIR
+
+# Directories never worth indexing
+IGNORED_DIRS = frozenset({
+    ".git", "node_modules", "__pycache__", ".venv", "venv", ".idea", ".vscode", STATE_DIR,
+})
+# Backups and in-progress writes left next to the real files
+IGNORED_SUFFIXES = (".bak", ".tmp", ".swp", "~")
+# Indexed so references to them resolve, but never read as source
+BINARY_SUFFIXES = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico", ".bmp", ".avif",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot",
+    ".mp3", ".mp4", ".wav", ".ogg", ".webm",
+    ".pdf", ".zip", ".gz", ".tar", ".exe", ".dll", ".so", ".pyc",
+})
+
+
+class IndexEntry:
+    """One project file: its stat signature and, for text files, content and hash"""
+
+    def __init__(self, size: int, mtime_ns: int, content: Optional[str] = None,
+                 hash: Optional[str] = None, error: Optional[str] = None):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.content = content
+        self.hash = hash
+        self.error = error
+
+    @property
+    def is_text(self) -> bool:
+        return self.content is not None
+
+
+class FileIndex:
+    """Recursive index of a project folder, keyed by '/'-separated relative path.
+
+    scan() walks the folder with os.scandir, skipping ignored directories and
+    backup files, and only re-reads files whose size or mtime changed since
+    the previous scan. Binary files are indexed without being read, so
+    references to images and fonts still resolve. Given an executor, scan()
+    reads the changed files on it.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.entries: Dict[str, IndexEntry] = {}
+
+    def scan(self, executor: Optional[Executor] = None) -> Dict[str, IndexEntry]:
+        entries: Dict[str, IndexEntry] = {}
+        changed: List[Tuple[str, str, os.stat_result]] = []  # (relative path, path, stat)
+        self._walk(str(self.root), "", entries, changed)
+        if executor is not None and len(changed) > 1:
+            read = executor.map(self._read, [path for _, path, _ in changed], [stat for _, _, stat in changed])
+        else:
+            read = (self._read(path, stat) for _, path, stat in changed)
+        for (rel_path, _, _), entry in zip(changed, read):
+            entries[rel_path] = entry
+        self.entries = entries
+        return entries
+
+    def _walk(self, directory: str, prefix: str, entries: Dict[str, IndexEntry],
+              changed: List[Tuple[str, str, os.stat_result]]):
+        try:
+            it = os.scandir(directory)
+        except OSError:
+            return
+        with it:
+            for dir_entry in it:
+                name = dir_entry.name
+                rel_path = prefix + name
+                try:
+                    if dir_entry.is_dir(follow_symlinks=False):
+                        if name not in IGNORED_DIRS:
+                            self._walk(dir_entry.path, rel_path + "/", entries, changed)
+                        continue
+                    if not dir_entry.is_file() or name.endswith(IGNORED_SUFFIXES):
+                        continue
+                    stat = dir_entry.stat()
+                except OSError:
+                    continue
+                previous = self.entries.get(rel_path)
+                if previous is not None and previous.size == stat.st_size and previous.mtime_ns == stat.st_mtime_ns:
+                    entries[rel_path] = previous
+                else:
+                    changed.append((rel_path, dir_entry.path, stat))
+
+    @staticmethod
+    def _read(path: str, stat: os.stat_result) -> IndexEntry:
+        entry = IndexEntry(stat.st_size, stat.st_mtime_ns)
+        if os.path.splitext(path)[1].lower() in BINARY_SUFFIXES:
+            return entry
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except OSError as e:
+            entry.error = str(e)
+            return entry
+        if b"\0" in raw[:8192]:
+            return entry  # Binary content under a text-looking name
+        try:
+            entry.content = decode_bytes(raw, (os.path.abspath(path), stat.st_mtime_ns, stat.st_size))[0]
+        except FileOperationError as e:
+            entry.error = str(e)
+            return entry
+        entry.hash = hashlib.sha256(raw).hexdigest()
+        return entry
+
+    @property
+    def paths(self) -> FrozenSet[str]:
+        return frozenset(self.entries)
+
+    @staticmethod
+    def resolve(from_path: str, ref: str) -> Optional[str]:
+        """Project path a reference in `from_path` points to; None if it leaves the project"""
+        ref = unquote(ref.split("#", 1)[0].split("?", 1)[0])
+        if not ref:
+            return None
+        if ref.startswith("/"):
+            target = ref.lstrip("/")
+        else:
+            target = posixpath.join(posixpath.dirname(from_path), ref)
+        target = posixpath.normpath(target)
+        if target == ".." or target.startswith("../"):
+            return None
+        return target
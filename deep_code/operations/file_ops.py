@@ -1,20 +1,79 @@
-import chardet
+import codecs
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 import shutil
 import os
 
+# Only this much of a file that isn't UTF-8 is handed to chardet
+DETECTION_SAMPLE_SIZE = 64 * 1024
+# Longest BOMs first: the UTF-32 LE BOM starts with the UTF-16 LE one
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+MAX_CACHED_ENCODINGS = 1024
+# Tried when detection fails or guesses wrong; latin-1 decodes any bytes
+FALLBACK_ENCODINGS = ("cp1252", "latin-1")
+
 class FileOperationError(Exception):
     pass
 
+# (path, mtime_ns, size) -> encoding chardet picked for that version of the file
+_encodings: "OrderedDict[tuple, str]" = OrderedDict()
+
+def decode_bytes(raw: bytes, cache_key: Optional[tuple] = None) -> Tuple[str, str]:
+    """Decode file content, returning (text, encoding).
+
+    Tries, cheapest first: a BOM, strict UTF-8, the encoding detected for
+    `cache_key` before, and chardet on DETECTION_SAMPLE_SIZE bytes from
+    where UTF-8 decoding failed (the start of a file may be plain ASCII).
+    If the guess is ASCII or doesn't decode the whole file, falls back to
+    FALLBACK_ENCODINGS. Raises FileOperationError if nothing decodes it.
+    """
+    for bom, encoding in BOMS:
+        if raw.startswith(bom):
+            try:
+                return raw.decode(encoding), encoding
+            except UnicodeDecodeError as e:
+                raise FileOperationError(f"Could not decode as {encoding}: {e}")
+    try:
+        return raw.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError as e:
+        offset = e.start
+    encoding = _encodings.get(cache_key) if cache_key is not None else None
+    if encoding is None:
+        import chardet  # Slow to import and only needed for the odd legacy file
+        encoding = chardet.detect(raw[offset:offset + DETECTION_SAMPLE_SIZE])["encoding"]
+    candidates = [encoding] if encoding and encoding.lower() != "ascii" else []
+    candidates += [fallback for fallback in FALLBACK_ENCODINGS if fallback not in candidates]
+    errors = []
+    for encoding in candidates:
+        try:
+            text = raw.decode(encoding)
+        except (UnicodeDecodeError, LookupError) as e:
+            errors.append(f"{encoding}: {e}")
+            continue
+        if cache_key is not None:
+            _encodings[cache_key] = encoding
+            _encodings.move_to_end(cache_key)
+            if len(_encodings) > MAX_CACHED_ENCODINGS:
+                _encodings.popitem(last=False)
+        return text, encoding
+    _encodings.pop(cache_key, None)
+    raise FileOperationError("Could not decode the file (" + "; ".join(errors) + ")")
+
 def read_file_safe(filepath: str) -> str:
     path = Path(filepath)
     if not path.exists():
         raise FileOperationError(f"File not found: {filepath}")
     with open(filepath, 'rb') as f:
+        stat = os.fstat(f.fileno())
         raw = f.read()
-        encoding = chardet.detect(raw)["encoding"] or "utf-8"
-    return raw.decode(encoding)
+    return decode_bytes(raw, (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size))[0]
 
 def write_file_atomic(filepath: str, content: str, backup: bool = True):
     path = Path(filepath)
@@ -0,0 +1,117 @@
+import asyncio
+import re
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from deep_code.operations.code_validator import CodeValidator, ValidationError
+
+CODE_BLOCK = re.compile(r"```([a-zA-Z0-9]*)\n([\s\S]*?)```")
+
+# Fence languages that count as a reply for a file with this extension
+LANGUAGES = {
+    ".html": {"html", "htm"},
+    ".htm": {"html", "htm"},
+    ".css": {"css"},
+    ".js": {"js", "javascript"},
+}
+
+
+class FixScheduler:
+    """Fix validation errors with one concurrent request per affected file.
+
+    Errors are grouped by file; each request carries only that file, its
+    errors and the bits of the other files it has to agree with (the HTML
+    ids/classes for CSS and JS, the selectors scripts expect for HTML).
+    Requests go through `complete`, so the client's rate limiter still paces
+    them, and at most `max_parallel` are in flight at once.
+    """
+
+    def __init__(self, complete: Callable[[List[Dict[str, str]]], Awaitable[str]], system_prompt: str,
+                 max_parallel: int = 4, max_errors_per_file: int = 10):
+        self.complete = complete
+        self.system_prompt = system_prompt
+        self.max_parallel = max(1, max_parallel)
+        self.max_errors_per_file = max_errors_per_file
+
+    @staticmethod
+    def group(errors: List[ValidationError]) -> Dict[str, List[ValidationError]]:
+        """Errors by file name, in the order files first appear"""
+        groups: Dict[str, List[ValidationError]] = {}
+        for error in errors:
+            groups.setdefault(error.file_name, []).append(error)
+        return groups
+
+    def fix_prompt(self, file_name: str, errors: List[ValidationError], validator: CodeValidator) -> str:
+        """User message asking for a corrected `file_name`"""
+        shown = errors[:self.max_errors_per_file]
+        lines = [f"Fix these errors in {file_name} (output the corrected file as one code block only):", ""]
+        lines += [f"• {error.description}" for error in shown]
+        if len(errors) > len(shown):
+            lines.append(f"(+ {len(errors) - len(shown)} more errors)")
+        related = self._related_context(file_name, validator)
+        if related:
+            lines += ["", "Other project files:"] + related
+        content = validator.files.get(file_name)
+        lang = Path(file_name).suffix.lstrip(".").lower()
+        lines += ["", f"Current {file_name}:" if content is not None else f"{file_name} does not exist yet."]
+        if content is not None:
+            lines.append(f"```{lang}\n{content.rstrip()}\n```")
+        return "\n".join(lines)
+
+    def _related_context(self, file_name: str, validator: CodeValidator) -> List[str]:
+        """The minimal cross-file facts a fix to `file_name` has to respect"""
+        lines = [f"- files: {', '.join(sorted(validator.files))}"]
+        suffix = Path(file_name).suffix.lower()
+        if suffix in (".css", ".js"):
+            elements = validator.html_elements()
+            lines.append(f"- HTML ids: {', '.join(sorted(elements['ids'])) or '(none)'}")
+            lines.append(f"- HTML classes: {', '.join(sorted(elements['classes'])) or '(none)'}")
+        elif suffix in (".html", ".htm"):
+            expected = validator.script_selectors()
+            ids = sorted(s for t, s in expected if t == "id")
+            classes = sorted(s for t, s in expected if t == "class")
+            if ids:
+                lines.append(f"- ids used by scripts: {', '.join(ids)}")
+            if classes:
+                lines.append(f"- classes used by scripts: {', '.join(classes)}")
+        return lines
+
+    @staticmethod
+    def pick_block(file_name: str, reply: str) -> Optional[str]:
+        """The code block in `reply` that holds the new `file_name`, if any.
+
+        Only a block in the file's own language counts: an HTML page is never
+        written into style.css because it happened to be the first block.
+        """
+        suffix = Path(file_name).suffix.lower()
+        wanted = LANGUAGES.get(suffix, {suffix.lstrip(".")})
+        for lang, code in CODE_BLOCK.findall(reply):
+            if lang.lower() in wanted:
+                return code
+        return None
+
+    async def fix(self, validator: CodeValidator,
+                  errors: List[ValidationError]) -> Dict[str, Union[str, None, BaseException]]:
+        """Request fixes for every affected file at once.
+
+        Returns {file name: new content} for the files that came back with a
+        code block in their language, {file name: None} for replies without
+        one, and {file name: exception} for requests that failed.
+        """
+        groups = self.group(errors)
+        semaphore = asyncio.Semaphore(self.max_parallel)
+
+        async def fix_file(file_name: str, file_errors: List[ValidationError]):
+            messages = [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": self.fix_prompt(file_name, file_errors, validator)},
+            ]
+            async with semaphore:
+                reply = await self.complete(messages)
+            return self.pick_block(file_name, reply)
+
+        names = list(groups)
+        results = await asyncio.gather(
+            *(fix_file(name, groups[name]) for name in names), return_exceptions=True
+        )
+        return dict(zip(names, results))
@@ -0,0 +1,57 @@
+from typing import Dict, List, Optional, Set
+
+from deep_code.operations import scanner
+from deep_code.operations.selectors import DomIndex
+
+
+class HtmlDocument:
+    """What the validator needs to know about one HTML file, from a single scan.
+
+    Holds the ids (in document order, so duplicates survive), classes and
+    tag names used, which of <html>/<head>/<body> are present, and the
+    script, stylesheet and image references.
+    """
+
+    def __init__(self, table: scanner.SymbolTable):
+        self.table = table
+        self.ids: List[str] = table.values(scanner.ID)
+        self.classes: Set[str] = set(table.values(scanner.CLASS))
+        self.tags: Set[str] = table.tags
+        self.scripts: List[str] = table.values(scanner.SCRIPT_REF)
+        self.stylesheets: List[str] = table.values(scanner.STYLESHEET_REF)
+        self.images: List[str] = table.values(scanner.IMAGE_REF)
+        self._dom: Optional[DomIndex] = None
+
+    @property
+    def dom(self) -> DomIndex:
+        """Element index for CSS selector matching, built on first use"""
+        if self._dom is None:
+            self._dom = DomIndex(self.table.elements)
+        return self._dom
+
+    @property
+    def has_html(self) -> bool:
+        return "html" in self.tags
+
+    @property
+    def has_head(self) -> bool:
+        return "head" in self.tags
+
+    @property
+    def has_body(self) -> bool:
+        return "body" in self.tags
+
+
+def parse_html(content: str) -> HtmlDocument:
+    """Parse `content`; the scan behind it is shared with every other caller"""
+    return HtmlDocument(scanner.scan(content, "html"))
+
+
+def collect_elements(documents: List[HtmlDocument]) -> Dict[str, Set[str]]:
+    """Union of the ids, classes and tags used across `documents`"""
+    elements = {"ids": set(), "classes": set(), "tags": set()}
+    for document in documents:
+        elements["ids"].update(document.ids)
+        elements["classes"].update(document.classes)
+        elements["tags"].update(document.tags)
+    return elements
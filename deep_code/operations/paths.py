@@ -0,0 +1,4 @@
+"""Names shared by everything that reads or writes inside a project folder"""
+
+# Per-project directory for deep-code's own state (snapshots, staged writes)
+STATE_DIR = ".deep-code"
@@ -0,0 +1,164 @@
+"""Rewriting file references when project files are renamed.
+
+Only real reference positions are touched: the spans the scanner found for
+<script src>, <link href>, <img src>, imports, CSS url()s and shell
+`source` lines. Each reference is resolved to a project path and looked up
+in the rename map, so renaming app.js leaves myapp.js, "app.json" and
+prose mentioning app.js alone, and a file is rewritten in one pass however
+many renames there are.
+"""
+import bisect
+import posixpath
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from deep_code.operations import scanner
+from deep_code.operations.file_index import FileIndex
+
+# Symbol kinds that name another project file
+REFERENCE_KINDS = (
+    scanner.SCRIPT_REF, scanner.STYLESHEET_REF, scanner.IMAGE_REF,
+    scanner.IMPORT, scanner.CSS_URL, scanner.SOURCE, scanner.PY_IMPORT,
+)
+EXTERNAL_PREFIXES = ("http:", "https:", "//", "data:", "mailto:")
+
+
+def is_external(ref: str) -> bool:
+    return ref.lower().startswith(EXTERNAL_PREFIXES)
+
+
+def split_suffix(ref: str) -> Tuple[str, str]:
+    """("path", "?query#hash") parts of a reference"""
+    cut = min((i for i in (ref.find("?"), ref.find("#")) if i != -1), default=len(ref))
+    return ref[:cut], ref[cut:]
+
+
+def relative_ref(original: str, from_path: str, new_path: str) -> str:
+    """Spell `new_path` the way `original` was spelled: absolute, ./-relative or plain relative"""
+    if original.startswith("/"):
+        return "/" + new_path
+    ref = posixpath.relpath(new_path, posixpath.dirname(from_path) or ".")
+    if original.startswith("./") and not ref.startswith("../"):
+        ref = "./" + ref
+    return ref
+
+
+def renamed_reference(symbol: scanner.Symbol, from_path: str, renames: Dict[str, str]) -> Optional[str]:
+    """New value for a reference symbol if the file it points to was renamed, else None"""
+    if symbol.kind == scanner.PY_IMPORT:
+        if symbol.value.startswith("."):
+            return None
+        new_path = renames.get(symbol.value.replace(".", "/") + ".py")
+        return new_path[:-3].replace("/", ".") if new_path and new_path.endswith(".py") else None
+    if is_external(symbol.value):
+        return None
+    path, suffix = split_suffix(symbol.value)
+    target = FileIndex.resolve(from_path, path)
+    if target is None:
+        return None
+    new_path = renames.get(target)
+    if new_path is None and symbol.kind == scanner.IMPORT and not posixpath.splitext(target)[1]:
+        # Extensionless JS import: "./utils" for utils.js
+        new_path = renames.get(target + ".js")
+        if new_path is not None:
+            new_path = posixpath.splitext(new_path)[0]
+    if new_path is None or new_path == target:
+        return None
+    return relative_ref(path, from_path, new_path) + suffix
+
+
+def rename_references(content: str, language: Optional[str], file_path: str, renames: Dict[str, str],
+                      kind_renames: Optional[Dict[str, Dict[str, str]]] = None) -> str:
+    """Point the references in `content` at renamed files.
+
+    `renames` maps old project paths to new ones for every reference kind;
+    `kind_renames` adds mappings that apply only to one kind (e.g. script
+    references only). `file_path` is the file's own project path, which
+    relative references are resolved against.
+    """
+    if not renames and not kind_renames:
+        return content
+    table = scanner.scan(content, language)
+    if not table.symbols:
+        return content
+    maps = {kind: renames for kind in REFERENCE_KINDS}
+    for kind, extra in (kind_renames or {}).items():
+        maps[kind] = {**renames, **extra}
+    return scanner.rewrite(
+        content, table.of(*REFERENCE_KINDS),
+        lambda symbol: renamed_reference(symbol, file_path, maps[symbol.kind])
+    )
+
+
+class ReferenceResolver:
+    """Finds the project file a broken reference most likely meant.
+
+    Built once over a project's paths, so each lookup is a few dict hits
+    and binary searches instead of a scan over every file. Candidates are
+    ranked, and the first rank with a match wins:
+
+      1. the same file name in another directory ("app.js" -> "js/app.js")
+      2. the same name with another extension ("app.jsx" -> "app.js")
+      3. a path starting with the name ("util" -> "utils.js")
+      4. a file name starting with the name ("util" -> "lib/utils.js")
+
+    Within ranks 1 and 2 the shortest path wins, within 3 and 4 the first
+    in alphabetical order; `exts` restricts candidates to those extensions.
+    """
+
+    def __init__(self, paths: Iterable[str]):
+        self.paths = set(paths)
+        self._by_name: Dict[str, List[str]] = {}
+        self._by_stem: Dict[str, List[str]] = {}
+        self._by_ext: Dict[str, List[str]] = {}
+        self._names_by_ext: Dict[str, List[Tuple[str, str]]] = {}
+        for path in self.paths:
+            name = posixpath.basename(path)
+            stem, ext = posixpath.splitext(name)
+            self._by_name.setdefault(name, []).append(path)
+            self._by_stem.setdefault(stem, []).append(path)
+            self._by_ext.setdefault(ext.lower(), []).append(path)
+            self._names_by_ext.setdefault(ext.lower(), []).append((name, path))
+        for index in (self._by_name, self._by_stem):
+            for paths in index.values():
+                paths.sort(key=lambda path: (len(path), path))
+        for index in (self._by_ext, self._names_by_ext):
+            for entries in index.values():
+                entries.sort()
+        self._all = sorted(self.paths)
+        self._all_names = sorted((posixpath.basename(path), path) for path in self.paths)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.paths
+
+    def with_ext(self, *exts: str) -> List[str]:
+        """Project paths with one of `exts` (lowercase, with the dot), sorted"""
+        return sorted(path for ext in exts for path in self._by_ext.get(ext, ()))
+
+    def near_match(self, ref: str, exts: Optional[Tuple[str, ...]] = None) -> Optional[str]:
+        """The best-ranked project path for `ref`, or None"""
+        name = posixpath.basename(ref)
+        stem = posixpath.splitext(name)[0]
+        if not stem:
+            return None
+        for candidates in (self._by_name.get(name, ()), self._by_stem.get(stem, ())):
+            for path in candidates:
+                if exts is None or path.lower().endswith(exts):
+                    return path
+        paths = [self._all] if exts is None else [self._by_ext.get(ext, []) for ext in exts]
+        match = min(filter(None, (self._first_with_prefix(entries, stem) for entries in paths)), default=None)
+        if match is not None:
+            return match
+        names = [self._all_names] if exts is None else [self._names_by_ext.get(ext, []) for ext in exts]
+        found = [entry for entry in (self._first_with_prefix(entries, (stem,)) for entries in names) if entry]
+        return min(found)[1] if found else None
+
+    @staticmethod
+    def _first_with_prefix(entries: list, prefix):
+        """First entry of sorted `entries` starting with `prefix` (a string, or a 1-tuple for (name, path) pairs)"""
+        index = bisect.bisect_left(entries, prefix)
+        if index == len(entries):
+            return None
+        entry = entries[index]
+        key = entry[0] if isinstance(prefix, tuple) else entry
+        text = prefix[0] if isinstance(prefix, tuple) else prefix
+        return entry if key.startswith(text) else None
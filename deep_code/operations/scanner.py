@@ -0,0 +1,364 @@
+"""Single-pass scanner for the references and selectors in project files.
+
+Each file is scanned once (HTML with html.parser, the rest with precompiled
+patterns) into a SymbolTable of typed symbols (script/stylesheet/image
+references, ids, classes, JS selector usages, imports, CSS url()s). The
+validator and the CLI's harmonisation steps all read from that table, so
+they agree on what a file references.
+Every symbol records the span of its value, so fixes can be spliced in
+without re-scanning (-1 when a decoded value has no single source span).
+"""
+import hashlib
+import re
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+# Symbol kinds
+SCRIPT_REF = "script"
+STYLESHEET_REF = "stylesheet"
+IMAGE_REF = "image"
+ID = "id"
+CLASS = "class"
+JS_ID = "js_id"
+JS_CLASS = "js_class"
+JS_NAME = "js_name"
+IMPORT = "import"
+CSS_URL = "css_url"
+PY_IMPORT = "py_import"
+SOURCE = "source"
+
+# Fence languages / file extensions -> scanner language
+LANGUAGES = {
+    "html": "html", "htm": "html",
+    "css": "css",
+    "js": "js", "javascript": "js", "jsx": "js", "ts": "js", "tsx": "js", "mjs": "js",
+    "py": "py", "python": "py",
+    "sh": "sh", "bash": "sh",
+}
+
+# Scanned tables kept across callers, keyed by language and content hash
+MAX_CACHED_TABLES = 256
+
+# Attributes inside a start tag's source text, for the spans of their values
+HTML_ATTR = re.compile(r"([^\s=/>\"']+)(?:\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s>\"']+)))?")
+# Attributes that can hold a symbol, and the span of a value with no single source span
+SYMBOL_ATTRS = frozenset({"id", "class", "src", "href"})
+NO_SPAN = (-1, -1)
+START_TAG_NAME = re.compile(r"<[^\s/>]*")
+LINE_START = re.compile(r"\n")
+CLASS_NAME = re.compile(r"\S+")
+# Elements that never have content or an end tag
+VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr",
+})
+# Elements closed implicitly by an opening sibling of the same kind
+SELF_CLOSING_SIBLINGS = {
+    "li": {"li"}, "p": {"p"}, "option": {"option"}, "tr": {"tr"},
+    "td": {"td", "th"}, "th": {"td", "th"}, "dt": {"dt", "dd"}, "dd": {"dt", "dd"},
+}
+
+CSS_TOKEN = re.compile(
+    r"/\*.*?\*/"
+    r"|url\(\s*([\"']?)([^\"')]+?)\1\s*\)"
+    r"|@import\s+([\"'])([^\"']+)\3",
+    re.S
+)
+
+JS_TOKEN = re.compile(
+    r"//[^\n]*|/\*.*?\*/"
+    r"|\b(getElementById|getElementsByClassName|getElementsByName|querySelector(?:All)?)\s*\(\s*([\"'`])((?:(?!\2)[^\\\n])*)\2"
+    r"|\bimport\s+(?:[\w*{}\s,$]+?\s+from\s+)?([\"'])([^\"'\n]+)\4"
+    r"|\brequire\s*\(\s*([\"'])([^\"'\n]+)\6\s*\)"
+    r"|\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`",
+    re.S
+)
+# The rightmost compound of a selector (the element a query returns), when it is a lone #id
+SELECTOR_SUBJECT_ID = re.compile(r"(?:^|[\s>+~])#([\w-]+)\s*$")
+JS_SELECTOR_KINDS = {
+    "getElementById": JS_ID,
+    "getElementsByClassName": JS_CLASS,
+    "getElementsByName": JS_NAME,
+}
+
+PY_TOKEN = re.compile(r"^[ \t]*(?:from[ \t]+([\w.]+)[ \t]+import\b|import[ \t]+([\w.]+))", re.M)
+SH_TOKEN = re.compile(r"(?:^|[;&|]\s*)(?:source|\.)[ \t]+([^\s;&|]+)", re.M)
+
+
+class Symbol(NamedTuple):
+    kind: str
+    value: str
+    start: int  # Span of the value in the scanned content
+    end: int
+
+
+class Element:
+    """One HTML element, linked to its parent and previous sibling for selector matching"""
+
+    __slots__ = ("index", "tag", "id", "classes", "attrs", "parent", "prev", "last_child")
+
+    def __init__(self, index: int, tag: str, attrs: Dict[str, str], parent: Optional["Element"],
+                 prev: Optional["Element"]):
+        self.index = index  # Position in document order
+        self.tag = tag
+        self.attrs = attrs
+        self.id = attrs.get("id")
+        self.classes = frozenset(attrs.get("class", "").split())
+        self.parent = parent
+        self.prev = prev
+        self.last_child: Optional[Element] = None
+
+
+class SymbolTable:
+    """Everything the scanner found in one file, in source order (per tag for HTML attributes)"""
+
+    def __init__(self, language: str):
+        self.language = language
+        self.symbols: List[Symbol] = []
+        self.tags: Set[str] = set()
+        self.elements: List[Element] = []  # HTML only, in document order
+
+    def add(self, kind: str, value: str, start: int, end: Optional[int] = None):
+        self.symbols.append(Symbol(kind, value, start, start + len(value) if end is None else end))
+
+    def of(self, *kinds: str) -> List[Symbol]:
+        return [symbol for symbol in self.symbols if symbol.kind in kinds]
+
+    def values(self, *kinds: str) -> List[str]:
+        return [symbol.value for symbol in self.symbols if symbol.kind in kinds]
+
+    def __getstate__(self):
+        # Elements are stored by index: pickling the parent/sibling links
+        # directly would recurse once per element on long sibling chains
+        elements = [
+            (element.tag, element.attrs,
+             element.parent.index if element.parent is not None else -1,
+             element.prev.index if element.prev is not None else -1)
+            for element in self.elements
+        ]
+        return self.language, self.symbols, self.tags, elements
+
+    def __setstate__(self, state):
+        self.language, self.symbols, self.tags, elements = state
+        self.elements = []
+        for index, (tag, attrs, parent_index, prev_index) in enumerate(elements):
+            parent = self.elements[parent_index] if parent_index >= 0 else None
+            prev = self.elements[prev_index] if prev_index >= 0 else None
+            element = Element(index, tag, attrs, parent, prev)
+            if parent is not None:
+                parent.last_child = element
+            self.elements.append(element)
+
+
+def language_of(file_name: str, lang: str = "") -> Optional[str]:
+    """Scanner language for a fence language or, failing that, a file extension"""
+    language = LANGUAGES.get(lang.lower()) if lang else None
+    if language is None and "." in file_name:
+        language = LANGUAGES.get(file_name.rsplit(".", 1)[1].lower())
+    return language
+
+
+class _HtmlScanner(HTMLParser):
+    """Streaming html.parser subclass that fills a SymbolTable without building a tree.
+
+    html.parser does the tokenising (comments, raw script/style text,
+    unquoted attributes, character references); attribute values are
+    decoded, and each symbol's span still points at the value's source text.
+    """
+
+    def __init__(self, content: str, table: SymbolTable):
+        super().__init__(convert_charrefs=True)
+        self.content = content
+        self.table = table
+        self.line_starts = [0] + [match.end() for match in LINE_START.finditer(content)]
+        self.open_elements: List[Element] = []
+        self.last_root: Optional[Element] = None
+
+    def _value_spans(self) -> Dict[str, Tuple[int, int]]:
+        """Attribute name -> source span of its value in the current start tag"""
+        line, column = self.getpos()
+        offset = self.line_starts[line - 1] + column
+        text = self.get_starttag_text() or ""
+        spans = {}
+        name_end = START_TAG_NAME.match(text).end()
+        for attr in HTML_ATTR.finditer(text, name_end):
+            for group in (2, 3, 4):
+                if attr.group(group) is not None:
+                    spans[attr.group(1).lower()] = (offset + attr.start(group), offset + attr.end(group))
+                    break
+        return spans
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]], self_closing: bool = False):
+        table = self.table
+        table.tags.add(tag)
+        values = {name: value for name, value in attrs if value is not None}
+        open_elements = self.open_elements
+        siblings = SELF_CLOSING_SIBLINGS.get(tag)
+        if siblings and open_elements and open_elements[-1].tag in siblings:
+            open_elements.pop()
+        parent = open_elements[-1] if open_elements else None
+        element = Element(len(table.elements), tag, values, parent,
+                          parent.last_child if parent else self.last_root)
+        if parent:
+            parent.last_child = element
+        else:
+            self.last_root = element
+        table.elements.append(element)
+        if tag not in VOID_TAGS and not self_closing:
+            open_elements.append(element)
+        if SYMBOL_ATTRS.isdisjoint(values):
+            return
+
+        spans = self._value_spans()
+        if "id" in values:
+            table.add(ID, values["id"], *spans.get("id", NO_SPAN))
+        if "class" in values:
+            start, end = spans.get("class", NO_SPAN)
+            value = values["class"]
+            if start >= 0 and self.content[start:end] == value:
+                for name in CLASS_NAME.finditer(value):
+                    table.add(CLASS, name.group(), start + name.start())
+            else:
+                # Character references in the value: the tokens have no exact span
+                for name in value.split():
+                    table.add(CLASS, name, *NO_SPAN)
+        kind = name = None
+        if tag == "script" and "src" in values:
+            kind, name = SCRIPT_REF, "src"
+        elif tag == "img" and "src" in values:
+            kind, name = IMAGE_REF, "src"
+        elif tag == "link" and "href" in values:
+            rel = values.get("rel", "").lower().split()
+            if "stylesheet" in rel or (not rel and values["href"].lower().endswith(".css")):
+                kind, name = STYLESHEET_REF, "href"
+        if kind is not None:
+            table.add(kind, values[name], *spans.get(name, NO_SPAN))
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        self.handle_starttag(tag, attrs, self_closing=True)
+
+    def handle_endtag(self, tag: str):
+        # Close the element and anything left open inside it
+        open_elements = self.open_elements
+        for index in range(len(open_elements) - 1, -1, -1):
+            if open_elements[index].tag == tag:
+                del open_elements[index:]
+                return
+
+
+def _scan_html(content: str, table: SymbolTable):
+    parser = _HtmlScanner(content, table)
+    parser.feed(content)
+    parser.close()
+
+
+def _scan_css(content: str, table: SymbolTable):
+    for match in CSS_TOKEN.finditer(content):
+        if match.group(2) is not None:
+            table.add(CSS_URL, match.group(2), match.start(2))
+        elif match.group(4) is not None:
+            table.add(IMPORT, match.group(4), match.start(4))
+
+
+def _scan_js(content: str, table: SymbolTable):
+    for match in JS_TOKEN.finditer(content):
+        method = match.group(1)
+        if method is not None:
+            argument, start = match.group(3), match.start(3)
+            kind = JS_SELECTOR_KINDS.get(method)
+            if kind is not None:
+                table.add(kind, argument, start)
+            else:
+                # Only an id the query returns must exist in the page; classes and
+                # ancestors in the selector are often added by the script itself
+                offset = 0
+                for selector in argument.split(","):
+                    subject = SELECTOR_SUBJECT_ID.search(selector)
+                    if subject is not None:
+                        table.add(JS_ID, subject.group(1), start + offset + subject.start(1))
+                    offset += len(selector) + 1
+        elif match.group(5) is not None:
+            table.add(IMPORT, match.group(5), match.start(5))
+        elif match.group(7) is not None:
+            table.add(IMPORT, match.group(7), match.start(7))
+
+
+def _scan_py(content: str, table: SymbolTable):
+    for match in PY_TOKEN.finditer(content):
+        group = 1 if match.group(1) is not None else 2
+        table.add(PY_IMPORT, match.group(group), match.start(group))
+
+
+def _scan_sh(content: str, table: SymbolTable):
+    for match in SH_TOKEN.finditer(content):
+        table.add(SOURCE, match.group(1), match.start(1))
+
+
+SCANNERS: Dict[str, Callable[[str, SymbolTable], None]] = {
+    "html": _scan_html,
+    "css": _scan_css,
+    "js": _scan_js,
+    "py": _scan_py,
+    "sh": _scan_sh,
+}
+
+_tables: "OrderedDict[tuple, SymbolTable]" = OrderedDict()
+
+
+def _cache_key(content: str, language: str) -> tuple:
+    return language, hashlib.sha256(content.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _remember(key: tuple, table: SymbolTable):
+    _tables[key] = table
+    if len(_tables) > MAX_CACHED_TABLES:
+        _tables.popitem(last=False)
+
+
+def scan(content: str, language: Optional[str]) -> SymbolTable:
+    """Symbol table for `content`; languages without a scanner give an empty table"""
+    scanner = SCANNERS.get(language)
+    if scanner is None:
+        return SymbolTable(language or "")
+    key = _cache_key(content, language)
+    table = _tables.get(key)
+    if table is not None:
+        _tables.move_to_end(key)
+        return table
+    table = SymbolTable(language)
+    scanner(content, table)
+    _remember(key, table)
+    return table
+
+
+def clear_cache():
+    """Forget every cached table (benchmarks use this to measure cold scans)"""
+    _tables.clear()
+
+
+def store(content: str, table: SymbolTable):
+    """Cache a table scanned elsewhere (e.g. in a worker process) for `content`"""
+    if table.language in SCANNERS:
+        _remember(_cache_key(content, table.language), table)
+
+
+def scan_file(file_name: str, content: str, lang: str = "") -> SymbolTable:
+    return scan(content, language_of(file_name, lang))
+
+
+def rewrite(content: str, symbols: List[Symbol], fix: Callable[[Symbol], Optional[str]]) -> str:
+    """Splice fix(symbol) over each symbol's value where it returns a new one"""
+    parts = []
+    pos = 0
+    for symbol in sorted(symbols, key=lambda s: s.start):
+        new_value = fix(symbol)
+        if new_value is None or new_value == symbol.value or symbol.start < pos:
+            continue
+        parts.append(content[pos:symbol.start])
+        parts.append(new_value)
+        pos = symbol.end
+    if not parts:
+        return content
+    parts.append(content[pos:])
+    return "".join(parts)
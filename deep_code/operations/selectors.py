@@ -0,0 +1,287 @@
+"""CSS selector parsing and matching against the elements of scanned HTML files.
+
+Selectors are matched right to left: the rightmost compound picks its
+candidates from an index (by id, class or tag), and only those candidates
+are walked up their parent/sibling links. Pseudo-classes and
+pseudo-elements are ignored, since they depend on state the static page
+doesn't have, and a selector the parser doesn't understand is treated as
+matching rather than reported.
+"""
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from deep_code.operations.scanner import Element
+
+SELECTOR_TOKEN = re.compile(
+    r"\s*([>+~])\s*"                                   # 1: explicit combinator
+    r"|(\s+)"                                          # 2: descendant combinator
+    r"|(\*|[a-zA-Z][\w-]*)"                            # 3: type selector
+    r"|#([\w-]+)"                                      # 4: id
+    r"|\.([\w-]+)"                                     # 5: class
+    r"|\[\s*([\w:-]+)\s*"                              # 6: attribute name
+    r"(?:([~|^$*]?=)\s*(?:\"([^\"]*)\"|'([^']*)'|([^\]\s]+))\s*(?:[iIsS]\s*)?)?\]"  # 7: operator, 8-10: value
+    r"|::?[\w-]+(?:\((?:[^()]|\([^()]*\))*\))?"        # pseudo-class / pseudo-element (ignored)
+)
+
+# Rule blocks whose content is more rules (anything else holds declarations or keyframes)
+NESTING_AT_RULES = ("@media", "@supports", "@layer", "@container", "@document")
+CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+
+
+class Compound(NamedTuple):
+    tag: Optional[str]
+    id: Optional[str]
+    classes: Tuple[str, ...]
+    attrs: Tuple[Tuple[str, Optional[str], Optional[str]], ...]  # (name, operator, value)
+
+
+def _new_compound() -> Dict:
+    return {"tag": None, "id": None, "classes": [], "attrs": []}
+
+
+def _freeze(parts: Dict) -> Compound:
+    return Compound(parts["tag"], parts["id"], tuple(parts["classes"]), tuple(parts["attrs"]))
+
+
+@lru_cache(maxsize=4096)
+def parse_selector(selector: str) -> Optional[Tuple[Tuple[str, Compound], ...]]:
+    """((combinator, compound), ...) left to right, or None if unsupported.
+
+    The first compound's combinator is "". Combinators are " ", ">", "+" or "~".
+    """
+    selector = selector.strip()
+    if not selector:
+        return None
+    steps: List[Tuple[str, Compound]] = []
+    combinator = ""
+    compound = _new_compound()
+    empty = True
+    pos = 0
+    while pos < len(selector):
+        match = SELECTOR_TOKEN.match(selector, pos)
+        if match is None or match.end() == pos:
+            return None
+        pos = match.end()
+        if match.group(1) or match.group(2):
+            if empty:
+                return None  # Leading or doubled combinator
+            steps.append((combinator, _freeze(compound)))
+            combinator = match.group(1) or " "
+            compound = _new_compound()
+            empty = True
+            continue
+        empty = False
+        if match.group(3):
+            if compound["tag"] or compound["id"] or compound["classes"] or compound["attrs"]:
+                return None  # Type selector must come first in a compound
+            compound["tag"] = match.group(3).lower()
+        elif match.group(4):
+            compound["id"] = match.group(4)
+        elif match.group(5):
+            compound["classes"].append(match.group(5))
+        elif match.group(6):
+            value = next((v for v in match.group(8, 9, 10) if v is not None), None)
+            compound["attrs"].append((match.group(6).lower(), match.group(7), value))
+    if empty:
+        return None
+    steps.append((combinator, _freeze(compound)))
+    return tuple(steps)
+
+
+def split_selector_list(prelude: str) -> List[str]:
+    """Split "h1, h2 > a" into its selectors, ignoring commas inside (...) and [...]"""
+    selectors = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(prelude):
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth = max(0, depth - 1)
+        elif char == "," and depth == 0:
+            selectors.append(prelude[start:i])
+            start = i + 1
+    selectors.append(prelude[start:])
+    return [selector.strip() for selector in selectors if selector.strip()]
+
+
+def css_rule_selectors(css: str) -> List[str]:
+    """Every selector of every style rule, including rules nested in @media and friends"""
+    css = CSS_COMMENT.sub(" ", css)
+    selectors = []
+    depth = 0
+    skip_depth = None  # Depth of a block whose content is not rules
+    nested = [True]  # Whether each open block holds rules
+    start = 0
+    for i, char in enumerate(css):
+        if char == "{":
+            prelude = css[start:i].strip()
+            holds_rules = False
+            if skip_depth is None and nested[-1]:
+                if prelude.startswith("@"):
+                    holds_rules = prelude.lower().startswith(NESTING_AT_RULES)
+                elif prelude:
+                    selectors.extend(split_selector_list(prelude))
+            depth += 1
+            nested.append(holds_rules)
+            if skip_depth is None and not holds_rules:
+                skip_depth = depth
+            start = i + 1
+        elif char == "}":
+            if skip_depth == depth:
+                skip_depth = None
+            depth = max(0, depth - 1)
+            if len(nested) > 1:
+                nested.pop()
+            start = i + 1
+        elif char == ";" and skip_depth is None:
+            start = i + 1  # End of an at-rule statement such as @import
+    return selectors
+
+
+def _attr_matches(element: Element, name: str, operator: Optional[str], expected: Optional[str]) -> bool:
+    value = element.attrs.get(name)
+    if value is None:
+        return False
+    if operator is None:
+        return True
+    if operator == "=":
+        return value == expected
+    if operator == "~=":
+        return expected in value.split()
+    if operator == "|=":
+        return value == expected or value.startswith(expected + "-")
+    if operator == "^=":
+        return bool(expected) and value.startswith(expected)
+    if operator == "$=":
+        return bool(expected) and value.endswith(expected)
+    if operator == "*=":
+        return bool(expected) and expected in value
+    return False
+
+
+def compound_matches(compound: Compound, element: Element) -> bool:
+    if compound.tag and compound.tag != "*" and compound.tag != element.tag:
+        return False
+    if compound.id is not None and compound.id != element.id:
+        return False
+    for name in compound.classes:
+        if name not in element.classes:
+            return False
+    for name, operator, value in compound.attrs:
+        if not _attr_matches(element, name, operator, value):
+            return False
+    return True
+
+
+def _matches_from(element: Element, steps, index: int) -> bool:
+    """Whether `element` matches steps[index] and the steps left of it"""
+    combinator, compound = steps[index]
+    if not compound_matches(compound, element):
+        return False
+    if index == 0:
+        return True
+    if combinator == ">":
+        return element.parent is not None and _matches_from(element.parent, steps, index - 1)
+    if combinator == "+":
+        return element.prev is not None and _matches_from(element.prev, steps, index - 1)
+    relative = element.parent if combinator == " " else element.prev
+    while relative is not None:
+        if _matches_from(relative, steps, index - 1):
+            return True
+        relative = relative.parent if combinator == " " else relative.prev
+    return False
+
+
+class DomIndex:
+    """Elements of one HTML file indexed by tag, id and class.
+
+    Element lists are kept in document order, and `ends[i]` is the index of
+    the last descendant of element i, so "inside element e" is a range
+    lookup. That lets a selector such as ".sidebar a" start from the few
+    .sidebar elements instead of checking every <a> on the page.
+    """
+
+    def __init__(self, elements: List[Element]):
+        self.elements = elements
+        self.by_tag: Dict[str, List[Element]] = {}
+        self.by_id: Dict[str, List[Element]] = {}
+        self.by_class: Dict[str, List[Element]] = {}
+        self._results: Dict[str, bool] = {}  # selector -> matched
+        self.ends = [element.index for element in elements]
+        for element in reversed(elements):
+            if element.parent is not None:
+                parent_end = self.ends[element.parent.index]
+                if self.ends[element.index] > parent_end:
+                    self.ends[element.parent.index] = self.ends[element.index]
+        for element in elements:
+            self.by_tag.setdefault(element.tag, []).append(element)
+            if element.id is not None:
+                self.by_id.setdefault(element.id, []).append(element)
+            for name in element.classes:
+                self.by_class.setdefault(name, []).append(element)
+
+    def _possible(self, compound: Compound) -> bool:
+        """Cheap necessary condition: every id, class and tag the compound needs occurs somewhere"""
+        if compound.id is not None and compound.id not in self.by_id:
+            return False
+        if compound.tag and compound.tag != "*" and compound.tag not in self.by_tag:
+            return False
+        return all(name in self.by_class for name in compound.classes)
+
+    def _candidates(self, compound: Compound) -> List[Element]:
+        if compound.id is not None:
+            return self.by_id.get(compound.id, [])
+        if compound.classes:
+            return min((self.by_class.get(name, []) for name in compound.classes), key=len)
+        if compound.tag and compound.tag != "*":
+            return self.by_tag.get(compound.tag, [])
+        return self.elements
+
+    def matches(self, selector: str) -> bool:
+        """Whether any element matches `selector` (unsupported selectors count as matching)"""
+        result = self._results.get(selector)
+        if result is None:
+            result = self._matches(selector)
+            self._results[selector] = result
+        return result
+
+    def _matches(self, selector: str) -> bool:
+        steps = parse_selector(selector)
+        if steps is None:
+            return True
+        if not all(self._possible(compound) for _, compound in steps):
+            return False
+        last = len(steps) - 1
+        candidates = self._candidates(steps[-1][1])
+        scope = self._narrowest_scope(steps, len(candidates))
+        if scope is not None:
+            candidates = self._within(candidates, scope)
+        return any(_matches_from(element, steps, last) for element in candidates)
+
+    def _narrowest_scope(self, steps, limit: int) -> Optional[List[Element]]:
+        """Smallest candidate list, under `limit`, of a compound the last one must sit inside"""
+        best = None
+        for index in range(len(steps) - 1, 0, -1):
+            if steps[index][0] not in (" ", ">"):
+                break  # Sibling combinators leave the ancestor chain
+            pool = self._candidates(steps[index - 1][1])
+            if len(pool) < (limit if best is None else len(best)):
+                best = pool
+        return best
+
+    def _within(self, candidates: List[Element], scope: List[Element]) -> List[Element]:
+        """The candidates that are descendants of some element in `scope`"""
+        positions = [element.index for element in candidates]
+        found = []
+        covered = -1  # Scope elements nested in an earlier one add nothing
+        for element in scope:
+            if element.index <= covered:
+                continue
+            covered = self.ends[element.index]
+            start = bisect_right(positions, element.index)
+            end = bisect_right(positions, covered)
+            found.extend(candidates[start:end])
+        return found
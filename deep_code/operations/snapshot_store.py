@@ -0,0 +1,273 @@
+import difflib
+import hashlib
+import json
+import os
+import time
+import zlib
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from deep_code.operations.file_ops import FileOperationError, decode_bytes
+from deep_code.operations.paths import STATE_DIR
+
+
+class Snapshot(NamedTuple):
+    id: int
+    parent: Optional[int]
+    turn: int
+    label: str
+    time: float
+    files: Dict[str, List]  # path -> [sha256, size, mtime_ns]
+
+
+class SnapshotStore:
+    """Content-addressed history of a project's generated files.
+
+    File contents live once each in .deep-code/objects/, keyed by SHA-256
+    (zlib-compressed unless `compress` is off), so recording a file that
+    didn't change costs nothing. Each snapshot is a small manifest under
+    .deep-code/snapshots/ mapping paths to content hashes, tagged with the
+    turn that produced it and linked to its parent; HEAD names the snapshot
+    the project is at. Snapshots of the last `keep_turns` turns are kept,
+    and objects no snapshot refers to are deleted.
+    """
+
+    def __init__(self, root: str, keep_turns: int = 5, compress: bool = True):
+        self.root = root
+        self.keep_turns = max(1, keep_turns)
+        self.compress = compress
+        self.dir = os.path.join(root, STATE_DIR)
+        self.objects_dir = os.path.join(self.dir, "objects")
+        self.snapshots_dir = os.path.join(self.dir, "snapshots")
+        self._snapshots: Optional[Dict[int, Snapshot]] = None
+        self._label = ""
+        self.turn = max((s.turn for s in self.snapshots.values()), default=0)
+
+    # --- reading -------------------------------------------------------------
+
+    @property
+    def snapshots(self) -> Dict[int, Snapshot]:
+        if self._snapshots is None:
+            self._snapshots = {}
+            if os.path.isdir(self.snapshots_dir):
+                for name in os.listdir(self.snapshots_dir):
+                    if not name.endswith(".json"):
+                        continue
+                    try:
+                        with open(os.path.join(self.snapshots_dir, name), "r", encoding="utf-8") as f:
+                            snapshot = Snapshot(**json.load(f))
+                    except (OSError, ValueError, TypeError):
+                        continue
+                    self._snapshots[snapshot.id] = snapshot
+        return self._snapshots
+
+    @property
+    def head(self) -> Optional[Snapshot]:
+        try:
+            with open(os.path.join(self.dir, "HEAD"), "r", encoding="utf-8") as f:
+                return self.snapshots.get(int(f.read().strip()))
+        except (OSError, ValueError):
+            return None
+
+    def history(self) -> List[Snapshot]:
+        """The last snapshot of each turn still kept, oldest turn first.
+
+        Turns undone with a rollback stay listed (until they age out), so a
+        rollback can be rolled forward again.
+        """
+        latest: Dict[int, Snapshot] = {}
+        for snapshot in sorted(self.snapshots.values(), key=lambda s: s.id):
+            latest[snapshot.turn] = snapshot
+        return [latest[turn] for turn in sorted(latest)]
+
+    def at_turn(self, turn: int) -> Optional[Snapshot]:
+        """The project as it was at the end of `turn`"""
+        return next((s for s in self.history() if s.turn == turn), None)
+
+    def before_head_turn(self) -> Optional[Snapshot]:
+        """The project as it was before HEAD's turn started"""
+        head = self.head
+        snapshot = head
+        while snapshot is not None and snapshot.turn == head.turn:
+            snapshot = self.snapshots.get(snapshot.parent) if snapshot.parent is not None else None
+        return snapshot
+
+    def read(self, digest: str) -> bytes:
+        path = self._object_path(digest)
+        if os.path.exists(path + ".z"):
+            with open(path + ".z", "rb") as f:
+                return zlib.decompress(f.read())
+        with open(path, "rb") as f:
+            return f.read()
+
+    def diff(self, old: Snapshot, new: Snapshot) -> str:
+        """Unified diff of the files that differ between two snapshots"""
+        chunks = []
+        for path in sorted(set(old.files) | set(new.files)):
+            before = old.files.get(path)
+            after = new.files.get(path)
+            if before is not None and after is not None and before[0] == after[0]:
+                continue
+            chunks.extend(difflib.unified_diff(
+                self._lines(before), self._lines(after),
+                f"a/{path}" if before else "/dev/null", f"b/{path}" if after else "/dev/null"
+            ))
+        return "".join(chunks)
+
+    def restore_plan(self, target: Snapshot) -> Tuple[Dict[str, bytes], List[str]]:
+        """({path: content} to write, [paths to delete]) that turn HEAD's files into `target`'s.
+
+        Contents are the recorded bytes, so files in any encoding come back unchanged.
+        """
+        current = self.head.files if self.head is not None else {}
+        writes = {
+            path: self.read(entry[0]) for path, entry in target.files.items()
+            if path not in current or current[path][0] != entry[0] or not self._on_disk(path, entry)
+        }
+        removes = sorted(path for path in current if path not in target.files)
+        return writes, removes
+
+    # --- writing -------------------------------------------------------------
+
+    def begin_turn(self, label: str = "") -> int:
+        """Start a new turn: later snapshots are grouped under it"""
+        self.turn += 1
+        self._label = label
+        self.gc()
+        return self.turn
+
+    def sync(self, paths: Iterable[str]):
+        """Record the current disk state of `paths` if it isn't what HEAD says.
+
+        Run before changing those files, so the state they're changed from
+        (including edits made outside deep-code) can always be restored.
+        """
+        head = self.head
+        files = dict(head.files) if head is not None else {}
+        changed = head is None
+        for path in paths:
+            entry = files.get(path)
+            if entry is not None and self._on_disk(path, entry):
+                continue
+            content = self._read_disk(path)
+            if content is None:
+                changed |= files.pop(path, None) is not None
+            else:
+                new_entry = self._store(path, content)
+                changed |= entry is None or entry[0] != new_entry[0]
+                files[path] = new_entry
+        if changed:
+            self._add(files, self.turn - 1, f"before turn {self.turn}")
+
+    def record(self, written: Dict[str, bytes], removed: Iterable[str]) -> Snapshot:
+        """Snapshot HEAD plus the files just written ({path: content}) minus `removed`"""
+        head = self.head
+        files = dict(head.files) if head is not None else {}
+        for path, content in written.items():
+            files[path] = self._store(path, content)
+        for path in removed:
+            files.pop(path, None)
+        return self._add(files, self.turn, self._label)
+
+    def move_head(self, snapshot: Snapshot):
+        self._write_json(os.path.join(self.dir, "HEAD.tmp"), snapshot.id)
+        os.replace(os.path.join(self.dir, "HEAD.tmp"), os.path.join(self.dir, "HEAD"))
+
+    def gc(self):
+        """Drop snapshots of turns older than the last `keep_turns`, then unreferenced objects"""
+        if not self.snapshots:
+            return
+        turns = sorted({snapshot.turn for snapshot in self.snapshots.values()})
+        kept_turns = set(turns[-self.keep_turns:])
+        head = self.head
+        for snapshot in list(self.snapshots.values()):
+            if snapshot.turn in kept_turns or (head is not None and snapshot.id == head.id):
+                continue
+            try:
+                os.remove(self._manifest_path(snapshot.id))
+            except OSError:
+                pass
+            del self.snapshots[snapshot.id]
+        referenced = {entry[0] for snapshot in self.snapshots.values() for entry in snapshot.files.values()}
+        if not os.path.isdir(self.objects_dir):
+            return
+        for prefix in os.listdir(self.objects_dir):
+            bucket = os.path.join(self.objects_dir, prefix)
+            for name in os.listdir(bucket):
+                if prefix + name.split(".", 1)[0] not in referenced:
+                    os.remove(os.path.join(bucket, name))
+            if not os.listdir(bucket):
+                os.rmdir(bucket)
+
+    # --- helpers -------------------------------------------------------------
+
+    def _add(self, files: Dict[str, List], turn: int, label: str) -> Snapshot:
+        head = self.head
+        snapshot = Snapshot(
+            max(self.snapshots, default=0) + 1, head.id if head is not None else None,
+            max(turn, 0), label, time.time(), files
+        )
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        path = self._manifest_path(snapshot.id)
+        self._write_json(path + ".tmp", snapshot._asdict())
+        os.replace(path + ".tmp", path)
+        self.snapshots[snapshot.id] = snapshot
+        self.move_head(snapshot)
+        return snapshot
+
+    def _store(self, path: str, content: bytes) -> List:
+        """Save `content` as an object (unless it already is one); returns its manifest entry"""
+        digest = hashlib.sha256(content).hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path + ".z") and not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            if self.compress:
+                object_path += ".z"
+                content = zlib.compress(content)
+            with open(object_path + ".tmp", "wb") as f:
+                f.write(content)
+            os.replace(object_path + ".tmp", object_path)
+        stat = os.stat(self._disk_path(path))
+        return [digest, stat.st_size, stat.st_mtime_ns]
+
+    def _on_disk(self, path: str, entry: List) -> bool:
+        """Whether the file still has the size and mtime it had when `entry` was recorded"""
+        try:
+            stat = os.stat(self._disk_path(path))
+        except OSError:
+            return False
+        return [stat.st_size, stat.st_mtime_ns] == entry[1:]
+
+    def _read_disk(self, path: str) -> Optional[bytes]:
+        try:
+            with open(self._disk_path(path), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _text(self, digest: str) -> str:
+        try:
+            return decode_bytes(self.read(digest))[0]
+        except FileOperationError:
+            return self.read(digest).decode("utf-8", "replace")
+
+    def _lines(self, entry: Optional[List]) -> List[str]:
+        if entry is None:
+            return []
+        lines = self._text(entry[0]).splitlines(keepends=True)
+        if lines and not lines[-1].endswith("\n"):
+            lines[-1] += "\n"
+        return lines
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def _manifest_path(self, snapshot_id: int) -> str:
+        return os.path.join(self.snapshots_dir, f"{snapshot_id:06d}.json")
+
+    def _disk_path(self, path: str) -> str:
+        return os.path.join(self.root, *path.split("/"))
+
+    @staticmethod
+    def _write_json(path: str, data):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
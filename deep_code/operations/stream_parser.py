@@ -0,0 +1,63 @@
+import re
+from typing import List, Optional, Tuple
+
+FENCE_OPEN = re.compile(r"```([a-zA-Z0-9]*)\n")
+FENCE = "```"
+
+
+class CodeBlockStreamParser:
+    """Incrementally extract ```lang fenced code blocks from streamed text.
+
+    Produces the same blocks as re.findall(r"```([a-zA-Z0-9]*)\\n([\\s\\S]*?)```", text)
+    on the complete text, but hands each block out as soon as its closing fence
+    arrives instead of waiting for the whole response.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.blocks: List[Tuple[str, str]] = []
+        self._pos = 0  # Scan position; everything before it is settled
+        self._open: Optional[Tuple[str, int]] = None  # (lang, body_start) of the block in progress
+
+    def feed(self, delta: str) -> List[Tuple[str, str]]:
+        """Add a chunk of text and return the blocks completed by it"""
+        self.text += delta
+        completed = []
+        while True:
+            if self._open is None:
+                match = FENCE_OPEN.search(self.text, self._pos)
+                if not match:
+                    # Keep a trailing, possibly unfinished fence in view for the next chunk
+                    last_fence = self.text.rfind(FENCE, self._pos)
+                    if last_fence != -1:
+                        self._pos = last_fence
+                    else:
+                        self._pos = max(self._pos, len(self.text) - len(FENCE) + 1)
+                    break
+                self._open = (match.group(1), match.end())
+                self._pos = match.end()
+            else:
+                lang, body_start = self._open
+                end = self.text.find(FENCE, max(body_start, self._pos))
+                if end == -1:
+                    self._pos = max(body_start, len(self.text) - len(FENCE) + 1)
+                    break
+                block = (lang, self.text[body_start:end])
+                self.blocks.append(block)
+                completed.append(block)
+                self._open = None
+                self._pos = end + len(FENCE)
+        return completed
+
+    @property
+    def pending(self) -> Optional[Tuple[str, str]]:
+        """The (lang, partial code) of the block currently being received, if any"""
+        if self._open is None:
+            return None
+        lang, body_start = self._open
+        return lang, self.text[body_start:]
+
+    def close(self) -> List[Tuple[str, str]]:
+        """Finish the stream; an unterminated block is dropped, as with re.findall"""
+        self._open = None
+        return self.blocks
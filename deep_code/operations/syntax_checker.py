@@ -0,0 +1,352 @@
+"""Incremental delimiter checking for JavaScript and CSS.
+
+The tokenizer tracks just enough lexical state (strings, comments, template
+literals and, for JS, regex literals) to know which braces, parentheses and
+brackets are real, and reports unbalanced ones with their line and column.
+It can be fed a stream chunk by chunk, so truncated code is noticed while a
+response is still arriving.
+"""
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+CODE, LINE_COMMENT, BLOCK_COMMENT, STRING, TEMPLATE, REGEX = range(6)
+
+OPENERS = {"{": "}", "(": ")", "[": "]"}
+CLOSERS = {"}": "{", ")": "(", "]": "["}
+TEMPLATE_OPEN = "`"
+TEMPLATE_EXPR = "${"
+
+CODE_STOP = {
+    "js": re.compile(r"[{}()\[\]\"'`/\n]"),
+    "css": re.compile(r"[{}()\[\]\"'/\n]"),
+}
+STRING_STOP = re.compile(r"[\\\n\"']")
+TEMPLATE_STOP = re.compile(r"[\\`$\n]")
+REGEX_STOP = re.compile(r"[\\/\[\]\n]")
+TRAILING_WORD = re.compile(r"[\w$]+$")
+
+# A "/" after one of these starts a regex literal rather than a division
+REGEX_AFTER_CHARS = set("(,=:[!&|?{};+-*%<>~^")
+REGEX_AFTER_WORDS = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+    "throw", "case", "do", "else", "yield", "await",
+}
+
+
+class SyntaxIssue(NamedTuple):
+    line: int
+    column: int
+    delimiter: str  # "{", "(", "[", "`", a quote, "/*" or "/"
+    message: str
+
+
+class DelimiterTokenizer:
+    """Track open delimiters across chunks of JS or CSS source.
+
+    feed() as text arrives; `complete` says whether everything opened so far
+    has been closed, and issues() lists what is unbalanced (including, at
+    end of input, whatever is still open).
+    """
+
+    def __init__(self, language: str = "js"):
+        if language not in CODE_STOP:
+            raise ValueError(f"Unsupported language: {language}")
+        self.language = language
+        self.line = 1
+        self._offset = 0  # Characters fed so far
+        self._line_start = 0  # Offset of the current line's first character
+        self._state = CODE
+        self._stack: List[Tuple[str, int, int]] = []  # (opener, line, column)
+        self._errors: List[SyntaxIssue] = []
+        self._quote = ""
+        self._token_start: Tuple[int, int] = (0, 0)  # Where the open string/comment/regex began
+        self._escape = False
+        self._slash: Optional[Tuple[int, int]] = None  # Position of a "/" waiting for the next char
+        self._slash_starts_regex = False
+        self._star = False  # Block comment text ended in "*"
+        self._dollar = False  # Template text ended in "$"
+        self._in_class = False  # Inside [...] of a regex literal
+        self._last = ""  # Last significant code character
+        self._word = ""  # Identifier ending at _last, if any
+
+    @property
+    def complete(self) -> bool:
+        """Nothing is left open (delimiters, strings, comments or template literals)"""
+        return not self._stack and self._state in (CODE, LINE_COMMENT)
+
+    @property
+    def open_delimiters(self) -> List[Tuple[str, int, int]]:
+        """(opener, line, column) of every delimiter still open, outermost first"""
+        return list(self._stack)
+
+    def feed(self, text: str) -> "DelimiterTokenizer":
+        i = 0
+        n = len(text)
+        while i < n:
+            state = self._state
+            if state == CODE:
+                i = self._feed_code(text, i)
+            elif state == LINE_COMMENT:
+                end = text.find("\n", i)
+                if end == -1:
+                    i = n
+                else:
+                    self._newline(end)
+                    self._state = CODE
+                    i = end + 1
+            elif state == BLOCK_COMMENT:
+                i = self._feed_block_comment(text, i)
+            elif state == STRING:
+                i = self._feed_string(text, i)
+            elif state == TEMPLATE:
+                i = self._feed_template(text, i)
+            else:
+                i = self._feed_regex(text, i)
+        self._offset += n
+        return self
+
+    def issues(self) -> List[SyntaxIssue]:
+        """Problems found so far, plus everything still open if the input ended here"""
+        issues = list(self._errors)
+        if self._state == STRING:
+            issues.append(SyntaxIssue(*self._token_start, self._quote, "Unterminated string"))
+        elif self._state == BLOCK_COMMENT:
+            issues.append(SyntaxIssue(*self._token_start, "/*", "Unterminated comment"))
+        elif self._state == REGEX:
+            issues.append(SyntaxIssue(*self._token_start, "/", "Unterminated regular expression"))
+        for opener, line, column in self._stack:
+            if opener == TEMPLATE_OPEN:
+                issues.append(SyntaxIssue(line, column, "`", "Unterminated template literal"))
+            elif opener == TEMPLATE_EXPR:
+                issues.append(SyntaxIssue(line, column, "{", "Unclosed '${' in template literal"))
+            else:
+                issues.append(SyntaxIssue(line, column, opener, f"Unclosed '{opener}'"))
+        return sorted(issues, key=lambda issue: (issue.line, issue.column))
+
+    # --- helpers -----------------------------------------------------------
+
+    def _position(self, index: int) -> Tuple[int, int]:
+        """(line, column), 1-based, of position `index` in the current chunk"""
+        return self.line, self._offset + index - self._line_start + 1
+
+    def _newline(self, index: int):
+        self.line += 1
+        self._line_start = self._offset + index + 1
+
+    def _count_lines(self, text: str, start: int, end: int):
+        newlines = text.count("\n", start, end)
+        if newlines:
+            self.line += newlines
+            self._line_start = self._offset + text.rfind("\n", start, end) + 1
+
+    def _note_code(self, segment: str):
+        """Remember the last significant token of plain code, for regex detection"""
+        stripped = segment.rstrip()
+        if not stripped:
+            return
+        word = TRAILING_WORD.search(stripped)
+        if word is None:
+            self._word = ""
+        elif word.start() == 0 and segment[0] == stripped[0] and TRAILING_WORD.search(self._last or " "):
+            self._word += word.group()  # Identifier split across chunks
+        else:
+            self._word = word.group()
+        self._last = stripped[-1]
+
+    def _regex_allowed(self) -> bool:
+        if self.language != "js":
+            return False
+        if not self._last:
+            return True
+        if self._word:
+            return self._word in REGEX_AFTER_WORDS
+        return self._last in REGEX_AFTER_CHARS or self._last == "}"
+
+    def _close(self, char: str, position: Tuple[int, int]):
+        opener = CLOSERS[char]
+        if self._stack and self._stack[-1][0] == opener:
+            self._stack.pop()
+            return
+        if any(entry[0] == opener for entry in self._stack):
+            # Whatever was opened inside the matching opener was never closed
+            while self._stack[-1][0] != opener:
+                unclosed, line, column = self._stack.pop()
+                self._errors.append(SyntaxIssue(
+                    line, column, unclosed if unclosed in OPENERS else "`",
+                    f"'{unclosed}' is never closed before '{char}' at line {position[0]}, column {position[1]}"
+                ))
+            self._stack.pop()
+            return
+        self._errors.append(SyntaxIssue(*position, opener, f"Unexpected '{char}' with no matching '{opener}'"))
+
+    # --- states ------------------------------------------------------------
+
+    def _feed_code(self, text: str, i: int) -> int:
+        if self._slash is not None:
+            slash, self._slash = self._slash, None
+            char = text[i]
+            if char == "/":
+                self._state = LINE_COMMENT
+                return i + 1
+            if char == "*":
+                self._state = BLOCK_COMMENT
+                self._token_start = slash
+                self._star = False
+                return i + 1
+            if self._slash_starts_regex:
+                self._state = REGEX
+                self._token_start = slash
+                self._escape = False
+                self._in_class = False
+                return i
+            self._last, self._word = "/", ""
+        match = CODE_STOP[self.language].search(text, i)
+        end = match.start() if match else len(text)
+        if end > i:
+            self._note_code(text[i:end])
+            self._count_lines(text, i, end)
+        if match is None:
+            return len(text)
+        char = text[end]
+        if char == "\n":
+            self._newline(end)
+        elif char in OPENERS:
+            self._stack.append((char, *self._position(end)))
+            self._last, self._word = char, ""
+        elif char in CLOSERS:
+            if char == "}" and self._stack and self._stack[-1][0] == TEMPLATE_EXPR:
+                self._stack.pop()
+                self._state = TEMPLATE
+                return end + 1
+            self._close(char, self._position(end))
+            self._last, self._word = char, ""
+        elif char in "\"'":
+            self._state = STRING
+            self._quote = char
+            self._token_start = self._position(end)
+            self._escape = False
+        elif char == "`":
+            self._stack.append((TEMPLATE_OPEN, *self._position(end)))
+            self._state = TEMPLATE
+            self._escape = False
+            self._dollar = False
+        else:  # "/"
+            self._slash = self._position(end)
+            self._slash_starts_regex = self._regex_allowed()
+        return end + 1
+
+    def _feed_block_comment(self, text: str, i: int) -> int:
+        if self._star and text[i] == "/":
+            self._star = False
+            self._state = CODE
+            return i + 1
+        end = text.find("*/", i)
+        if end == -1:
+            self._count_lines(text, i, len(text))
+            self._star = text.endswith("*")
+            return len(text)
+        self._count_lines(text, i, end)
+        self._state = CODE
+        return end + 2
+
+    def _feed_string(self, text: str, i: int) -> int:
+        if self._escape:
+            self._escape = False
+            if text[i] == "\n":
+                self._newline(i)  # Line continuation
+            return i + 1
+        match = STRING_STOP.search(text, i)
+        if match is None:
+            return len(text)
+        end = match.start()
+        char = text[end]
+        if char == "\\":
+            self._escape = True
+        elif char == "\n":
+            self._errors.append(SyntaxIssue(*self._token_start, self._quote, "Unterminated string"))
+            self._newline(end)
+            self._state = CODE
+            self._last, self._word = "a", ""
+        elif char == self._quote:
+            self._state = CODE
+            self._last, self._word = "a", ""  # A string is an operand: "/" after it divides
+        return end + 1
+
+    def _feed_template(self, text: str, i: int) -> int:
+        if self._escape:
+            self._escape = False
+            if text[i] == "\n":
+                self._newline(i)
+            return i + 1
+        if self._dollar:
+            self._dollar = False
+            if text[i] == "{":
+                self._stack.append((TEMPLATE_EXPR, *self._position(i)))
+                self._state = CODE
+                self._last, self._word = "{", ""
+                return i + 1
+        match = TEMPLATE_STOP.search(text, i)
+        end = match.start() if match else len(text)
+        self._count_lines(text, i, end)
+        if match is None:
+            return len(text)
+        char = text[end]
+        if char == "\\":
+            self._escape = True
+        elif char == "\n":
+            self._newline(end)
+        elif char == "$":
+            self._dollar = True
+        else:  # Closing backtick
+            if self._stack and self._stack[-1][0] == TEMPLATE_OPEN:
+                self._stack.pop()
+            self._state = CODE
+            self._last, self._word = "a", ""
+        return end + 1
+
+    def _feed_regex(self, text: str, i: int) -> int:
+        if self._escape:
+            self._escape = False
+            return i + 1
+        match = REGEX_STOP.search(text, i)
+        if match is None:
+            return len(text)
+        end = match.start()
+        char = text[end]
+        if char == "\\":
+            self._escape = True
+        elif char == "\n":
+            # Regex literals can't span lines: this "/" was a division after all
+            self._newline(end)
+            self._state = CODE
+            self._last, self._word = "a", ""
+        elif char == "[":
+            self._in_class = True
+        elif char == "]":
+            self._in_class = False
+        elif not self._in_class:
+            self._state = CODE
+            self._last, self._word = "a", ""  # Flags that follow read as an identifier
+        return end + 1
+
+
+def check_syntax(content: str, language: str) -> List[SyntaxIssue]:
+    """Unbalanced delimiters and unterminated strings/comments in complete JS or CSS source"""
+    return DelimiterTokenizer(language).feed(content).issues()
+
+
+def strip_unmatched_closers(code: str, language: str = "js") -> str:
+    """Drop closing braces at the very end of `code` that close nothing"""
+    tokenizer = DelimiterTokenizer(language).feed(code)
+    stray = [issue for issue in tokenizer.issues() if issue.message.startswith("Unexpected '}'")]
+    trimmed = code.rstrip()
+    lines = trimmed.split("\n")
+    # Only closers that sit in the trailing run of "}" characters are removed
+    while stray and trimmed.endswith("}"):
+        line, column = len(lines), len(lines[-1])
+        if (stray[-1].line, stray[-1].column) != (line, column):
+            break
+        stray.pop()
+        trimmed = trimmed[:-1].rstrip()
+        lines = trimmed.split("\n")
+    return trimmed + "\n" if trimmed != code.rstrip() else code
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from deep_code.operations.paths import STATE_DIR
+from deep_code.operations.snapshot_store import SnapshotStore
+
+# Directory, inside the project, where a batch is staged before it is moved into place
+STAGING_DIR = os.path.join(STATE_DIR, "staging")
+JOURNAL_NAME = "journal.json"
+
+
+class WriteResult(NamedTuple):
+    written: List[str]
+    unchanged: List[str]
+    removed: List[str]
+
+
+class WorkspaceWriter:
+    """Writes a batch of project files as one unit.
+
+    stage() and remove() collect a turn's changes; commit() drops files whose
+    content is already on disk, writes the rest into a staging directory
+    inside the project, records the batch in a journal and then renames each
+    file into place. A crash before the journal is written leaves the project
+    untouched; a crash after it is finished by recover(), which every writer
+    runs on creation, so a restart never finds a half-applied batch.
+
+    With `fsync`, staged files, the journal and the project directories are
+    flushed to disk before the batch counts as committed. With a snapshot
+    store, every commit is recorded there (after syncing the previous state
+    of the files it touches) and no .bak files are written.
+    """
+
+    def __init__(self, root: str, fsync: bool = False, snapshots: Optional[SnapshotStore] = None):
+        self.root = root
+        self.fsync = fsync
+        self.snapshots = snapshots
+        self._staged: Dict[str, Tuple[bytes, bool]] = {}  # path -> (content, keep a .bak)
+        self._removed: List[str] = []
+        # path -> (size, mtime_ns, sha256) of what this writer last wrote there
+        self._known: Dict[str, Tuple[int, int, str]] = {}
+        self.recover()
+
+    def stage(self, rel_path: str, content: str, backup: bool = True):
+        """Queue `content` for `rel_path` ('/'-separated, relative to the project)"""
+        self.stage_bytes(rel_path, content.encode("utf-8"), backup)
+
+    def stage_bytes(self, rel_path: str, content: bytes, backup: bool = True):
+        """Queue raw `content` for `rel_path`, written exactly as given (e.g. a restored snapshot)"""
+        self._staged[rel_path] = (content, backup)
+        if rel_path in self._removed:
+            self._removed.remove(rel_path)
+
+    def remove(self, rel_path: str):
+        self._staged.pop(rel_path, None)
+        if rel_path not in self._removed:
+            self._removed.append(rel_path)
+
+    def discard(self):
+        self._staged.clear()
+        self._removed.clear()
+
+    def commit(self, record: bool = True) -> WriteResult:
+        """Apply everything staged since the last commit.
+
+        With `record` off (e.g. when restoring a snapshot), the snapshot
+        store isn't told about the batch.
+        """
+        staged, removed = self._staged, self._removed
+        self._staged, self._removed = {}, []
+        changed = {path: entry for path, entry in staged.items() if not self._unchanged(path, entry[0])}
+        unchanged = [path for path in staged if path not in changed]
+        removed = [path for path in removed if os.path.lexists(self._path(path))]
+        if not changed and not removed:
+            return WriteResult([], unchanged, [])
+        snapshots = self.snapshots if record else None
+        if snapshots is not None:
+            snapshots.sync(list(changed) + removed)
+
+        staging = os.path.join(self.root, STAGING_DIR, uuid.uuid4().hex)
+        os.makedirs(staging)
+        writes = []
+        for index, (path, (content, backup)) in enumerate(changed.items()):
+            name = str(index)
+            with open(os.path.join(staging, name), "wb") as f:
+                f.write(content)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            writes.append({"path": path, "staged": name, "backup": backup and self.snapshots is None})
+        journal = {"writes": writes, "removes": removed}
+        journal_tmp = os.path.join(staging, JOURNAL_NAME + ".tmp")
+        with open(journal_tmp, "w", encoding="utf-8") as f:
+            json.dump(journal, f)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        # The batch is committed once the journal exists under its final name
+        os.replace(journal_tmp, os.path.join(staging, JOURNAL_NAME))
+        if self.fsync:
+            self._sync_dir(staging)
+        self._apply(staging, journal)
+
+        for path, (content, _) in changed.items():
+            stat = os.stat(self._path(path))
+            self._known[path] = (stat.st_size, stat.st_mtime_ns, hashlib.sha256(content).hexdigest())
+        for path in removed:
+            self._known.pop(path, None)
+        if snapshots is not None:
+            snapshots.record({path: content for path, (content, _) in changed.items()}, removed)
+        return WriteResult(list(changed), unchanged, removed)
+
+    def recover(self):
+        """Finish batches whose journal was written and drop those whose wasn't"""
+        base = os.path.join(self.root, STAGING_DIR)
+        if not os.path.isdir(base):
+            return
+        for name in sorted(os.listdir(base)):
+            staging = os.path.join(base, name)
+            journal_path = os.path.join(staging, JOURNAL_NAME)
+            journal: Optional[Dict] = None
+            if os.path.exists(journal_path):
+                try:
+                    with open(journal_path, "r", encoding="utf-8") as f:
+                        journal = json.load(f)
+                except (OSError, ValueError):
+                    journal = None
+            if journal is not None:
+                self._apply(staging, journal)
+            else:
+                shutil.rmtree(staging, ignore_errors=True)
+        try:
+            os.rmdir(base)
+        except OSError:
+            pass
+
+    def _apply(self, staging: str, journal: Dict):
+        """Move a committed batch into place; safe to repeat after an interruption"""
+        directories = set()
+        for write in journal["writes"]:
+            source = os.path.join(staging, write["staged"])
+            if not os.path.exists(source):
+                continue  # Already moved
+            target = self._path(write["path"])
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            if write["backup"] and os.path.exists(target):
+                self._backup(target)
+            os.replace(source, target)
+            directories.add(os.path.dirname(target))
+        for path in journal["removes"]:
+            target = self._path(path)
+            if os.path.lexists(target):
+                os.remove(target)
+                directories.add(os.path.dirname(target))
+        if self.fsync:
+            for directory in directories:
+                self._sync_dir(directory)
+        shutil.rmtree(staging, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(staging))
+        except OSError:
+            pass  # Another batch is still staged
+
+    def _unchanged(self, rel_path: str, content: bytes) -> bool:
+        path = self._path(rel_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size != len(content):
+            return False
+        known = self._known.get(rel_path)
+        if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            return known[2] == hashlib.sha256(content).hexdigest()
+        try:
+            with open(path, "rb") as f:
+                return f.read() == content
+        except OSError:
+            return False
+
+    @staticmethod
+    def _backup(target: str):
+        """Keep the current version as <name>.bak.
+
+        A copy, not a hard link: an editor saving the file in place would
+        change a linked backup along with it.
+        """
+        shutil.copy2(target, target + ".bak")
+
+    @staticmethod
+    def _sync_dir(directory: str):
+        try:
+            fd = os.open(directory or ".", os.O_RDONLY)
+        except OSError:
+            return  # Directories can't be opened for syncing on every platform
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _path(self, rel_path: str) -> str:
+        return os.path.join(self.root, *rel_path.split("/"))
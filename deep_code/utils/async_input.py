@@ -0,0 +1,45 @@
+import asyncio
+import contextvars
+import threading
+from typing import Awaitable, Callable, Optional
+
+LineReader = Callable[[str], Awaitable[Optional[str]]]
+
+# Replaces stdin for the current context (the daemon reads from the connected client)
+_line_reader: contextvars.ContextVar[Optional[LineReader]] = contextvars.ContextVar("line_reader", default=None)
+
+
+def set_line_reader(reader: Optional[LineReader]) -> contextvars.Token:
+    """Make ainput() in this context (and tasks started from it) call `reader` instead of reading stdin"""
+    return _line_reader.set(reader)
+
+
+async def ainput(prompt: str = "") -> Optional[str]:
+    """Read a line from stdin without blocking the event loop.
+
+    input() runs in a daemon thread, so background tasks keep running while
+    the user types and a pending read never holds up interpreter exit.
+    Returns None at end of input.
+    """
+    reader = _line_reader.get()
+    if reader is not None:
+        return await reader(prompt)
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def deliver(line):
+        if not future.done():
+            future.set_result(line)
+
+    def reader():
+        try:
+            line = input(prompt)
+        except EOFError:
+            line = None
+        try:
+            loop.call_soon_threadsafe(deliver, line)
+        except RuntimeError:
+            pass  # The loop closed while we were waiting for input
+
+    threading.Thread(target=reader, name="deep-code-input", daemon=True).start()
+    return await future
@@ -0,0 +1,185 @@
+"""Local OpenAI-compatible stand-in for the Groq API.
+
+Replays recorded completions in order, with configurable latency and
+scripted faults (429s, stalls that trip the client's read timeout), so the
+CLI pipeline can be exercised and benchmarked offline:
+
+    python -m deep_code.utils.mock_server session.json --port 8765
+
+and point the client at it with api.base_url: http://127.0.0.1:8765.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# Served once the recorded responses run out; has no code blocks, so it ends any fix loop
+EXHAUSTED_REPLY = "No further changes."
+
+
+class MockGroqServer:
+    """Serve recorded chat completions over HTTP in a background thread.
+
+    `faults` maps a request number (0-based, counting every POST) to a fault:
+    {"status": 429, "retry_after": 1.0} answers with that status instead, and
+    {"stall": 5.0} waits that long before answering normally.
+    """
+
+    def __init__(self, responses: List[str], latency: float = 0.0, chunk_delay: float = 0.0,
+                 chunk_size: int = 64, faults: Optional[Dict[int, Dict[str, Any]]] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.responses = list(responses)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+        self.faults = {int(k): v for k, v in (faults or {}).items()}
+        self.requests: List[Dict[str, Any]] = []  # Every request body received, in order
+        self._next_response = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_session(cls, session: Dict[str, Any], **overrides) -> "MockGroqServer":
+        """Build a server from a recorded session dict ("responses", "latency", "faults", ...)"""
+        options = {
+            key: session[key]
+            for key in ("latency", "chunk_delay", "chunk_size", "faults")
+            if key in session
+        }
+        options.update(overrides)
+        return cls(session.get("responses", []), **options)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted"""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockGroqServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _take(self, body: Dict[str, Any]):
+        """Record a request and return (request number, fault, reply text)"""
+        with self._lock:
+            number = len(self.requests)
+            self.requests.append(body)
+            fault = self.faults.get(number)
+            if fault and "status" in fault:
+                return number, fault, None
+            if self._next_response < len(self.responses):
+                reply = self.responses[self._next_response]
+                self._next_response += 1
+            else:
+                reply = EXHAUSTED_REPLY
+            return number, fault, reply
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output clean
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                number, fault, reply = server._take(body)
+                fault = fault or {}
+                time.sleep(server.latency + fault.get("stall", 0.0))
+                if reply is None:
+                    headers = {}
+                    if "retry_after" in fault:
+                        headers["retry-after"] = str(fault["retry_after"])
+                    self._send_json(fault["status"], {"error": {"message": fault.get("message", "Rate limit reached")}}, headers)
+                    return
+                usage = {
+                    "prompt_tokens": sum(len(m.get("content") or "") for m in body.get("messages", [])) // 4,
+                    "completion_tokens": len(reply) // 4,
+                }
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                if body.get("stream"):
+                    self._send_stream(body, reply, usage)
+                else:
+                    self._send_json(200, {
+                        "id": f"mock-{number}",
+                        "object": "chat.completion",
+                        "model": body.get("model"),
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                        "usage": usage,
+                    })
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, body, reply, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                size = max(1, server.chunk_size)
+                for start in range(0, len(reply), size):
+                    chunk = {"choices": [{"index": 0, "delta": {"content": reply[start:start + size]}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    if server.chunk_delay:
+                        time.sleep(server.chunk_delay)
+                final = {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": usage}}
+                self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded completions as a local Groq stand-in")
+    parser.add_argument("session", help="Recorded session JSON with a \"responses\" list")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, help="Seconds before each response")
+    args = parser.parse_args()
+    with open(args.session, "r", encoding="utf-8") as f:
+        session = json.load(f)
+    overrides = {"host": args.host, "port": args.port}
+    if args.latency is not None:
+        overrides["latency"] = args.latency
+    server = MockGroqServer.from_session(session, **overrides)
+    print(f"Mock Groq server on {server.base_url} ({len(server.responses)} recorded responses)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
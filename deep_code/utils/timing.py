@@ -0,0 +1,68 @@
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+def _current_task() -> Optional[asyncio.Task]:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None  # No event loop running
+
+
+class StageTimer:
+    """Accumulates wall-clock time per named pipeline stage.
+
+    Stages may nest; time spent in an inner stage is not counted towards the
+    outer one, so the totals add up to the time actually spent. The stack of
+    open stages lives in a context variable, so concurrent tasks (and daemon
+    sessions) each nest their own stages; a task only pauses an outer stage
+    it entered itself.
+    """
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        # [name, started, task] frames, innermost last
+        self._stack: contextvars.ContextVar[Tuple[List, ...]] = contextvars.ContextVar("stage_stack", default=())
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        now = time.perf_counter()
+        task = _current_task()
+        stack = self._stack.get()
+        parent = stack[-1] if stack and stack[-1][2] is task else None
+        if parent is not None:
+            self._add(parent[0], now - parent[1])
+        frame = [name, now, task]
+        token = self._stack.set(stack + (frame,))
+        self.counts[name] = self.counts.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self._add(name, now - frame[1])
+            self._stack.reset(token)
+            if parent is not None:
+                parent[1] = now
+
+    def _add(self, name: str, seconds: float):
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+
+    def reset(self):
+        self.totals.clear()
+        self.counts.clear()
+        self._stack.set(())
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """{stage: {"seconds": total, "count": entries}} for every stage seen"""
+        return {
+            name: {"seconds": self.totals.get(name, 0.0), "count": self.counts[name]}
+            for name in self.counts
+        }
+
+
+# Process-wide timer the CLI pipeline records into
+TIMINGS = StageTimer()
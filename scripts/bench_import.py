@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Benchmark what starting deep-code costs in imports.
+
+Runs each entry path in a fresh interpreter under `python -X importtime`
+and reports the time spent importing modules beyond what a bare
+interpreter imports anyway:
+
+    client     deep_code.cli.entry + deep_code.cli.client, all a chat pays when a daemon runs
+    full       deep_code.cli.main, what every start paid before the daemon
+    session    everything chat() imports, what the daemon preloads
+
+The client path must stay lean: it fails if it imports any of CLIENT_FORBIDDEN,
+whatever the timings say.
+
+    python scripts/bench_import.py --repeat 9
+    python scripts/bench_import.py --check scripts/bench_baselines/imports.json
+    python scripts/bench_import.py --update-baseline scripts/bench_baselines/imports.json
+
+--check also fails when a path got slower than the baseline allows. Like
+all timings, these only compare well on the machine that recorded them.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+PATHS = {
+    "client": "import deep_code.cli.entry, deep_code.cli.client",
+    "full": "import deep_code.cli.main",
+    "session": "import deep_code.cli.daemon; deep_code.cli.daemon.preload()",
+}
+# Top-level packages (or deep_code modules) the thin client must never import
+CLIENT_FORBIDDEN = (
+    "typer", "click", "rich", "httpx", "yaml", "slugify", "chardet", "pydantic", "asyncio",
+    "deep_code.cli.main", "deep_code.cli.daemon", "deep_code.core", "deep_code.models", "deep_code.operations",
+)
+# Differences smaller than this are noise, whatever the tolerance says
+MIN_SLOWDOWN_MS = 2.0
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def import_times(code: str) -> Dict[str, Tuple[int, int]]:
+    """{module: (self us, cumulative us)} for one interpreter running `code`"""
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT) + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def measure(code: str, startup: set, repeat: int):
+    """(median ms spent on imports beyond bare start-up, modules imported, slowest modules)"""
+    runs: List[float] = []
+    slowest: Dict[str, List[int]] = {}
+    modules: List[str] = []
+    for _ in range(repeat):
+        times = {name: t for name, t in import_times(code).items() if name not in startup}
+        runs.append(sum(self_us for self_us, _ in times.values()) / 1000)
+        modules = sorted(times)
+        for name, (self_us, _) in times.items():
+            slowest.setdefault(name, []).append(self_us)
+    top = sorted(((statistics.median(us) / 1000, name) for name, us in slowest.items()), reverse=True)[:8]
+    return statistics.median(runs), modules, top
+
+
+def forbidden(modules: List[str]) -> List[str]:
+    return [name for name in modules if any(name == banned or name.startswith(banned + ".") for banned in CLIENT_FORBIDDEN)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs to take the median over")
+    parser.add_argument("--output", help="Write the results JSON here")
+    parser.add_argument("--check", help="Baseline JSON; exit 1 on regressions")
+    parser.add_argument("--update-baseline", help="Write the results as the new baseline here")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown (fraction)")
+    args = parser.parse_args()
+
+    startup = set(import_times("pass"))
+    result = {"commit": current_commit(), "python": sys.version.split()[0], "repeat": args.repeat, "paths": {}}
+    failures = []
+    print(f"{'path':<10}{'ms':>9}{'modules':>9}  slowest")
+    for name, code in PATHS.items():
+        ms, modules, top = measure(code, startup, args.repeat)
+        result["paths"][name] = {"ms": ms, "modules": len(modules)}
+        print(f"{name:<10}{ms:>9.2f}{len(modules):>9}  " + ", ".join(f"{module} {t:.1f}" for t, module in top[:4]))
+        if name == "client":
+            failures.extend(f"client imports {module}" for module in forbidden(modules))
+
+    for path in (args.output, args.update_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+    if args.check:
+        with open(args.check, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nCompared with baseline from {baseline.get('commit', '?')} (tolerance {args.tolerance:.0%})")
+        for name, stats in result["paths"].items():
+            before = baseline.get("paths", {}).get(name)
+            if before is None:
+                continue
+            slowdown = stats["ms"] - before["ms"]
+            if slowdown > before["ms"] * args.tolerance and slowdown > MIN_SLOWDOWN_MS:
+                failures.append(f"{name}: {before['ms']:.2f} ms -> {stats['ms']:.2f} ms")
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Benchmark the chat pipeline offline against the mock Groq server.
+
+Runs a recorded session (user turns + model replies, see bench_sessions/)
+through `deep-code chat --script` non-interactively and reports the time
+spent per pipeline stage: request, parse, harmonize, write and validate.
+
+    python scripts/bench_session.py scripts/bench_sessions/todo_app.json --repeat 5 --output run.json
+    python scripts/bench_session.py scripts/bench_sessions/todo_app.json --compare run.json
+
+Results are medians over the repeats, tagged with the current commit, so
+runs from different commits can be compared with --compare.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# Isolate the run from the user's config and cache: CONFIG_PATH is resolved at import time
+BENCH_HOME = tempfile.mkdtemp(prefix="deep-code-bench-")
+os.environ["HOME"] = BENCH_HOME
+
+import yaml  # noqa: E402
+
+from deep_code.cli.main import chat  # noqa: E402
+from deep_code.core import config as core_config  # noqa: E402
+from deep_code.utils.mock_server import MockGroqServer  # noqa: E402
+from deep_code.utils.timing import TIMINGS  # noqa: E402
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_once(session, stream: bool, latency: float):
+    """Run the session once in a fresh working directory; returns (stage seconds, requests)"""
+    work_dir = tempfile.mkdtemp(prefix="session-", dir=BENCH_HOME)
+    script_path = os.path.join(work_dir, "turns.txt")
+    with open(script_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(session["turns"]) + "\n")
+
+    with MockGroqServer.from_session(session, latency=latency) as server:
+        cfg = json.loads(json.dumps(core_config.DEFAULT_CONFIG))
+        cfg["api"].update({
+            "key": "mock",
+            "base_url": server.base_url,
+            "stream": stream,
+            "rate_limits": {},  # Don't let the client-side limiter pace the benchmark
+        })
+        cfg["cache"] = {"enabled": False}
+        core_config.save_config(cfg)
+
+        TIMINGS.reset()
+        previous_cwd = os.getcwd()
+        os.chdir(work_dir)
+        started = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                chat(cache=False, no_cache=True, replay=False, script=script_path)
+        finally:
+            os.chdir(previous_cwd)
+        total = time.perf_counter() - started
+        stages = {name: stats["seconds"] for name, stats in TIMINGS.report().items()}
+        stages["total"] = total
+        return stages, len(server.requests)
+
+
+def compare(current, baseline):
+    print(f"\nCompared with {baseline.get('commit', '?')}:")
+    print(f"{'stage':<12}{'baseline ms':>14}{'current ms':>14}{'change':>10}")
+    for stage, seconds in current["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if before is None:
+            print(f"{stage:<12}{'-':>14}{seconds * 1000:>14.2f}{'new':>10}")
+            continue
+        change = (seconds - before) / before * 100 if before else 0.0
+        print(f"{stage:<12}{before * 1000:>14.2f}{seconds * 1000:>14.2f}{change:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("session", help="Recorded session JSON")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs to take the median over")
+    parser.add_argument("--no-stream", action="store_true", help="Use the non-streaming completion path")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated model latency per request (seconds)")
+    parser.add_argument("--output", help="Write the results JSON here")
+    parser.add_argument("--compare", help="Results JSON from another commit to compare against")
+    args = parser.parse_args()
+
+    with open(args.session, "r", encoding="utf-8") as f:
+        session = json.load(f)
+
+    runs = []
+    requests = 0
+    for _ in range(args.repeat):
+        stages, requests = run_once(session, stream=not args.no_stream, latency=args.latency)
+        runs.append(stages)
+
+    stage_names = sorted({name for run in runs for name in run}, key=lambda n: (n == "total", n))
+    result = {
+        "commit": current_commit(),
+        "session": session.get("name", Path(args.session).stem),
+        "python": sys.version.split()[0],
+        "stream": not args.no_stream,
+        "repeat": args.repeat,
+        "requests": requests,
+        "stages": {name: statistics.median(run.get(name, 0.0) for run in runs) for name in stage_names},
+    }
+
+    print(f"Session {result['session']} @ {result['commit']}: {requests} requests, median of {args.repeat} runs")
+    for name, seconds in result["stages"].items():
+        print(f"  {name:<12}{seconds * 1000:>10.2f} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
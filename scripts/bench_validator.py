@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Benchmark the validator and the harmonization steps on synthetic projects.
+
+Each corpus from validator_corpus.py (3 files up to 300, and a page with
+10k elements) goes through these stages:
+
+    validate_cold      CodeValidator.validate_all() on a fresh validator
+    validate_warm      validate_all() again after one stylesheet changed
+    harmonize_names    harmonize_file_names()
+    dependency_fix     cross_file_dependency_fix()
+    harmonize_sel      harmonize_selectors()
+
+For every stage it reports the median wall time, throughput, tracemalloc
+peak and the number of memory blocks still allocated afterwards. The
+memory figures come from a separate run, so tracing doesn't skew the
+timings. The cold validation must find exactly the errors the generator
+planted, or the run fails.
+
+    python scripts/bench_validator.py --repeat 5
+    python scripts/bench_validator.py --check scripts/bench_baselines/validator.json
+    python scripts/bench_validator.py --update-baseline scripts/bench_baselines/validator.json
+
+--check exits non-zero when a stage is slower or uses more memory than the
+baseline allows. Timings only compare well on the machine that recorded
+the baseline, so re-record it (--update-baseline) when moving machines.
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from deep_code.cli.main import (  # noqa: E402
+    cross_file_dependency_fix, harmonize_file_names, harmonize_selectors
+)
+from deep_code.operations import scanner  # noqa: E402
+from deep_code.operations.code_validator import CodeValidator  # noqa: E402
+from validator_corpus import CORPORA, Corpus, generate, write  # noqa: E402
+
+# Differences smaller than this are noise, whatever the tolerance says
+MIN_SLOWDOWN_SECONDS = 0.005
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def file_map_of(corpus: Corpus):
+    """{name: (lang, code)} as the CLI passes generated files to the harmonizers"""
+    return {name: (name.rsplit(".", 1)[1], code) for name, code in corpus.files.items()}
+
+
+def stages(corpus: Corpus, root: str):
+    """(name, setup) pairs; setup() prepares a run and returns the callable to time"""
+    edits = [0]
+
+    def validate_cold():
+        return CodeValidator(root).validate_all
+
+    def validate_warm():
+        validator = CodeValidator(root)
+        validator.validate_all()
+        sheet = next(name for name in sorted(corpus.files) if name.endswith(".css"))
+        edits[0] += 1
+        with open(os.path.join(root, sheet), "a", encoding="utf-8") as f:
+            f.write(f"/* edit {edits[0]} */\n")
+        return validator.validate_all
+
+    def harmonize_names():
+        file_map = file_map_of(corpus)  # harmonize_file_names updates its argument
+        return lambda: harmonize_file_names(file_map)
+
+    def dependency_fix():
+        file_map = file_map_of(corpus)
+        return lambda: cross_file_dependency_fix(file_map)
+
+    def harmonize_sel():
+        file_map = file_map_of(corpus)
+        return lambda: harmonize_selectors(file_map)
+
+    return [
+        ("validate_cold", validate_cold),
+        ("validate_warm", validate_warm),
+        ("harmonize_names", harmonize_names),
+        ("dependency_fix", dependency_fix),
+        ("harmonize_sel", harmonize_sel),
+    ]
+
+
+def time_stage(setup, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        run = setup()
+        scanner.clear_cache()
+        started = time.perf_counter()
+        run()
+        runs.append(time.perf_counter() - started)
+    return statistics.median(runs)
+
+
+def measure_memory(setup):
+    """(tracemalloc peak in KiB, blocks still allocated) for one run"""
+    run = setup()
+    scanner.clear_cache()
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    result = run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    blocks = sys.getallocatedblocks() - blocks_before
+    del result
+    return peak / 1024, blocks
+
+
+def check_errors(corpus: Corpus, root: str) -> list:
+    """Differences between the errors found and the ones planted"""
+    validator = CodeValidator(root)
+    validator.validate_all()
+    found = Counter(validator.error_counts)
+    return [
+        f"{error_type}: expected {corpus.expected[error_type]}, found {found[error_type]}"
+        for error_type in sorted(set(found) | set(corpus.expected))
+        if found[error_type] != corpus.expected[error_type]
+    ]
+
+
+def bench_corpus(name: str, repeat: int, work_dir: str):
+    corpus = generate(name)
+    root = os.path.join(work_dir, name)
+    write(corpus, root)
+    size = sum(len(content) for content in corpus.files.values())
+    results = {}
+    for stage, setup in stages(corpus, root):
+        seconds = time_stage(setup, repeat)
+        peak_kib, blocks = measure_memory(setup)
+        results[stage] = {
+            "seconds": seconds,
+            "files_per_second": len(corpus.files) / seconds if seconds else 0.0,
+            "mib_per_second": size / (1024 * 1024) / seconds if seconds else 0.0,
+            "peak_kib": peak_kib,
+            "blocks": blocks,
+        }
+    return {"files": len(corpus.files), "kib": size / 1024, "stages": results}, check_errors(corpus, root)
+
+
+def print_corpus(name: str, result):
+    print(f"\n{name}: {result['files']} files, {result['kib']:.0f} KiB")
+    print(f"  {'stage':<16}{'ms':>10}{'files/s':>10}{'MiB/s':>9}{'peak KiB':>11}{'blocks':>10}")
+    for stage, stats in result["stages"].items():
+        print(f"  {stage:<16}{stats['seconds'] * 1000:>10.2f}{stats['files_per_second']:>10.0f}"
+              f"{stats['mib_per_second']:>9.2f}{stats['peak_kib']:>11.0f}{stats['blocks']:>10}")
+
+
+def regressions(current, baseline, tolerance: float, memory_tolerance: float) -> list:
+    found = []
+    for name, result in current["corpora"].items():
+        before_corpus = baseline.get("corpora", {}).get(name)
+        if before_corpus is None:
+            continue
+        for stage, stats in result["stages"].items():
+            before = before_corpus["stages"].get(stage)
+            if before is None:
+                continue
+            slowdown = stats["seconds"] - before["seconds"]
+            if slowdown > before["seconds"] * tolerance and slowdown > MIN_SLOWDOWN_SECONDS:
+                found.append(f"{name}/{stage}: {before['seconds'] * 1000:.2f} ms -> {stats['seconds'] * 1000:.2f} ms")
+            if stats["peak_kib"] > before["peak_kib"] * (1 + memory_tolerance):
+                found.append(f"{name}/{stage}: peak {before['peak_kib']:.0f} KiB -> {stats['peak_kib']:.0f} KiB")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--corpus", action="append", choices=sorted(CORPORA),
+                        help="Corpus to run (repeatable; default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs to take the median over")
+    parser.add_argument("--output", help="Write the results JSON here")
+    parser.add_argument("--check", help="Baseline JSON; exit 1 on regressions")
+    parser.add_argument("--update-baseline", help="Write the results as the new baseline here")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown (fraction)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10, help="Allowed peak memory growth (fraction)")
+    args = parser.parse_args()
+
+    names = args.corpus or list(CORPORA)
+    work_dir = tempfile.mkdtemp(prefix="deep-code-validator-bench-")
+    result = {"commit": current_commit(), "python": sys.version.split()[0], "repeat": args.repeat, "corpora": {}}
+    failures = []
+    try:
+        for name in names:
+            result["corpora"][name], errors = bench_corpus(name, args.repeat, work_dir)
+            print_corpus(name, result["corpora"][name])
+            failures.extend(f"{name}: {error}" for error in errors)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for path in (args.output, args.update_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+    if args.check:
+        with open(args.check, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nCompared with baseline from {baseline.get('commit', '?')} "
+              f"(tolerance {args.tolerance:.0%} time, {args.memory_tolerance:.0%} memory)")
+        failures.extend(regressions(result, baseline, args.tolerance, args.memory_tolerance))
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
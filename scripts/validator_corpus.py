@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Generate synthetic projects for benchmarking the validator and harmonizers.
+
+A corpus looks like generated output: HTML pages under pages/ sharing
+stylesheets and scripts, with nested markup, CSS rules that match it and
+JS that looks elements up. Known problems are planted on purpose (missing
+scripts, stylesheets and images, CSS selectors and JS lookups with no
+element, duplicate ids) and counted, so a benchmark can also check that the
+validator still finds exactly those.
+
+    python scripts/validator_corpus.py large /tmp/corpus-large
+
+Generation is seeded, so a corpus name always produces the same files.
+"""
+import argparse
+import os
+import random
+from collections import Counter
+from typing import Dict, List, NamedTuple, Tuple
+
+# name -> (pages, stylesheets, scripts, elements per page)
+CORPORA = {
+    "tiny": (1, 1, 1, 60),
+    "small": (8, 2, 4, 300),
+    "large": (200, 50, 50, 400),
+    "big_page": (1, 1, 2, 10000),
+}
+
+CONTAINER_TAGS = ("div", "section", "article", "ul", "nav", "main", "form")
+LEAF_TAGS = ("span", "a", "p", "button", "li", "h2", "label")
+CLASS_POOL = 120
+
+
+class Corpus(NamedTuple):
+    name: str
+    files: Dict[str, str]  # Relative path -> content
+    expected: Counter  # Error type -> number of planted errors
+
+
+class _Element(NamedTuple):
+    tag: str
+    id: str
+    classes: Tuple[str, ...]
+    parent_tag: str
+
+
+def _page(rng: random.Random, page: int, element_count: int) -> Tuple[List[str], List[_Element]]:
+    """Body markup lines and the elements in them"""
+    lines: List[str] = []
+    elements: List[_Element] = []
+    stack = ["body"]  # Open containers
+    for n in range(element_count):
+        parent_tag = stack[-1]
+        container = len(stack) < 8 and rng.random() < 0.3
+        tag = rng.choice(CONTAINER_TAGS if container else LEAF_TAGS)
+        classes = tuple(f"c{rng.randrange(CLASS_POOL)}" for _ in range(rng.randint(0, 2)))
+        element = _Element(tag, f"p{page}-e{n}", classes, parent_tag)
+        elements.append(element)
+        indent = "  " * len(stack)
+        class_attr = f' class="{" ".join(classes)}"' if classes else ""
+        if container:
+            lines.append(f'{indent}<{tag} id="{element.id}"{class_attr}>')
+            stack.append(tag)
+        else:
+            lines.append(f'{indent}<{tag} id="{element.id}"{class_attr}>Item {n}</{tag}>')
+        while len(stack) > 1 and rng.random() < 0.15:
+            lines.append("  " * (len(stack) - 1) + f"</{stack.pop()}>")
+    while len(stack) > 1:
+        lines.append("  " * (len(stack) - 1) + f"</{stack.pop()}>")
+    return lines, elements
+
+
+def _css(rng: random.Random, elements: List[_Element], rules: int, unused: List[str]) -> str:
+    parts = ["/* generated stylesheet */", "body { margin: 0; font-family: sans-serif; }"]
+    styled = [element for element in elements if element.classes]
+    for _ in range(rules):
+        element = rng.choice(styled)
+        name = rng.choice(element.classes)
+        selector = rng.choice((
+            f".{name}",
+            f"{element.tag}.{name}",
+            f"{element.parent_tag} > {element.tag}.{name}",
+            f"{element.parent_tag} .{name}",
+            f"#{element.id}",
+        ))
+        parts.append(f"{selector} {{ color: #{rng.randrange(0x1000000):06x}; padding: {rng.randint(0, 20)}px; }}")
+    parts.append("@media (max-width: 600px) {")
+    parts.append(f"  .{rng.choice(styled).classes[0]} {{ display: none; }}")
+    parts.append("}")
+    for selector in unused:
+        parts.append(f"{selector} {{ background: url(\"data:image/png;base64,AAAA\"); }}")
+    return "\n".join(parts) + "\n"
+
+
+def _js(rng: random.Random, index: int, elements: List[_Element], lookups: int, missing: List[str]) -> str:
+    parts = [
+        f"// generated script {index}",
+        "const pattern = /[a-z]+\\/(\\d+)/g;",
+        f"function render{index}(items) {{",
+        "  return items.map(item => `<li data-id=\"${item.id}\">${item.label}</li>`).join('');",
+        "}",
+        "",
+        "document.addEventListener('DOMContentLoaded', () => {",
+    ]
+    for n in range(lookups):
+        element = rng.choice(elements)
+        if element.classes and rng.random() < 0.3:
+            parts.append(f"  document.querySelectorAll('.{element.classes[0]}').forEach(el => el.hidden = false);")
+        else:
+            parts.append(f"  const el{n} = document.getElementById('{element.id}');")
+            parts.append(f"  if (el{n}) {{ el{n}.textContent = render{index}([]) || 'ready'; }}")
+    for n, missing_id in enumerate(missing):
+        parts.append(f"  document.getElementById('{missing_id}').addEventListener('click', () => {{ /* {n} */ }});")
+    parts.append("});")
+    return "\n".join(parts) + "\n"
+
+
+def generate(name: str, seed: int = 0) -> Corpus:
+    """Build corpus `name` (see CORPORA) with its planted-error counts"""
+    page_count, stylesheet_count, script_count, element_count = CORPORA[name]
+    rng = random.Random(f"{name}:{seed}")
+    files: Dict[str, str] = {}
+    expected: Counter = Counter()
+    stylesheets = [f"css/style{n}.css" for n in range(stylesheet_count)]
+    scripts = [f"js/app{n}.js" for n in range(script_count)]
+    missing_script_type = "MISMATCHED_SCRIPT_REF" if script_count == 1 else "MISSING_SCRIPT"
+
+    all_elements: List[_Element] = []
+    for page in range(page_count):
+        page_name = "index.html" if page == 0 else f"pages/page{page}.html"
+        prefix = "" if page == 0 else "../"
+        body, elements = _page(rng, page, element_count)
+        all_elements.extend(elements)
+        head = [f'  <link rel="stylesheet" href="{prefix}{sheet}">' for sheet in rng.sample(stylesheets, min(2, stylesheet_count))]
+        tail = [f'  <script src="{prefix}{script}"></script>' for script in rng.sample(scripts, min(2, script_count))]
+        if page % 3 == 0:
+            head.append(f'  <link rel="stylesheet" href="{prefix}css/missing{page}.css">')
+            expected["MISSING_STYLESHEET"] += 1
+        if page % 4 == 0:
+            tail.append(f'  <script src="{prefix}js/missing{page}.js"></script>')
+            expected[missing_script_type] += 1
+        if page % 2 == 0:
+            body.append(f'  <img src="{prefix}img/missing{page}.png" alt="">')
+            expected["MISSING_IMAGE"] += 1
+        if page % 5 == 0:
+            duplicate = elements[len(elements) // 2].id
+            body.append(f'  <span id="{duplicate}">duplicate</span>')
+            expected["DUPLICATE_ID"] += 1
+        files[page_name] = "\n".join([
+            "<!DOCTYPE html>",
+            "<html lang=\"en\">",
+            "<head>",
+            "  <meta charset=\"utf-8\">",
+            f"  <title>Page {page}</title>",
+            *head,
+            "</head>",
+            "<body>",
+            *body,
+            *tail,
+            "</body>",
+            "</html>",
+        ]) + "\n"
+
+    rules = max(20, element_count // 10)
+    for n, sheet in enumerate(stylesheets):
+        unused = [f".unused-{n}-{k}" for k in range(1 + n % 3)]
+        expected["UNUSED_CSS_SELECTOR"] += len(unused)
+        files[sheet] = _css(rng, all_elements, rules, unused)
+    lookups = max(10, element_count // 20)
+    for n, script in enumerate(scripts):
+        missing = [f"missing-el-{n}-{k}" for k in range(n % 2 + 1)]
+        expected["MISSING_HTML_ELEMENT"] += len(missing)
+        files[script] = _js(rng, n, all_elements, lookups, missing)
+    return Corpus(name, files, expected)
+
+
+def write(corpus: Corpus, root: str):
+    for rel_path, content in corpus.files.items():
+        path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("corpus", choices=sorted(CORPORA))
+    parser.add_argument("directory", help="Where to write the project")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    corpus = generate(args.corpus, args.seed)
+    write(corpus, args.directory)
+    size = sum(len(content) for content in corpus.files.values())
+    print(f"Wrote {len(corpus.files)} files ({size / 1024:.0f} KiB) to {args.directory}")
+    for error_type, count in sorted(corpus.expected.items()):
+        print(f"  {error_type:<24}{count:>6}")
+
+
+if __name__ == "__main__":
+    main()
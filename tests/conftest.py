@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    """Make asyncio.sleep return at once; the list collects the delays asked for"""
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds, *args, **kwargs):
+        delays.append(seconds)
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    return delays
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A clock that only moves when the code under test sleeps"""
+    clock = FakeClock()
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds, *args, **kwargs):
+        clock.now += seconds
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    return clock
@@ -0,0 +1,27 @@
+import json
+
+import httpx
+
+from deep_code.models.groq_client import GroqClient
+
+
+def sse(*deltas, usage=None):
+    """An SSE body streaming `deltas` as chat completion chunks"""
+    lines = [f"data: {json.dumps({'choices': [{'delta': {'content': delta}}]})}" for delta in deltas]
+    if usage is not None:
+        lines.append(f"data: {json.dumps({'choices': [], 'usage': usage})}")
+    lines.append("data: [DONE]")
+    return ("\n\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def completion(content):
+    """A non-streaming chat completion response body"""
+    return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+
+def mock_client(handler, **options):
+    """A GroqClient whose requests go to `handler` (an httpx.MockTransport handler)"""
+    options.setdefault("rate_limits", {})
+    client = GroqClient("test-key", **options)
+    client.session = httpx.AsyncClient(base_url="http://groq.test", transport=httpx.MockTransport(handler))
+    return client
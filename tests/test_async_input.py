@@ -0,0 +1,44 @@
+import asyncio
+import io
+import sys
+
+from deep_code.utils.async_input import ainput, set_line_reader
+
+
+def test_reads_stdin_without_blocking_the_loop(monkeypatch):
+    monkeypatch.setattr(sys, "stdin", io.StringIO("hello\n"))
+    ticks = []
+
+    async def ticker():
+        for _ in range(3):
+            ticks.append(1)
+            await asyncio.sleep(0)
+
+    async def run():
+        background = asyncio.create_task(ticker())
+        line = await ainput()
+        await background
+        return line
+
+    assert asyncio.run(run()) == "hello"
+    assert len(ticks) == 3
+
+
+def test_end_of_input_is_none(monkeypatch):
+    monkeypatch.setattr(sys, "stdin", io.StringIO(""))
+    assert asyncio.run(ainput()) is None
+
+
+def test_line_reader_replaces_stdin():
+    prompts = []
+
+    async def reader(prompt):
+        prompts.append(prompt)
+        return "from the client"
+
+    async def run():
+        set_line_reader(reader)
+        return await ainput("You: ")
+
+    assert asyncio.run(run()) == "from the client"
+    assert prompts == ["You: "]
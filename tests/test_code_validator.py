@@ -0,0 +1,172 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from deep_code.operations import code_validator
+from deep_code.operations.code_validator import WARNING, CodeValidator, ErrorCollector, ValidationError
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head><link rel="stylesheet" href="style.css"></head>
+<body>
+  <ul id="list"></ul>
+  <script src="app.js"></script>
+</body>
+</html>
+"""
+
+
+def write_project(root, files):
+    for name, content in files.items():
+        (root / name).write_text(content)
+
+
+@pytest.fixture
+def project(tmp_path):
+    write_project(tmp_path, {
+        "index.html": PAGE,
+        "style.css": "#list { color: red; }\n",
+        "app.js": "document.getElementById('list');\n",
+    })
+    return tmp_path
+
+
+def counting(validator, monkeypatch):
+    """Count the checks the validator really runs, per (check, file)"""
+    runs = Counter()
+    for check in ("references", "structure", "css_selectors", "js_selectors", "syntax"):
+        original = getattr(validator, f"_check_{check}")
+
+        def wrapped(file_name, *args, check=check, original=original):
+            runs[check, file_name] += 1
+            return original(file_name, *args)
+        monkeypatch.setattr(validator, f"_check_{check}", wrapped)
+    return runs
+
+
+def descriptions(errors):
+    return [f"{error.file_name}: {error.description}" for error in errors]
+
+
+def test_unchanged_project_reruns_nothing(project, monkeypatch):
+    validator = CodeValidator(str(project))
+    runs = counting(validator, monkeypatch)
+    assert validator.validate_all() == []
+    first = sum(runs.values())
+    assert validator.validate_all() == []
+    assert sum(runs.values()) == first
+
+
+def test_changed_css_reruns_only_its_checks(project, monkeypatch):
+    validator = CodeValidator(str(project))
+    runs = counting(validator, monkeypatch)
+    validator.validate_all()
+    runs.clear()
+    (project / "style.css").write_text("#missing { color: blue; }\n")
+    errors = validator.validate_all()
+    assert set(runs) == {("css_selectors", "style.css"), ("syntax", "style.css")}
+    assert descriptions(errors) == ["style.css: CSS selector '#missing' doesn't match any HTML elements"]
+
+
+def test_changed_html_reruns_the_selector_checks_that_read_it(project, monkeypatch):
+    validator = CodeValidator(str(project))
+    runs = counting(validator, monkeypatch)
+    validator.validate_all()
+    runs.clear()
+    (project / "index.html").write_text(PAGE.replace('id="list"', 'id="items"'))
+    errors = validator.validate_all()
+    assert set(runs) == {
+        ("references", "index.html"), ("structure", "index.html"),
+        ("css_selectors", "style.css"), ("js_selectors", "app.js"),
+    }
+    assert {error.error_type for error in errors} == {"UNUSED_CSS_SELECTOR", "MISSING_HTML_ELEMENT"}
+
+
+def test_new_file_reruns_the_reference_check(project):
+    validator = CodeValidator(str(project))
+    (project / "index.html").write_text(PAGE.replace("app.js", "main.js"))
+    (project / "other.js").write_text("let x = 1;\n")
+    assert [error.error_type for error in validator.validate_all()] == ["MISSING_SCRIPT"]
+    (project / "main.js").write_text("let y = 2;\n")
+    assert validator.validate_all() == []
+
+
+def test_incremental_results_match_a_fresh_validator(project):
+    validator = CodeValidator(str(project))
+    validator.validate_all()
+    (project / "app.js").write_text("document.getElementById('gone');\nfunction f() {\n")
+    incremental = descriptions(validator.validate_all())
+    assert incremental == descriptions(CodeValidator(str(project)).validate_all())
+    assert len(incremental) == 2
+
+
+def test_js_lookups_of_runtime_classes_are_not_missing_elements(project):
+    (project / "app.js").write_text(
+        "document.querySelectorAll('#list li.done').forEach(el => el.remove());\n"
+        "document.querySelector('.todo-item');\n"
+        "document.getElementsByClassName('card');\n"
+    )
+    errors = CodeValidator(str(project)).validate_all()
+    assert [(error.error_type, error.severity) for error in errors] == [("MISSING_HTML_CLASS", WARNING)]
+
+
+def test_duplicate_ids_are_counted_in_one_pass(project):
+    page = PAGE.replace('<ul id="list"></ul>', '<ul id="list"></ul><p id="list"></p><i id="list"></i><b id="x"></b><b id="x"></b>')
+    (project / "index.html").write_text(page)
+    errors = CodeValidator(str(project)).validate_all()
+    assert descriptions(errors) == [
+        "index.html: Duplicate ID: list (used 3 times)",
+        "index.html: Duplicate ID: x (used 2 times)",
+    ]
+
+
+def test_errors_are_capped_per_type_but_all_counted(project):
+    (project / "style.css").write_text("".join(f".gone{n} {{ color: red; }}\n" for n in range(30)))
+    (project / "app.js").write_text("document.getElementById('missing');\n")
+    validator = CodeValidator(str(project), max_errors_per_type=5)
+    errors = validator.validate_all()
+    assert validator.error_counts == {"UNUSED_CSS_SELECTOR": 30, "MISSING_HTML_ELEMENT": 1}
+    assert validator.total_errors == 31
+    # The critical error comes first, then the first five of the capped type
+    assert [error.error_type for error in errors] == ["MISSING_HTML_ELEMENT"] + ["UNUSED_CSS_SELECTOR"] * 5
+    assert errors[1].description == "CSS selector '.gone0' doesn't match any HTML elements"
+
+
+def test_collector_merge_keeps_uncollected_counts():
+    first, second = ErrorCollector(2), ErrorCollector(2)
+    for n in range(3):
+        second.append(ValidationError("a.css", "UNUSED_CSS_SELECTOR", str(n)))
+    first.append(ValidationError("b.css", "UNUSED_CSS_SELECTOR", "b"))
+    first.merge(second)
+    assert [error.description for error in first.errors] == ["b", "0"]
+    assert first.total == 4
+
+
+def test_parallel_validation_matches_serial(project, monkeypatch):
+    # Small enough that the pool would normally be skipped
+    monkeypatch.setattr(code_validator, "PARALLEL_MIN_CHARS", 0)
+    (project / "pages").mkdir()
+    for n in range(4):
+        (project / "pages" / f"p{n}.html").write_text(
+            f'<html><head></head><body><div id="d{n}"></div><div id="d{n}"></div>'
+            f'<img src="missing{n}.png"></body></html>'
+        )
+        (project / f"extra{n}.css").write_text(f"#d{n} {{ color: red }}\n.none{n} {{ }}\n")
+        (project / f"extra{n}.js").write_text(f"document.getElementById('nope{n}');\nif (x) {{\n")
+    serial = descriptions(CodeValidator(str(project)).validate_all())
+    validator = CodeValidator(str(project), workers=2)
+    try:
+        analyses = []
+        real_map = ProcessPoolExecutor.map
+
+        def spy(pool, *args, **kwargs):
+            analyses.append(args[0])
+            return real_map(pool, *args, **kwargs)
+        monkeypatch.setattr(ProcessPoolExecutor, "map", spy)
+        parallel = descriptions(validator.validate_all())
+    finally:
+        validator.close()
+    assert analyses, "the worker pool was not used"
+    assert parallel == serial
+    assert len(serial) > 10
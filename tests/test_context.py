@@ -0,0 +1,109 @@
+from deep_code.core.context import (
+    REPLY_RESERVE_TOKENS, SNAPSHOT_OMITTED, SUMMARY_HEADER, SUPERSEDED_MARKER, WORKSPACE_HEADER, WORKSPACE_MARKER,
+    ConversationContext, history_budget
+)
+
+
+def reply(body):
+    return f"Here it is:\n```js\n{body}\n```"
+
+
+def test_history_budget_fills_the_context_window():
+    assert history_budget(131072, 4000) == 131072 - 4000 - REPLY_RESERVE_TOKENS
+    # Small windows keep a quarter for the history, whatever the snapshot budget
+    assert history_budget(8192, 16000) == 2048
+
+
+def test_compact_drops_superseded_file_bodies():
+    context = ConversationContext("system", workspace_snapshot=False)
+    context.add("user", "make app.js")
+    context.add("assistant", reply("let v = 1;"), ["app.js"])
+    context.add("user", "change it")
+    context.add("assistant", reply("let v = 2;"), ["app.js"])
+    context.compact()
+    contents = [message["content"] for message in context.messages]
+    assert f"{SUPERSEDED_MARKER} app.js]" in contents[2]
+    assert "let v = 1;" not in contents[2]
+    assert "let v = 2;" in contents[4]
+
+
+def test_over_budget_folds_old_turns_into_a_summary():
+    context = ConversationContext("system", token_budget=200, keep_recent=2, workspace_snapshot=False)
+    context.add("assistant", reply("let v = 1;"), ["app.js"])
+    for turn in range(10):
+        context.add("user", f"question {turn} " + "words " * 40)
+    messages = context.messages
+    assert messages[0]["content"] == "system"
+    summary = messages[1]["content"]
+    assert summary.startswith(SUMMARY_HEADER)
+    assert "- Assistant wrote: app.js" in summary
+    # The summary still carries the latest version of the file
+    assert "Latest version of app.js" in summary and "let v = 1;" in summary
+    assert [message["content"].split()[1] for message in messages[-2:]] == ["8", "9"]
+    assert context.history_tokens <= context.total_tokens
+
+
+def test_forced_compact_summarises_under_budget():
+    context = ConversationContext("system", keep_recent=1, workspace_snapshot=False)
+    for turn in range(4):
+        context.add("user", f"question {turn}")
+    context.compact(force=True)
+    messages = context.messages
+    assert len(messages) == 3
+    assert messages[1]["content"].splitlines()[1:] == ["- User: question 0", "- User: question 1", "- User: question 2"]
+
+
+def test_pinned_context_stays_in_front():
+    context = ConversationContext("system", token_budget=100, keep_recent=1, workspace_snapshot=False)
+    context.pin("project memory")
+    for turn in range(10):
+        context.add("user", f"question {turn} " + "words " * 30)
+    assert [message["content"] for message in context.messages[:2]] == ["system", "project memory"]
+
+
+def workspace_context(snapshot_budget=16000):
+    context = ConversationContext("system", snapshot_budget=snapshot_budget)
+    context.open_project("todo")
+    context.add("user", "build me a todo app")
+    big = "// big\n" + "let x = 1;\n" * 400
+    small = "body { color: red; }"
+    context.add("assistant", f"```js\n{big}\n```\n```css\n{small}\n```", ["app.js", "style.css"])
+    context.set_file("app.js", big)
+    context.set_file("style.css", small)
+    context.add("user", "make it blue")
+    return context, big, small
+
+
+def test_saved_files_live_in_the_snapshot():
+    context, big, small = workspace_context()
+    messages = context.messages
+    assert f"{WORKSPACE_MARKER} app.js]" in messages[2]["content"]
+    snapshot = messages[-2]
+    assert snapshot["content"].startswith(WORKSPACE_HEADER)
+    assert big in snapshot["content"] and small in snapshot["content"]
+    assert messages[-1] == {"role": "user", "content": "make it blue"}
+
+
+def test_files_over_the_snapshot_budget_are_filled_into_the_history():
+    context, big, small = workspace_context(snapshot_budget=100)
+    messages = context.messages
+    history_reply, snapshot = messages[2]["content"], messages[-2]["content"]
+    # The large file moves out of the snapshot, but its body is never lost
+    assert big in history_reply and WORKSPACE_MARKER not in history_reply.split("```css")[0]
+    assert f"app.js:\n```js\n{SNAPSHOT_OMITTED}\n```" in snapshot
+    assert small in snapshot and f"{WORKSPACE_MARKER} style.css]" in history_reply
+    assert sum(message["content"].count(big) for message in messages) == 1
+
+
+def test_a_file_without_a_history_block_stays_in_the_snapshot():
+    context = ConversationContext("system", snapshot_budget=10)
+    context.set_file("notes.txt", "word " * 200)
+    context.add("user", "hello")
+    assert "word " * 200 in context.messages[-2]["content"]
+
+
+def test_filled_history_uses_the_current_version():
+    context, big, small = workspace_context(snapshot_budget=100)
+    newer = big + "let y = 2;\n"
+    context.set_file("app.js", newer)
+    assert newer in context.messages[2]["content"]
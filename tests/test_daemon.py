@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import pytest
+
+from deep_code.cli import client
+from deep_code.cli.daemon import Daemon
+
+
+@pytest.fixture
+def socket_dir():
+    # Unix socket paths are short-lived and length-limited, so not under tmp_path
+    directory = tempfile.mkdtemp(prefix="dc-")
+    yield directory
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture
+def daemon(socket_dir):
+    daemon = Daemon(os.path.join(socket_dir, "daemon.sock"))
+    thread = threading.Thread(target=daemon.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while client.connect(daemon.path) is None:
+        assert time.monotonic() < deadline, "the daemon did not start"
+        time.sleep(0.01)
+    yield daemon
+    client.request({"command": "stop"}, daemon.path)
+    thread.join(10)
+
+
+def test_wants_daemon(monkeypatch):
+    monkeypatch.delenv(client.NO_DAEMON_ENV, raising=False)
+    assert client.wants_daemon([])
+    assert client.wants_daemon(["chat", "--no-cache"])
+    assert not client.wants_daemon(["daemon"])
+    monkeypatch.setenv(client.NO_DAEMON_ENV, "1")
+    assert not client.wants_daemon(["chat"])
+
+
+def test_socket_path_follows_the_environment(monkeypatch):
+    monkeypatch.setenv(client.SOCKET_ENV, "/run/dc.sock")
+    assert client.socket_path() == "/run/dc.sock"
+    monkeypatch.delenv(client.SOCKET_ENV)
+    assert client.socket_path().endswith(os.path.join(".ai-code", "daemon.sock"))
+
+
+def test_no_daemon_means_run_in_process(socket_dir):
+    path = os.path.join(socket_dir, "nobody.sock")
+    assert client.request({"command": "status"}, path) is None
+    assert client.run(["chat"], path) is None
+
+
+def test_status_round_trip(daemon):
+    status = client.request({"command": "status"}, daemon.path)["status"]
+    assert status["pid"] == os.getpid()
+    assert status["sessions"] == 0 and status["busy"] is False
+
+
+def test_busy_daemon_hands_the_session_back(daemon):
+    daemon.busy = True
+    assert client.run(["chat"], daemon.path) is None
+    daemon.busy = False
+
+
+def test_stop_removes_the_socket(socket_dir, daemon):
+    assert client.request({"command": "stop"}, daemon.path) == {"exit": 0}
+    deadline = time.monotonic() + 10
+    while os.path.exists(daemon.path):
+        assert time.monotonic() < deadline, "the socket was not removed"
+        time.sleep(0.01)
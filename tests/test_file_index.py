@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from deep_code.operations.file_index import FileIndex
+from deep_code.operations.paths import STATE_DIR
+
+
+def test_scan_is_recursive_and_skips_state_and_backups(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "style.css").write_text("body {}")
+    (tmp_path / "index.html").write_text("<html></html>")
+    (tmp_path / "index.html.bak").write_text("old")
+    (tmp_path / STATE_DIR).mkdir()
+    (tmp_path / STATE_DIR / "journal.json").write_text("{}")
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "lib.js").write_text("")
+    entries = FileIndex(str(tmp_path)).scan()
+    assert sorted(entries) == ["css/style.css", "index.html"]
+    assert entries["css/style.css"].content == "body {}"
+
+
+def test_binary_files_are_indexed_but_not_read(tmp_path):
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\0data")
+    (tmp_path / "data.txt").write_bytes(b"abc\0def")
+    entries = FileIndex(str(tmp_path)).scan()
+    assert set(entries) == {"logo.png", "data.txt"}
+    assert not entries["logo.png"].is_text and not entries["data.txt"].is_text
+
+
+def test_rescan_reuses_unchanged_entries(tmp_path):
+    (tmp_path / "a.js").write_text("let a;")
+    (tmp_path / "b.js").write_text("let b;")
+    index = FileIndex(str(tmp_path))
+    first = index.scan()
+    (tmp_path / "b.js").write_text("let b = 2;")
+    second = index.scan()
+    assert second["a.js"] is first["a.js"]
+    assert second["b.js"] is not first["b.js"]
+    assert second["b.js"].content == "let b = 2;"
+
+
+def test_same_size_rewrite_is_noticed_by_its_mtime(tmp_path):
+    path = tmp_path / "a.js"
+    path.write_text("let a;")
+    index = FileIndex(str(tmp_path))
+    index.scan()
+    stat = path.stat()
+    path.write_text("let b;")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert index.scan()["a.js"].content == "let b;"
+
+
+@pytest.mark.parametrize("from_path, ref, target", [
+    ("index.html", "style.css", "style.css"),
+    ("pages/about.html", "../css/site.css?v=2", "css/site.css"),
+    ("pages/about.html", "/app.js", "app.js"),
+    ("index.html", "my%20file.js#top", "my file.js"),
+    ("index.html", "../outside.js", None),
+    ("index.html", "#top", None),
+])
+def test_resolve(from_path, ref, target):
+    assert FileIndex.resolve(from_path, ref) == target
@@ -0,0 +1,59 @@
+import codecs
+
+import pytest
+
+from deep_code.operations import file_ops
+from deep_code.operations.file_ops import FileOperationError, decode_bytes
+
+
+@pytest.fixture(autouse=True)
+def fresh_encoding_cache():
+    file_ops._encodings.clear()
+    yield
+    file_ops._encodings.clear()
+
+
+def test_utf8():
+    assert decode_bytes("café ✓".encode("utf-8")) == ("café ✓", "utf-8")
+
+
+@pytest.mark.parametrize("bom, encoding, text_encoding", [
+    (codecs.BOM_UTF8, "utf-8-sig", "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16", "utf-16-le"),
+    (codecs.BOM_UTF32_LE, "utf-32", "utf-32-le"),
+])
+def test_bom(bom, encoding, text_encoding):
+    assert decode_bytes(bom + "héllo".encode(text_encoding)) == ("héllo", encoding)
+
+
+def test_bad_bom_content_raises():
+    with pytest.raises(FileOperationError):
+        decode_bytes(codecs.BOM_UTF32_LE + b"\x00\xd8\x00\x00")
+
+
+def test_samples_from_the_utf8_failure():
+    # Well past the detection sample: chardet has to see the bytes that broke UTF-8
+    line = "Привет, как дела? Это небольшой тест кодировки.\n"
+    raw = b"a" * (file_ops.DETECTION_SAMPLE_SIZE * 2) + line.encode("cp1251") * 20
+    text, encoding = decode_bytes(raw)
+    assert encoding.lower() == "windows-1251"
+    assert text.endswith(line)
+
+
+def test_windows_1252():
+    text, encoding = decode_bytes(b"price: 10\x80")
+    assert text == "price: 10€"
+    assert encoding.lower() in ("cp1252", "windows-1252")
+
+
+def test_latin1_is_the_last_resort():
+    # 0x81 is undefined in cp1252, and latin-1 decodes any bytes
+    assert decode_bytes(b"x\x81") == ("x\x81", "latin-1")
+
+
+def test_detected_encoding_is_cached():
+    raw = b"caf\xe9 au lait, cr\xe8me br\xfbl\xe9e\n" * 50
+    key = ("/project/menu.txt", 1, len(raw))
+    text, encoding = decode_bytes(raw, key)
+    assert file_ops._encodings[key] == encoding
+    assert decode_bytes(raw, key) == (text, encoding)
@@ -0,0 +1,89 @@
+import asyncio
+
+from deep_code.operations.code_validator import CodeValidator, ValidationError
+from deep_code.operations.fix_scheduler import FixScheduler
+
+HTML = '<!DOCTYPE html>\n<html>\n<head><title>Todo</title></head>\n<body><ul id="list"></ul></body>\n</html>\n'
+
+
+def error(file_name, description="broken"):
+    return ValidationError(file_name, "SYNTAX_ERROR", description)
+
+
+def project(tmp_path):
+    (tmp_path / "index.html").write_text(HTML)
+    (tmp_path / "style.css").write_text("#list { color: red }\n")
+    validator = CodeValidator(str(tmp_path))
+    validator.load_files()
+    return validator
+
+
+def test_group_keeps_first_appearance_order():
+    errors = [error("b.css"), error("a.js"), error("b.css", "again")]
+    groups = FixScheduler.group(errors)
+    assert list(groups) == ["b.css", "a.js"]
+    assert [e.description for e in groups["b.css"]] == ["broken", "again"]
+
+
+def test_pick_block_takes_the_file_language():
+    reply = "```html\n<p>page</p>\n```\n```css\nbody {}\n```"
+    assert FixScheduler.pick_block("style.css", reply) == "body {}\n"
+    assert FixScheduler.pick_block("index.html", reply) == "<p>page</p>\n"
+
+
+def test_pick_block_never_returns_another_language():
+    # Regression: an HTML page used to be written into style.css
+    reply = "Here is the fix:\n```html\n<!DOCTYPE html><html></html>\n```"
+    assert FixScheduler.pick_block("style.css", reply) is None
+    assert FixScheduler.pick_block("app.js", "no code at all") is None
+
+
+def test_fix_prompt_carries_errors_and_related_context(tmp_path):
+    validator = project(tmp_path)
+    scheduler = FixScheduler(None, "system", max_errors_per_file=2)
+    prompt = scheduler.fix_prompt("style.css", [error("style.css", str(n)) for n in range(3)], validator)
+    assert "• 0" in prompt and "• 1" in prompt and "• 2" not in prompt
+    assert "(+ 1 more errors)" in prompt
+    assert "- HTML ids: list" in prompt
+    assert "```css\n#list { color: red }\n```" in prompt
+
+
+def test_fix_skips_replies_in_the_wrong_language(tmp_path):
+    validator = project(tmp_path)
+
+    async def complete(messages):
+        # The model answers every request with the page
+        return "```html\n" + HTML + "```"
+
+    scheduler = FixScheduler(complete, "system")
+    results = asyncio.run(scheduler.fix(validator, [error("style.css"), error("index.html")]))
+    assert results == {"style.css": None, "index.html": HTML}
+
+
+def test_fix_runs_at_most_max_parallel_requests(tmp_path):
+    validator = project(tmp_path)
+    running, peak = 0, 0
+
+    async def complete(messages):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "```js\nlet ok = 1;\n```"
+
+    scheduler = FixScheduler(complete, "system", max_parallel=2)
+    errors = [error(f"f{n}.js") for n in range(5)]
+    results = asyncio.run(scheduler.fix(validator, errors))
+    assert peak == 2
+    assert set(results.values()) == {"let ok = 1;\n"}
+
+
+def test_fix_reports_failed_requests(tmp_path):
+    validator = project(tmp_path)
+
+    async def complete(messages):
+        raise RuntimeError("boom")
+
+    results = asyncio.run(FixScheduler(complete, "system").fix(validator, [error("style.css")]))
+    assert isinstance(results["style.css"], RuntimeError)
@@ -0,0 +1,180 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from deep_code.models.groq_client import APIError, RateLimitError
+from deep_code.models.rate_limiter import CooldownTable
+from helpers import completion, mock_client, sse
+
+MESSAGES = [{"role": "user", "content": "build me a todo app"}]
+
+
+async def collect(stream):
+    return [delta async for delta in stream]
+
+
+def test_stream_yields_deltas():
+    client = mock_client(lambda request: httpx.Response(200, content=sse("Hel", "lo")))
+    assert asyncio.run(collect(client.chat_completion_stream(MESSAGES, "m"))) == ["Hel", "lo"]
+    assert client.first_token_latency.count("m") == 1
+    assert client.latency.count("m") == 1
+
+
+def test_stream_retries_timeouts_before_the_first_delta(no_sleep):
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        if len(attempts) == 1:
+            raise httpx.ConnectTimeout("connect timeout")
+        if len(attempts) == 2:
+            raise httpx.ReadTimeout("read timeout")
+        return httpx.Response(200, content=sse("ok"))
+
+    client = mock_client(handler)
+    assert asyncio.run(collect(client.chat_completion_stream(MESSAGES, "m"))) == ["ok"]
+    assert len(attempts) == 3
+    assert no_sleep == [1, 2]
+
+
+def test_stream_gives_up_after_three_timeouts(no_sleep):
+    def handler(request):
+        raise httpx.ReadTimeout("read timeout")
+
+    client = mock_client(handler)
+    with pytest.raises(APIError, match="timed out after 3 attempts"):
+        asyncio.run(collect(client.chat_completion_stream(MESSAGES, "m")))
+
+
+def test_stream_does_not_retry_after_output(no_sleep):
+    class StallingStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield sse("partial")[:-len("data: [DONE]\n\n")]
+            raise httpx.ReadTimeout("read timeout")
+
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        return httpx.Response(200, stream=StallingStream())
+
+    client = mock_client(handler)
+    received = []
+
+    async def run():
+        async for delta in client.chat_completion_stream(MESSAGES, "m"):
+            received.append(delta)
+
+    with pytest.raises(APIError, match="stalled"):
+        asyncio.run(run())
+    assert received == ["partial"]
+    assert len(attempts) == 1
+
+
+def test_stream_rate_limit_puts_the_model_on_cooldown():
+    client = mock_client(lambda request: httpx.Response(429, headers={"retry-after": "30"}, text="slow down"))
+    with pytest.raises(RateLimitError) as error:
+        asyncio.run(collect(client.chat_completion_stream(MESSAGES, "m")))
+    assert error.value.retry_after == 30.0
+    assert client.cooldowns.is_cooling("m")
+
+
+def test_stream_falls_back_to_the_next_model_when_rate_limited():
+    def handler(request):
+        if json.loads(request.content)["model"] == "a":
+            return httpx.Response(429, headers={"retry-after": "30"})
+        return httpx.Response(200, content=sse("from b"))
+
+    client = mock_client(handler)
+    stream = client.chat_completion_stream_with_fallback(MESSAGES, "a", ["b"])
+    assert asyncio.run(collect(stream)) == ["from b"]
+    assert client.rate_limited_models == {"a"}
+
+
+def test_fallback_waits_for_the_soonest_model_when_all_are_cooling(clock):
+    requested = []
+
+    def handler(request):
+        requested.append(json.loads(request.content)["model"])
+        if len(requested) == 1:
+            return httpx.Response(429, headers={"retry-after": "2"})
+        return httpx.Response(200, json=completion("done"))
+
+    client = mock_client(handler)
+    client.cooldowns = CooldownTable(clock=clock)
+    client.cooldowns.mark("b", 50)
+
+    reply = asyncio.run(client.chat_completion_with_fallback(MESSAGES, "a", ["b"]))
+    assert reply == completion("done")
+    assert requested == ["a", "a"]
+    assert clock.now == pytest.approx(1002.0)
+
+
+def test_fallback_gives_up_when_the_wait_is_too_long(no_sleep):
+    client = mock_client(lambda request: httpx.Response(429, headers={"retry-after": "600"}), max_cooldown_wait=60)
+    with pytest.raises(APIError, match="All available models are rate limited"):
+        asyncio.run(client.chat_completion_with_fallback(MESSAGES, "a"))
+    assert no_sleep == []
+
+
+HEDGE = {"enabled": True, "default_delay": 0.05, "min_delay": 0.01}
+
+
+def racing_handler(delays, stream=False):
+    """Answers each model after its delay in `delays`, recording the models asked"""
+    requested = []
+
+    async def handler(request):
+        model = json.loads(request.content)["model"]
+        requested.append(model)
+        await asyncio.sleep(delays[model])
+        if stream:
+            return httpx.Response(200, content=sse(f"from {model}"))
+        return httpx.Response(200, json=completion(f"from {model}"))
+
+    return handler, requested
+
+
+def test_hedge_races_a_backup_when_the_primary_is_slow():
+    handler, requested = racing_handler({"a": 5.0, "b": 0.0})
+    client = mock_client(handler, hedge=HEDGE)
+    reply = asyncio.run(client.chat_completion_with_fallback(MESSAGES, "a", ["b"]))
+    assert reply == completion("from b")
+    assert requested == ["a", "b"]
+    # The cancelled primary still leaves a (lower-bound) sample behind
+    assert client.latency.count("a") == 1
+    assert client.latency.percentile("a", 0.5) >= HEDGE["default_delay"]
+
+
+def test_no_hedge_when_the_primary_answers_in_time():
+    handler, requested = racing_handler({"a": 0.0, "b": 0.0})
+    client = mock_client(handler, hedge=HEDGE)
+    assert asyncio.run(client.chat_completion_with_fallback(MESSAGES, "a", ["b"])) == completion("from a")
+    assert requested == ["a"]
+
+
+def test_hedged_stream_takes_the_first_delta():
+    handler, requested = racing_handler({"a": 5.0, "b": 0.0}, stream=True)
+    client = mock_client(handler, hedge=HEDGE)
+    stream = client.chat_completion_stream_with_fallback(MESSAGES, "a", ["b"])
+    assert asyncio.run(collect(stream)) == ["from b"]
+    assert requested == ["a", "b"]
+    assert client.first_token_latency.count("a") == 1
+
+
+def test_hedge_skips_cooling_backups():
+    handler, requested = racing_handler({"a": 0.2, "b": 0.0})
+    client = mock_client(handler, hedge=HEDGE)
+    client.cooldowns.mark("b", 60)
+    assert asyncio.run(client.chat_completion_with_fallback(MESSAGES, "a", ["b"])) == completion("from a")
+    assert requested == ["a"]
+
+
+def test_hedge_delay_follows_the_percentile_once_known():
+    client = mock_client(lambda request: None, hedge={"enabled": True, "default_delay": 15.0, "min_samples": 3})
+    assert client.hedge_delay("a") == 15.0
+    for seconds in (2.0, 3.0, 4.0):
+        client.latency.record("a", seconds)
+    assert client.hedge_delay("a") == 4.0
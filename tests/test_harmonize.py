@@ -0,0 +1,76 @@
+from deep_code.cli.main import cross_file_dependency_fix, harmonize_file_names
+
+PAGE = '<html><head><link rel="stylesheet" href="{css}"></head><body><script src="{js}"></script></body></html>'
+
+
+def page(js="app.js", css="style.css"):
+    return ("html", PAGE.format(js=js, css=css))
+
+
+def test_lone_files_are_renamed_to_what_the_page_references():
+    renames = {}
+    result = harmonize_file_names({
+        "index.html": page(js="script.js", css="main.css"),
+        "todo_file2.js": ("javascript", "let a;"),
+        "todo_file3.css": ("css", "body {}"),
+    }, renames)
+    assert sorted(result) == ["index.html", "main.css", "script.js"]
+    assert renames == {"todo_file2.js": "script.js", "todo_file3.css": "main.css"}
+
+
+def test_referenced_files_keep_their_names():
+    # Regression: the standard-name fallback used to rename script.js to app.js
+    # after the reference-based pass had matched it
+    file_map = {"index.html": page(js="script.js", css="main.css"),
+                "script.js": ("js", "let a;"), "main.css": ("css", "body {}")}
+    result = harmonize_file_names(file_map)
+    assert sorted(result) == ["index.html", "main.css", "script.js"]
+    assert result["index.html"] == file_map["index.html"]
+
+
+def test_unreferenced_lone_files_get_standard_names():
+    renames = {}
+    result = harmonize_file_names({
+        "page.html": ("html", "<html><body></body></html>"),
+        "logic.javascript": ("javascript", "let a;"),
+        "look.css": ("css", "body {}"),
+    }, renames)
+    assert sorted(result) == ["app.js", "index.html", "style.css"]
+    assert renames == {"page.html": "index.html", "logic.javascript": "app.js", "look.css": "style.css"}
+
+
+def test_references_follow_the_renames():
+    result = harmonize_file_names({
+        "index.html": page(),
+        "todo.js": ("js", "let a;"),
+        "todo.css": ("css", "body {}"),
+    })
+    assert sorted(result) == ["app.js", "index.html", "style.css"]
+    assert result["index.html"] == page()
+
+
+def test_dependency_fix_points_broken_references_at_the_likely_file():
+    corrected = cross_file_dependency_fix({
+        "index.html": page(js="app.js", css="https://cdn.example.com/x.css"),
+        "js/app.js": ("js", 'import { f } from "./helper.js";\nimport React from "react";\n'),
+        "js/helpers.js": ("js", "export const f = 1;"),
+        "css/site.css": ("css", 'body { background: url("img/bg.png") }'),
+        "img/bg.png": ("", ""),
+    })
+    assert corrected["index.html"] == PAGE.format(js="js/app.js", css="https://cdn.example.com/x.css")
+    assert corrected["js/app.js"] == 'import { f } from "./helpers.js";\nimport React from "react";\n'
+    # Resolved from css/, the url really is broken: the image lives at img/bg.png
+    assert corrected["css/site.css"] == 'body { background: url("../img/bg.png") }'
+
+
+def test_dependency_fix_leaves_working_references_alone():
+    file_map = {
+        "index.html": page(),
+        "app.js": ("js", 'import "./util";\n'),
+        "util.js": ("js", ""),
+        "style.css": ("css", "body {}"),
+        "main.py": ("python", "import os\nimport helpers\n"),
+        "helpers.py": ("python", ""),
+    }
+    corrected = cross_file_dependency_fix(file_map)
+    assert corrected == {name: code for name, (lang, code) in file_map.items()}
@@ -0,0 +1,44 @@
+from deep_code.operations.html_document import collect_elements, parse_html
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+  <link rel="stylesheet" href="style.css">
+</head>
+<body>
+  <ul id="list" class="todo big"></ul>
+  <p id="list">again</p>
+  <img src="logo.png">
+  <script src="app.js"></script>
+</body>
+</html>
+"""
+
+
+def test_one_parse_holds_everything_the_checks_need():
+    document = parse_html(PAGE)
+    # Ids stay in document order so duplicates are visible
+    assert document.ids == ["list", "list"]
+    assert document.classes == {"todo", "big"}
+    assert {"html", "head", "body", "ul", "p"} <= document.tags
+    assert document.scripts == ["app.js"]
+    assert document.stylesheets == ["style.css"]
+    assert document.images == ["logo.png"]
+    assert document.has_html and document.has_head and document.has_body
+
+
+def test_missing_structure_tags():
+    document = parse_html("<div id='app'></div>")
+    assert not (document.has_html or document.has_head or document.has_body)
+    assert document.ids == ["app"]
+
+
+def test_collect_elements_unions_documents():
+    elements = collect_elements([parse_html(PAGE), parse_html('<div id="app" class="card"></div>')])
+    assert elements["ids"] == {"list", "app"}
+    assert elements["classes"] == {"todo", "big", "card"}
+    assert "div" in elements["tags"] and "ul" in elements["tags"]
+
+
+def test_same_content_is_parsed_once():
+    assert parse_html(PAGE).table is parse_html(PAGE).table
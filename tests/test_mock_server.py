@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from deep_code.models.groq_client import GroqClient, RateLimitError
+from deep_code.utils.mock_server import EXHAUSTED_REPLY, MockGroqServer
+
+MESSAGES = [{"role": "user", "content": "build me a todo app"}]
+
+
+def run_with_client(server, work):
+    async def run():
+        client = GroqClient("test-key", base_url=server.base_url, rate_limits={})
+        try:
+            return await work(client)
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def content(response):
+    return response["choices"][0]["message"]["content"]
+
+
+def test_serves_recorded_responses_in_order():
+    with MockGroqServer(["first", "second"]) as server:
+        async def work(client):
+            return [content(await client.chat_completion(MESSAGES, "m")) for _ in range(3)]
+        assert run_with_client(server, work) == ["first", "second", EXHAUSTED_REPLY]
+    assert [request["model"] for request in server.requests] == ["m", "m", "m"]
+
+
+def test_streams_in_chunks_with_usage():
+    with MockGroqServer(["abcdefghij"], chunk_size=4) as server:
+        async def work(client):
+            return [delta async for delta in client.chat_completion_stream(MESSAGES, "m")]
+        assert run_with_client(server, work) == ["abcd", "efgh", "ij"]
+    assert server.requests[0]["stream"] is True
+
+
+def test_scripted_rate_limit():
+    with MockGroqServer(["after the 429"], faults={0: {"status": 429, "retry_after": 7}}) as server:
+        async def work(client):
+            with pytest.raises(RateLimitError) as error:
+                await client.chat_completion(MESSAGES, "m")
+            assert error.value.retry_after == 7.0
+            return content(await client.chat_completion(MESSAGES, "other"))
+        assert run_with_client(server, work) == "after the 429"
+
+
+def test_from_session():
+    session = {"responses": ["x"], "chunk_size": 3, "faults": {"1": {"stall": 0.1}}}
+    with MockGroqServer.from_session(session, latency=0.5) as server:
+        assert server.responses == ["x"]
+        assert server.chunk_size == 3
+        assert server.latency == 0.5
+        assert server.faults == {1: {"stall": 0.1}}
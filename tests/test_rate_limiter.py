@@ -0,0 +1,157 @@
+import asyncio
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from deep_code.models.rate_limiter import (
+    DEFAULT_COOLDOWN_SECONDS, CooldownTable, RateLimiter, TokenBucket, estimate_tokens, parse_duration,
+    retry_after_from_headers
+)
+
+
+def test_estimate_tokens():
+    messages = [{"role": "system", "content": "x" * 400}, {"role": "user", "content": None}]
+    assert estimate_tokens(messages) == 100 + 4 + 4
+
+
+def test_token_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(60, 1.0, now=0.0)
+    bucket.consume(60)
+    assert bucket.delay_for(10) == pytest.approx(10.0)
+    bucket.refill(4.0)
+    assert bucket.level == pytest.approx(4.0)
+    bucket.refill(1000.0)
+    assert bucket.level == 60
+
+
+def test_token_bucket_oversized_request_waits_for_a_full_bucket():
+    bucket = TokenBucket(100, 10.0, now=0.0)
+    bucket.consume(50)
+    assert bucket.delay_for(500) == pytest.approx(5.0)
+
+
+def test_from_config_without_limits_disables_limiting():
+    assert RateLimiter.from_config(None) is None
+    assert RateLimiter.from_config({}) is None
+
+
+def test_acquire_waits_for_the_request_budget(clock):
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=0, clock=clock)
+
+    async def three_requests():
+        for _ in range(3):
+            await limiter.acquire("m", 10)
+
+    asyncio.run(three_requests())
+    # Two requests fit in the bucket; the third waits for one to refill (30s at 2/min)
+    assert clock.now == pytest.approx(1030.0)
+
+
+def test_acquire_waits_for_the_token_budget(clock):
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=600, clock=clock)
+    asyncio.run(limiter.acquire("m", 600))
+    assert limiter.delay_for("m", 100) == pytest.approx(10.0)
+    assert limiter.delay_for("other", 100) == 0
+
+
+def test_record_usage_corrects_the_reservation(clock):
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=600, clock=clock)
+    asyncio.run(limiter.acquire("m", 500))
+    limiter.record_usage("m", 500, 200)
+    assert limiter.delay_for("m", 400) == 0
+    limiter.record_usage("m", 200, 800)
+    assert limiter.delay_for("m", 1) > 0
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("7.66s", 7.66),
+    ("2m59.56s", 179.56),
+    ("120ms", 0.12),
+    ("3", 3.0),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == pytest.approx(seconds)
+
+
+@pytest.mark.parametrize("value", ["soon", "5s later", ""])
+def test_parse_duration_rejects_garbage(value):
+    assert parse_duration(value) is None
+
+
+def test_retry_after_seconds_wins():
+    headers = {"retry-after": "12", "x-ratelimit-reset-tokens": "1s", "x-ratelimit-remaining-tokens": "0"}
+    assert retry_after_from_headers(headers) == 12.0
+
+
+def test_retry_after_http_date():
+    now = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    headers = {"retry-after": format_datetime(now.replace(second=30), usegmt=True)}
+    assert retry_after_from_headers(headers, now=now.timestamp()) == pytest.approx(30.0)
+
+
+def test_retry_after_in_the_past_is_zero():
+    headers = {"retry-after": "Thu, 01 Jan 1970 00:00:00 GMT"}
+    assert retry_after_from_headers(headers) == 0.0
+
+
+def test_uses_the_window_that_ran_out():
+    headers = {
+        "x-ratelimit-reset-requests": "2m",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-tokens": "1s",
+        "x-ratelimit-remaining-tokens": "5000",
+    }
+    assert retry_after_from_headers(headers) == 120.0
+
+
+def test_prefers_tokens_when_both_ran_out():
+    headers = {
+        "x-ratelimit-reset-requests": "1s",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-tokens": "30s",
+        "x-ratelimit-remaining-tokens": "0",
+    }
+    assert retry_after_from_headers(headers) == 30.0
+
+
+def test_falls_back_to_the_smaller_reset():
+    headers = {"x-ratelimit-reset-requests": "2m", "x-ratelimit-reset-tokens": "7.5s"}
+    assert retry_after_from_headers(headers) == 7.5
+
+
+def test_no_usable_headers():
+    assert retry_after_from_headers({}) is None
+    assert retry_after_from_headers({"x-ratelimit-reset-tokens": "whenever"}) is None
+
+
+def test_cooldown_expires(clock):
+    cooldowns = CooldownTable(clock=clock)
+    cooldowns.mark("a", 30)
+    assert cooldowns.is_cooling("a")
+    assert cooldowns.remaining("a") == pytest.approx(30.0)
+    clock.now += 31
+    assert not cooldowns.is_cooling("a")
+    assert cooldowns.cooling_models() == set()
+
+
+def test_cooldown_without_a_hint_uses_the_default(clock):
+    cooldowns = CooldownTable(clock=clock)
+    cooldowns.mark("a")
+    assert cooldowns.remaining("a") == pytest.approx(DEFAULT_COOLDOWN_SECONDS)
+
+
+def test_cooldown_keeps_the_later_deadline(clock):
+    cooldowns = CooldownTable(clock=clock)
+    cooldowns.mark("a", 60)
+    cooldowns.mark("a", 5)
+    assert cooldowns.remaining("a") == pytest.approx(60.0)
+
+
+def test_soonest_recovering_model(clock):
+    cooldowns = CooldownTable(clock=clock)
+    cooldowns.mark("a", 60)
+    cooldowns.mark("b", 10)
+    assert cooldowns.soonest(["a", "b"]) == "b"
+    assert cooldowns.soonest(["a", "c"]) == "c"
+    assert cooldowns.soonest([]) is None
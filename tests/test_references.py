@@ -0,0 +1,63 @@
+import pytest
+
+from deep_code.operations import scanner
+from deep_code.operations.references import ReferenceResolver, relative_ref, rename_references
+
+
+def test_only_real_references_are_renamed():
+    content = (
+        '<link rel="stylesheet" href="style.css?v=1">\n'
+        '<script src="./app.js"></script><script src="myapp.js"></script>\n'
+        "<p>app.js is the entry point; see app.json</p>\n"
+    )
+    renamed = rename_references(content, "html", "index.html", {"app.js": "js/main.js", "style.css": "site.css"})
+    assert renamed == (
+        '<link rel="stylesheet" href="site.css?v=1">\n'
+        '<script src="./js/main.js"></script><script src="myapp.js"></script>\n'
+        "<p>app.js is the entry point; see app.json</p>\n"
+    )
+
+
+def test_references_are_resolved_from_the_referring_file():
+    content = 'import { f } from "../lib/util.js";\nimport g from "./local";\n'
+    renames = {"lib/util.js": "lib/utils.js", "pages/local.js": "pages/helpers.js"}
+    assert rename_references(content, "js", "pages/page.js", renames) == (
+        'import { f } from "../lib/utils.js";\nimport g from "./helpers";\n'
+    )
+
+
+def test_kind_renames_apply_to_one_reference_kind():
+    content = '<script src="app.js"></script><img src="app.js">'
+    kind_renames = {scanner.SCRIPT_REF: {"app.js": "main.js"}}
+    assert rename_references(content, "html", "index.html", {}, kind_renames) == (
+        '<script src="main.js"></script><img src="app.js">'
+    )
+
+
+def test_relative_ref_keeps_the_original_spelling():
+    assert relative_ref("/app.js", "pages/a.html", "js/app.js") == "/js/app.js"
+    assert relative_ref("./app.js", "index.html", "js/app.js") == "./js/app.js"
+    assert relative_ref("../app.js", "pages/a.html", "js/app.js") == "../js/app.js"
+
+
+PROJECT = ["index.html", "js/app.js", "app.jsx", "lib/utils.js", "utils/strings.js", "css/style.css", "css/theme.css"]
+
+
+@pytest.mark.parametrize("ref, exts, match", [
+    ("app.js", None, "js/app.js"),  # Same name elsewhere
+    ("app.ts", (".js",), "js/app.js"),  # Same stem, wanted extension
+    ("app.ts", None, "app.jsx"),  # Shortest path with the same stem
+    ("util", None, "utils/strings.js"),  # Path prefix
+    ("string", (".js",), "utils/strings.js"),  # File name prefix
+    ("the", (".css",), "css/theme.css"),
+    ("themes.css", (".css",), None),
+    ("", None, None),
+])
+def test_near_match_ranks(ref, exts, match):
+    assert ReferenceResolver(PROJECT).near_match(ref, exts) == match
+
+
+def test_with_ext_and_membership():
+    resolver = ReferenceResolver(PROJECT)
+    assert resolver.with_ext(".css") == ["css/style.css", "css/theme.css"]
+    assert "js/app.js" in resolver and "app.js" not in resolver
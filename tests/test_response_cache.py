@@ -0,0 +1,75 @@
+import asyncio
+import json
+import os
+import time
+
+import httpx
+import pytest
+
+from deep_code.models.response_cache import CacheMissError, ResponseCache, request_key
+from helpers import completion, mock_client
+
+MESSAGES = [{"role": "user", "content": "build me a todo app"}]
+
+
+def test_request_key_ignores_whitespace_noise():
+    noisy = [{"role": "user", "content": "  build me a todo app  \r\n"}]
+    assert request_key("m", noisy) == request_key("m", MESSAGES)
+    assert request_key("m", MESSAGES) != request_key("other", MESSAGES)
+    assert request_key("m", MESSAGES) != request_key("m", MESSAGES, {"temperature": 0})
+
+
+def test_round_trip_and_expiry(tmp_path):
+    cache = ResponseCache(tmp_path, ttl_seconds=60)
+    cache.put("k", completion("hi"))
+    assert cache.get("k") == completion("hi")
+    entry = tmp_path / "k.json"
+    entry.write_text(json.dumps({"created": time.time() - 120, "response": completion("hi")}))
+    assert cache.get("k") is None
+    assert not entry.exists()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(tmp_path, max_bytes=10 ** 6)
+    for key in ("a", "b", "c"):
+        cache.put(key, completion(key * 100))
+    now = time.time()
+    for age, key in enumerate(("c", "a", "b")):
+        os.utime(tmp_path / f"{key}.json", (now - 100 * age, now - 100 * age))
+    # Entry sizes vary with the timestamp stored in them
+    cache.max_bytes = sum((tmp_path / f"{key}.json").stat().st_size for key in ("a", "c"))
+    cache.evict()
+    assert sorted(path.stem for path in tmp_path.glob("*.json")) == ["a", "c"]
+
+
+def test_replay_only_serves_recordings(tmp_path):
+    ResponseCache(tmp_path).put("k", completion("recorded"))
+    replay = ResponseCache(tmp_path, mode="replay")
+    assert replay.get("k") == completion("recorded")
+    replay.put("new", completion("ignored"))
+    with pytest.raises(CacheMissError):
+        replay.get("new")
+
+
+def test_from_config_is_off_unless_enabled(tmp_path):
+    assert ResponseCache.from_config(None) is None
+    assert ResponseCache.from_config({"directory": str(tmp_path)}) is None
+    assert ResponseCache.from_config({"directory": str(tmp_path), "enabled": True}).mode == "on"
+    assert ResponseCache.from_config({"directory": str(tmp_path)}, enabled=True).mode == "on"
+    assert ResponseCache.from_config({"directory": str(tmp_path), "enabled": True}, enabled=False) is None
+    assert ResponseCache.from_config(None, enabled=False, replay=True).mode == "replay"
+
+
+def test_client_says_when_a_reply_comes_from_the_cache(tmp_path, capsys):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=completion("fresh"))
+
+    client = mock_client(handler, cache=ResponseCache(tmp_path))
+    assert asyncio.run(client.chat_completion(MESSAGES, "m")) == completion("fresh")
+    assert "[Response cache]" not in capsys.readouterr().out
+    assert asyncio.run(client.chat_completion(MESSAGES, "m")) == completion("fresh")
+    assert "[Response cache]" in capsys.readouterr().out
+    assert len(requests) == 1
@@ -0,0 +1,90 @@
+import pytest
+
+from deep_code.operations import scanner
+from deep_code.operations.scanner import Symbol
+
+SOURCES = {
+    "html": '<link rel="stylesheet" href="style.css"><div id="app" class="card big"></div><script src="app.js"></script>',
+    "css": '.card #app { background: url("img/bg.png") }',
+    "js": 'import x from "./util.js"; document.getElementById("app"); document.querySelector("main #app");',
+}
+
+
+@pytest.mark.parametrize("language", sorted(SOURCES))
+def test_symbol_spans_cover_their_values(language):
+    content = SOURCES[language]
+    symbols = scanner.scan(content, language).symbols
+    assert symbols
+    for symbol in symbols:
+        assert content[symbol.start:symbol.end] == symbol.value
+
+
+def test_rewrite_replaces_only_the_spans():
+    content = SOURCES["js"]
+    symbols = scanner.scan(content, "js").of(scanner.JS_ID)
+    rewritten = scanner.rewrite(content, symbols, lambda symbol: "root")
+    assert rewritten == content.replace('"app"', '"root"').replace("#app", "#root")
+
+
+@pytest.mark.parametrize("code, ids", [
+    ("document.getElementById('list')", ["list"]),
+    ("document.querySelector('#list')", ["list"]),
+    ("document.querySelectorAll('ul > #list, #other')", ["list", "other"]),
+    # Runtime classes and ancestors aren't lookups the page has to satisfy
+    ("document.querySelectorAll('#list li.done')", []),
+    ("document.querySelector('.todo-item')", []),
+    ("document.querySelector('#list.open')", []),
+])
+def test_js_ids_are_only_the_elements_a_lookup_returns(code, ids):
+    table = scanner.scan(code, "js")
+    assert table.values(scanner.JS_ID) == ids
+    assert table.values(scanner.JS_CLASS) == []
+    for symbol in table.symbols:
+        assert code[symbol.start:symbol.end] == symbol.value
+
+
+def test_class_lookups_by_name():
+    assert scanner.scan("document.getElementsByClassName('card')", "js").values(scanner.JS_CLASS) == ["card"]
+
+
+def test_html_comments_and_raw_text_hold_no_markup():
+    content = (
+        '<!-- <div id="commented"></div> -->'
+        '<script>if (a < b) { el.innerHTML = "<p id=\'in-script\'></p>"; }</script>'
+        "<style>.x > p { color: red }</style>"
+        '<div id="real"></div>'
+    )
+    table = scanner.scan(content, "html")
+    assert table.values(scanner.ID) == ["real"]
+    assert [element.tag for element in table.elements] == ["script", "style", "div"]
+
+
+def test_html_attribute_values_are_decoded_but_spans_stay_in_the_source():
+    content = '<a id="tom&amp;jerry" class=big><img src=logo.png></a>'
+    table = scanner.scan(content, "html")
+    (id_symbol,) = table.of(scanner.ID)
+    assert id_symbol.value == "tom&jerry"
+    assert content[id_symbol.start:id_symbol.end] == "tom&amp;jerry"
+    assert table.values(scanner.CLASS) == ["big"]
+    assert table.values(scanner.IMAGE_REF) == ["logo.png"]
+    assert table.elements[1].parent is table.elements[0]
+
+
+def test_rewrite_keeps_unfixed_symbols():
+    content = SOURCES["html"]
+    table = scanner.scan(content, "html")
+    fixes = {"style.css": "styles.css", "card": "card"}
+    rewritten = scanner.rewrite(content, table.symbols, lambda symbol: fixes.get(symbol.value))
+    assert rewritten == content.replace("style.css", "styles.css")
+
+
+def test_rewrite_without_changes_returns_content():
+    content = SOURCES["css"]
+    symbols = scanner.scan(content, "css").symbols
+    assert scanner.rewrite(content, symbols, lambda symbol: None) is content
+
+
+def test_rewrite_sorts_and_skips_overlaps():
+    content = "abcdef"
+    symbols = [Symbol("x", "ef", 4, 6), Symbol("x", "abc", 0, 3), Symbol("x", "bc", 1, 3)]
+    assert scanner.rewrite(content, symbols, lambda symbol: symbol.value.upper()) == "ABCdEF"
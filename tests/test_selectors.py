@@ -0,0 +1,60 @@
+import pytest
+
+from deep_code.operations import scanner
+from deep_code.operations.selectors import Compound, DomIndex, parse_selector
+
+HTML = """<body>
+<nav class="sidebar"><a href="http://example.com">x</a><span></span></nav>
+<main id="main"><h1></h1><p class="lead"></p><p></p></main>
+<a></a>
+</body>"""
+
+
+@pytest.fixture(scope="module")
+def dom():
+    return DomIndex(scanner.scan(HTML, "html").elements)
+
+
+def test_parse_selector_combinators():
+    assert parse_selector("div > .a + p ~ #b") == (
+        ("", Compound("div", None, (), ())),
+        (">", Compound(None, None, ("a",), ())),
+        ("+", Compound("p", None, (), ())),
+        ("~", Compound(None, "b", (), ())),
+    )
+
+
+def test_parse_selector_compound_parts():
+    assert parse_selector('A#x.b.c[href^="http"]') == (
+        ("", Compound("a", "x", ("b", "c"), (("href", "^=", "http"),))),
+    )
+
+
+@pytest.mark.parametrize("selector", ["", "> a", "a >", "a > > b"])
+def test_parse_selector_rejects_dangling_combinators(selector):
+    assert parse_selector(selector) is None
+
+
+@pytest.mark.parametrize("selector, expected", [
+    (".sidebar a", True),
+    ("body a", True),
+    ("#main .lead", True),
+    ("main .sidebar", False),
+    (".sidebar > a", True),
+    ("main > a", False),
+    ("h1 + p.lead", True),
+    ("p + h1", False),
+    ("h1 + p + .lead", False),
+    ("h1 ~ p", True),
+    ("nav > a + span", True),
+    ('a[href^="http"]', True),
+    ('a[href$=".org"]', False),
+])
+def test_dom_index_matches(dom, selector, expected):
+    assert dom.matches(selector) is expected
+
+
+def test_missing_names_never_match(dom):
+    assert not dom.matches(".missing")
+    assert not dom.matches("#nope a")
+    assert not dom.matches("table")
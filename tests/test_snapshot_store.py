@@ -0,0 +1,84 @@
+import os
+
+from deep_code.operations.snapshot_store import SnapshotStore
+from deep_code.operations.workspace_writer import WorkspaceWriter
+
+
+def turn(writer, files, remove=()):
+    """One user turn as the CLI runs it: begin, stage everything, commit"""
+    writer.snapshots.begin_turn(f"turn with {sorted(files)}")
+    for path, content in files.items():
+        writer.stage_bytes(path, content)
+    for path in remove:
+        writer.remove(path)
+    return writer.commit()
+
+
+def restore(writer, snapshot):
+    files, remove = writer.snapshots.restore_plan(snapshot)
+    for path, content in files.items():
+        writer.stage_bytes(path, content)
+    for path in remove:
+        writer.remove(path)
+    writer.commit(record=False)
+    writer.snapshots.move_head(snapshot)
+
+
+def new_writer(root, **options):
+    return WorkspaceWriter(str(root), snapshots=SnapshotStore(str(root), **options))
+
+
+def test_each_turn_is_a_snapshot_and_unchanged_content_is_stored_once(tmp_path):
+    writer = new_writer(tmp_path)
+    turn(writer, {"index.html": b"<p>1</p>", "app.js": b"let a;"})
+    turn(writer, {"app.js": b"let b;"})
+    store = writer.snapshots
+    history = store.history()
+    # Turn 0 is the (empty) project as it was before the first turn
+    assert [snapshot.turn for snapshot in history] == [0, 1, 2]
+    assert history[0].files == {}
+    history = history[1:]
+    assert history[0].files["index.html"][0] == history[1].files["index.html"][0]
+    objects = [name for _, _, names in os.walk(store.objects_dir) for name in names]
+    assert len(objects) == 3
+    assert "+let b;" in store.diff(history[0], history[1])
+    assert "index.html" not in store.diff(history[0], history[1])
+
+
+def test_rollback_restores_files_byte_for_byte(tmp_path):
+    writer = new_writer(tmp_path)
+    latin1 = "caf\xe9\r\n".encode("latin-1")
+    turn(writer, {"notes.txt": latin1})
+    turn(writer, {"notes.txt": b"rewritten", "extra.js": b"let x;"})
+    restore(writer, writer.snapshots.at_turn(1))
+    assert (tmp_path / "notes.txt").read_bytes() == latin1
+    assert not (tmp_path / "extra.js").exists()
+    assert writer.snapshots.head.turn == 1
+
+
+def test_undo_goes_back_to_before_the_turn(tmp_path):
+    writer = new_writer(tmp_path)
+    turn(writer, {"app.js": b"let a;"})
+    turn(writer, {"app.js": b"let b;"})
+    restore(writer, writer.snapshots.before_head_turn())
+    assert (tmp_path / "app.js").read_bytes() == b"let a;"
+
+
+def test_edits_made_outside_are_snapshotted_before_being_overwritten(tmp_path):
+    writer = new_writer(tmp_path)
+    turn(writer, {"app.js": b"let a;"})
+    (tmp_path / "app.js").write_bytes(b"let edited_by_hand;")
+    turn(writer, {"app.js": b"let b;"})
+    restore(writer, writer.snapshots.before_head_turn())
+    assert (tmp_path / "app.js").read_bytes() == b"let edited_by_hand;"
+
+
+def test_old_turns_and_their_objects_are_collected(tmp_path):
+    writer = new_writer(tmp_path, keep_turns=2)
+    for n in range(4):
+        turn(writer, {"app.js": f"let v{n};".encode()})
+    writer.snapshots.begin_turn()
+    store = SnapshotStore(str(tmp_path), keep_turns=2)
+    assert [snapshot.turn for snapshot in store.history()] == [3, 4]
+    objects = [name for _, _, names in os.walk(store.objects_dir) for name in names]
+    assert len(objects) == 2
@@ -0,0 +1,62 @@
+import re
+
+import pytest
+
+from deep_code.operations.stream_parser import CodeBlockStreamParser
+
+CODE_BLOCK = re.compile(r"```([a-zA-Z0-9]*)\n([\s\S]*?)```")
+
+REPLY = """Here is the app.
+
+**index.html**
+```html
+<div id="app"></div>
+```
+
+**app.js**
+```js
+const s = `template`;
+console.log("``", s);
+```
+
+Unterminated:
+```css
+body { color: red; }
+"""
+
+
+def feed_in_chunks(text, size):
+    parser = CodeBlockStreamParser()
+    completed = []
+    for start in range(0, len(text), size):
+        completed += parser.feed(text[start:start + size])
+    return parser, completed
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 64, len(REPLY)])
+def test_chunked_feed_matches_findall(size):
+    parser, completed = feed_in_chunks(REPLY, size)
+    expected = CODE_BLOCK.findall(REPLY)
+    assert completed == expected
+    assert parser.close() == expected
+
+
+def test_blocks_are_handed_out_when_their_fence_closes():
+    parser = CodeBlockStreamParser()
+    assert parser.feed("```js\nlet a = 1;\n``") == []
+    assert parser.feed("`\nmore text") == [("js", "let a = 1;\n")]
+
+
+def test_pending_block():
+    parser = CodeBlockStreamParser()
+    parser.feed("text ```css\nbody {")
+    assert parser.pending == ("css", "body {")
+    parser.feed("}\n```")
+    assert parser.pending is None
+
+
+def test_close_drops_an_unterminated_block():
+    parser = CodeBlockStreamParser()
+    parser.feed("```html\n<p>\n```\n```js\nlet a")
+    assert parser.close() == [("html", "<p>\n")]
+    assert parser.pending is None
@@ -0,0 +1,73 @@
+import pytest
+
+from deep_code.operations.syntax_checker import DelimiterTokenizer, check_syntax
+
+JS_SOURCE = """function f(a) {
+  const re = /[{(]/g; // } not a closer
+  const s = `x ${a + "}"} y`;
+  /* ( */ return [a, '\\'', "]"];
+}
+"""
+
+UNBALANCED_JS = """if (a) {
+  b(];
+  const t = `${x
+"""
+
+
+def feed_in_chunks(source, size, language="js"):
+    tokenizer = DelimiterTokenizer(language)
+    for start in range(0, len(source), size):
+        tokenizer.feed(source[start:start + size])
+    return tokenizer
+
+
+def test_balanced_js_has_no_issues():
+    assert check_syntax(JS_SOURCE, "js") == []
+
+
+def test_reports_unclosed_and_unexpected_delimiters():
+    issues = check_syntax("if (a) { b(];", "js")
+    assert [(issue.line, issue.column, issue.message) for issue in issues] == [
+        (1, 8, "Unclosed '{'"),
+        (1, 11, "Unclosed '('"),
+        (1, 12, "Unexpected ']' with no matching '['"),
+    ]
+
+
+def test_unterminated_string():
+    issues = check_syntax('const s = "abc', "js")
+    assert [(issue.line, issue.column, issue.delimiter, issue.message) for issue in issues] == [
+        (1, 11, '"', "Unterminated string"),
+    ]
+
+
+def test_css_stray_closer():
+    issues = check_syntax("a { color: red; }\n}", "css")
+    assert [(issue.line, issue.column) for issue in issues] == [(2, 1)]
+
+
+@pytest.mark.parametrize("source", [JS_SOURCE, UNBALANCED_JS])
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16])
+def test_incremental_feed_matches_one_shot(source, size):
+    one_shot = DelimiterTokenizer("js").feed(source)
+    chunked = feed_in_chunks(source, size)
+    assert chunked.issues() == one_shot.issues()
+    assert chunked.complete == one_shot.complete
+    assert chunked.open_delimiters == one_shot.open_delimiters
+
+
+def test_complete_tracks_what_is_still_open():
+    tokenizer = DelimiterTokenizer("js").feed("function f() {")
+    assert not tokenizer.complete
+    assert tokenizer.open_delimiters == [("{", 1, 14)]
+    tokenizer.feed("\n  return `a")
+    assert not tokenizer.complete
+    tokenizer.feed("`;\n}")
+    assert tokenizer.complete
+    assert tokenizer.issues() == []
+
+
+def test_unsupported_language():
+    with pytest.raises(ValueError):
+        DelimiterTokenizer("python")
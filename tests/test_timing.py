@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+
+from deep_code.utils.timing import StageTimer
+
+
+@pytest.fixture
+def timer(monkeypatch, clock):
+    monkeypatch.setattr(time, "perf_counter", clock)
+    return StageTimer()
+
+
+def seconds(timer):
+    return {name: stats["seconds"] for name, stats in timer.report().items()}
+
+
+def test_nested_stages_count_exclusive_time(timer, clock):
+    with timer.stage("turn"):
+        clock.now += 1
+        with timer.stage("parse"):
+            clock.now += 2
+        clock.now += 3
+    assert seconds(timer) == {"turn": 4, "parse": 2}
+    assert timer.report()["parse"]["count"] == 1
+
+
+def test_concurrent_tasks_keep_their_own_stacks(timer, clock):
+    async def request():
+        with timer.stage("request"):
+            await asyncio.sleep(10)
+
+    async def validate():
+        with timer.stage("validate"):
+            with timer.stage("parse"):
+                await asyncio.sleep(2)
+            await asyncio.sleep(1)
+
+    async def both():
+        await asyncio.gather(request(), validate())
+
+    asyncio.run(both())
+    # Wall-clock time per task: request runs from 1000 until the second
+    # task's first sleep ends at 1012; validate's own time excludes parse
+    assert seconds(timer) == {"request": 12, "validate": 1, "parse": 2}
+
+
+def test_a_task_does_not_pause_its_creators_stage(timer, clock):
+    async def background():
+        with timer.stage("validate"):
+            await asyncio.sleep(5)
+
+    async def turn():
+        with timer.stage("turn"):
+            task = asyncio.create_task(background())
+            await asyncio.sleep(1)
+            await task
+
+    asyncio.run(turn())
+    assert seconds(timer) == {"turn": 6, "validate": 5}
+
+
+def test_reset(timer, clock):
+    with timer.stage("write"):
+        clock.now += 1
+    timer.reset()
+    assert timer.report() == {}
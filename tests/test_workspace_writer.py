@@ -0,0 +1,68 @@
+import json
+import os
+
+from deep_code.operations.workspace_writer import JOURNAL_NAME, STAGING_DIR, WorkspaceWriter
+
+
+def test_commit_writes_the_batch_and_skips_unchanged_files(tmp_path):
+    writer = WorkspaceWriter(str(tmp_path))
+    writer.stage("index.html", "<html></html>")
+    writer.stage("js/app.js", "let a;")
+    assert writer.commit() == (["index.html", "js/app.js"], [], [])
+    assert (tmp_path / "js" / "app.js").read_text() == "let a;"
+
+    writer.stage("index.html", "<html></html>")
+    writer.stage("js/app.js", "let b;")
+    assert writer.commit() == (["js/app.js"], ["index.html"], [])
+    # The previous version is kept when no snapshot store is attached
+    assert (tmp_path / "js" / "app.js.bak").read_text() == "let a;"
+    assert not (tmp_path / STAGING_DIR).exists()
+
+
+def test_remove_deletes_only_existing_files(tmp_path):
+    (tmp_path / "old.css").write_text("body {}")
+    writer = WorkspaceWriter(str(tmp_path))
+    writer.remove("old.css")
+    writer.remove("never.css")
+    assert writer.commit() == ([], [], ["old.css"])
+    assert not (tmp_path / "old.css").exists()
+
+
+def test_unchanged_check_notices_edits_made_outside_the_writer(tmp_path):
+    writer = WorkspaceWriter(str(tmp_path))
+    writer.stage("a.js", "let a;")
+    writer.commit()
+    (tmp_path / "a.js").write_text("let b;")
+    writer.stage("a.js", "let a;")
+    assert writer.commit().written == ["a.js"]
+    assert (tmp_path / "a.js").read_text() == "let a;"
+
+
+def stage_batch(root, files, journal=True):
+    """Leave a staged batch behind as a crash would"""
+    staging = root / STAGING_DIR / "batch"
+    staging.mkdir(parents=True)
+    writes = []
+    for index, (path, content) in enumerate(files.items()):
+        (staging / str(index)).write_text(content)
+        writes.append({"path": path, "staged": str(index), "backup": False})
+    if journal:
+        (staging / JOURNAL_NAME).write_text(json.dumps({"writes": writes, "removes": []}))
+
+
+def test_recover_finishes_a_journaled_batch(tmp_path):
+    stage_batch(tmp_path, {"index.html": "new page", "app.js": "new script"})
+    # A crash after the first rename: the rest still has to move into place
+    os.replace(tmp_path / STAGING_DIR / "batch" / "0", tmp_path / "index.html")
+    WorkspaceWriter(str(tmp_path))
+    assert (tmp_path / "index.html").read_text() == "new page"
+    assert (tmp_path / "app.js").read_text() == "new script"
+    assert not (tmp_path / STAGING_DIR).exists()
+
+
+def test_recover_drops_a_batch_without_a_journal(tmp_path):
+    (tmp_path / "app.js").write_text("old script")
+    stage_batch(tmp_path, {"app.js": "half written"}, journal=False)
+    WorkspaceWriter(str(tmp_path))
+    assert (tmp_path / "app.js").read_text() == "old script"
+    assert not (tmp_path / STAGING_DIR).exists()